@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#
+# Measures what a short-lived tool pays to use nodes: the time to import
+# the package, and the time to define a class and evaluate it once.
+#
+# Each measurement runs in a fresh interpreter and is timed from within
+# it, so excludes the interpreter's own startup, which is reported
+# separately for comparison.  Figures are medians over the runs.
+#
+#   python benchmarks/startup.py [--runs 20] [--size 1000]
+#
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT = """
+import time
+start = time.time()
+import nodes
+print(time.time() - start)
+"""
+
+FIRST_EVALUATION = """
+import time
+start = time.time()
+import nodes
+
+class Book(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Spot(self):
+        return 1.0
+
+    @nodes.graphMethod
+    def Position(self, i):
+        return self.Spot() * i
+
+    @nodes.graphMethod
+    def Total(self):
+        return sum(self.Position(i) for i in range(%(size)d))
+
+book = Book()
+book.Total()
+first = time.time()
+book.Spot = 2.0
+book.Total()
+print('%%s %%s' %% (first - start, time.time() - first))
+"""
+
+def run(code, runs):
+    """Returns the output lines of code run in runs fresh interpreters."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    outputs = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', code], env=env)
+        outputs.append(output.decode('ascii').split())
+    return outputs
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def interpreterStartup(runs):
+    times = []
+    for _ in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', 'pass'])
+        times.append(time.time() - start)
+    return median(times)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--size', type=int, default=1000, help='positions in the evaluated book')
+    options = parser.parse_args()
+
+    # Run once so that bytecode is cached where the interpreter allows.
+    run(IMPORT, 1)
+
+    print('python            %s' % sys.version.split()[0])
+    print('interpreter       %7.2f ms' % (interpreterStartup(options.runs) * 1000))
+    imports = [float(output[0]) for output in run(IMPORT, options.runs)]
+    print('import nodes      %7.2f ms' % (median(imports) * 1000))
+    evaluations = run(FIRST_EVALUATION % {'size': options.size}, options.runs)
+    print('first evaluation  %7.2f ms  (import, define, evaluate %d nodes)'
+          % (median(float(output[0]) for output in evaluations) * 1000, options.size + 2))
+    print('re-evaluation     %7.2f ms  (after a change)'
+          % (median(float(output[1]) for output in evaluations) * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,17 @@
 from .nodes import *
 
+# The optional subsystems are not imported with the core engine.  Import
+# them explicitly (import nodes.tracing), or, on Python 3.7 and later,
+# just use them (nodes.tracing.Trace): they are loaded on first use.
+#
+_subsystems = frozenset([
+    'attribution', 'autodiff', 'changelog', 'distributed', 'metrics',
+    'precompute', 'recording', 'revalidate', 'scheduler', 'sharedmem',
+    'tracing',
+    ])
+
+def __getattr__(name):
+    if name in _subsystems:
+        import importlib
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
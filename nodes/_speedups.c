@@ -0,0 +1,352 @@
+/*
+ * nodes._speedups: C implementation of nodes.speedups.readValue.
+ *
+ * Mirrors the pure Python version in nodes/speedups.py line for line;
+ * keep the two in step.  Builds against Python 2.7 and 3.
+ */
+
+#include <Python.h>
+
+#define NODE_COMPUTING 0x0008   /* Node.COMPUTING */
+
+static PyObject *str_graphMethod, *str__node, *str__nodes, *str__graph, *str_argKey, *str_cache,
+                *str_lock, *str_tracer, *str__activeScope,
+                *str__flags, *str_activeNode, *str__expiring, *str_eventListeners,
+                *str__isOverlaid, *str__overlaidValue, *str__isSet, *str__setValue,
+                *str__isCalced, *str__verifiedAt, *str_revision, *str__calcedValue,
+                *str_counters, *str_lookups, *str_hits, *str__inputs, *str__outputs,
+                *str__reads, *str__readValue, *str__computing, *str_graph;
+
+static PyObject *one;
+static PyObject *computing;     /* nodes.speedups._computing, once looked up. */
+
+/* Returns a new reference to obj.name, or NULL on error.  Before 3.11,
+ * attributes in the instance dictionary are read directly: the ones read
+ * here are never shadowed by descriptors, and this skips the class
+ * lookups of PyObject_GetAttr.  From 3.11 instances may have no
+ * dictionary until asked for one, and asking would slow every other
+ * attribute access on them.
+ */
+static PyObject *
+getAttr(PyObject *obj, PyObject *name)
+{
+#if PY_VERSION_HEX < 0x030B0000
+    if (Py_TYPE(obj)->tp_dictoffset != 0) {
+        PyObject **dictptr = _PyObject_GetDictPtr(obj);
+        if (dictptr != NULL && *dictptr != NULL) {
+            PyObject *value = PyDict_GetItem(*dictptr, name);
+            if (value != NULL) {
+                Py_INCREF(value);
+                return value;
+            }
+        }
+    }
+#endif
+    return PyObject_GetAttr(obj, name);
+}
+
+/* Returns 1 if obj.name is None, 0 if not, and -1 on error. */
+static int
+attrIsNone(PyObject *obj, PyObject *name)
+{
+    PyObject *value = getAttr(obj, name);
+    if (value == NULL)
+        return -1;
+    Py_DECREF(value);
+    return value == Py_None;
+}
+
+/* Returns the truth of obj.name, or -1 on error. */
+static int
+attrIsTrue(PyObject *obj, PyObject *name)
+{
+    int result;
+    PyObject *value = getAttr(obj, name);
+    if (value == NULL)
+        return -1;
+    result = PyObject_IsTrue(value);
+    Py_DECREF(value);
+    return result;
+}
+
+/* Adds one to obj.name. */
+static int
+increment(PyObject *obj, PyObject *name)
+{
+    int result;
+    PyObject *sum, *value = getAttr(obj, name);
+    if (value == NULL)
+        return -1;
+    sum = PyNumber_Add(value, one);
+    Py_DECREF(value);
+    if (sum == NULL)
+        return -1;
+    result = PyObject_SetAttr(obj, name, sum);
+    Py_DECREF(sum);
+    return result;
+}
+
+/* Adds item to the set obj.name. */
+static int
+addTo(PyObject *obj, PyObject *name, PyObject *item)
+{
+    int result;
+    PyObject *set = getAttr(obj, name);
+    if (set == NULL)
+        return -1;
+    if (PyAnySet_Check(set))
+        result = PySet_Add(set, item);
+    else {
+        PyObject *r = PyObject_CallMethod(set, "add", "O", item);
+        result = r == NULL ? -1 : 0;
+        Py_XDECREF(r);
+    }
+    Py_DECREF(set);
+    return result;
+}
+
+/* Appends item to the list obj.name. */
+static int
+appendTo(PyObject *obj, PyObject *name, PyObject *item)
+{
+    int result;
+    PyObject *list = getAttr(obj, name);
+    if (list == NULL)
+        return -1;
+    if (PyList_Check(list))
+        result = PyList_Append(list, item);
+    else {
+        PyObject *r = PyObject_CallMethod(list, "append", "O", item);
+        result = r == NULL ? -1 : 0;
+        Py_XDECREF(r);
+    }
+    Py_DECREF(list);
+    return result;
+}
+
+/* Returns 1 if no graph is calculating a value on the thread, 0 if one
+ * is, and -1 on error.  The thread-local is read with PyObject_GetAttr,
+ * as its dictionary depends on the thread.
+ */
+static int
+noneComputing(void)
+{
+    if (computing == NULL) {
+        PyObject *module = PyImport_ImportModule("nodes.speedups");
+        if (module == NULL)
+            return -1;
+        computing = PyObject_GetAttr(module, str__computing);
+        Py_DECREF(module);
+        if (computing == NULL)
+            return -1;
+    }
+    {
+        PyObject *graph = PyObject_GetAttr(computing, str_graph);
+        if (graph == NULL)
+            return -1;
+        Py_DECREF(graph);
+        return graph == Py_None;
+    }
+}
+
+/* Returns the node's value if it can be read without recalculating,
+ * NULL with no exception set if it cannot, or NULL with an exception set
+ * on error.  graphMethod is borrowed.
+ */
+static PyObject *
+fastRead(PyObject *graph, PyObject *graphInstanceMethod, PyObject *graphMethod, PyObject *args)
+{
+    PyObject *nodes, *node, *nodeGraph, *flags, *outputNode;
+    PyObject *value = NULL, *verifiedAt, *revision, *counters;
+    long nodeFlags;
+    int test;
+
+#define REQUIRE(expression) \
+    do { test = (expression); if (test < 0) return NULL; if (!test) return NULL; } while (0)
+
+    REQUIRE(attrIsNone(graphMethod, str_argKey));
+    REQUIRE(attrIsNone(graphMethod, str_cache));
+    REQUIRE(attrIsNone(graph, str_lock));
+    REQUIRE(attrIsNone(graph, str_tracer));
+    REQUIRE(attrIsNone(graph, str__activeScope));
+#undef REQUIRE
+
+    if (PyTuple_GET_SIZE(args) == 0)
+        node = getAttr(graphInstanceMethod, str__node);
+    else {
+        nodes = getAttr(graphInstanceMethod, str__nodes);
+        if (nodes == NULL)
+            return NULL;
+        node = NULL;
+        if (PyDict_Check(nodes)) {
+#if PY_MAJOR_VERSION < 3
+            node = PyDict_GetItem(nodes, args);
+#else
+            node = PyDict_GetItemWithError(nodes, args);
+#endif
+            Py_XINCREF(node);
+        }
+        Py_DECREF(nodes);
+    }
+    if (node == NULL)
+        return NULL;
+    if (node == Py_None) {
+        Py_DECREF(node);
+        return NULL;
+    }
+
+    nodeGraph = getAttr(node, str__graph);
+    if (nodeGraph == NULL)
+        goto done;
+    Py_DECREF(nodeGraph);
+    if (nodeGraph != graph)
+        goto done;
+
+    flags = getAttr(node, str__flags);
+    if (flags == NULL)
+        goto done;
+    nodeFlags = PyLong_AsLong(flags);
+    Py_DECREF(flags);
+    if (nodeFlags == -1 && PyErr_Occurred())
+        goto done;
+    if (nodeFlags & NODE_COMPUTING)
+        goto done;
+
+    outputNode = getAttr(graph, str_activeNode);
+    if (outputNode == NULL)
+        goto done;
+    if (outputNode == Py_None) {
+        test = attrIsTrue(graph, str__expiring);
+        if (test == 0)
+            test = attrIsTrue(graph, str_eventListeners);
+        if (test == 0 && (test = noneComputing()) >= 0)
+            test = !test;
+        if (test != 0)
+            goto doneOutput;
+    }
+
+    if ((test = attrIsTrue(node, str__isOverlaid)) != 0) {
+        if (test > 0)
+            value = getAttr(node, str__overlaidValue);
+    }
+    else if ((test = attrIsTrue(node, str__isSet)) != 0) {
+        if (test > 0)
+            value = getAttr(node, str__setValue);
+    }
+    else if ((test = attrIsTrue(node, str__isCalced)) != 0) {
+        if (test < 0)
+            goto doneOutput;
+        verifiedAt = getAttr(node, str__verifiedAt);
+        if (verifiedAt == NULL)
+            goto doneOutput;
+        revision = getAttr(graph, str_revision);
+        if (revision == NULL) {
+            Py_DECREF(verifiedAt);
+            goto doneOutput;
+        }
+        test = PyObject_RichCompareBool(verifiedAt, revision, Py_EQ);
+        Py_DECREF(verifiedAt);
+        Py_DECREF(revision);
+        if (test > 0)
+            value = getAttr(node, str__calcedValue);
+    }
+    if (value == NULL)
+        goto doneOutput;
+
+    counters = getAttr(graph, str_counters);
+    if (counters == NULL || increment(counters, str_lookups) < 0 || increment(counters, str_hits) < 0)
+        goto error;
+    Py_CLEAR(counters);
+    if (outputNode != Py_None) {
+        if (addTo(outputNode, str__inputs, node) < 0 || appendTo(outputNode, str__reads, node) < 0
+                || addTo(node, str__outputs, outputNode) < 0)
+            goto error;
+    }
+    goto doneOutput;
+
+error:
+    Py_XDECREF(counters);
+    Py_CLEAR(value);
+doneOutput:
+    Py_DECREF(outputNode);
+done:
+    Py_DECREF(node);
+    return value;
+}
+
+static PyObject *
+readValue(PyObject *self, PyObject *arguments)
+{
+    PyObject *graph, *graphInstanceMethod, *args, *graphMethod, *value;
+
+    if (!PyArg_ParseTuple(arguments, "OOO!:readValue", &graph, &graphInstanceMethod,
+                          &PyTuple_Type, &args))
+        return NULL;
+    graphMethod = getAttr(graphInstanceMethod, str_graphMethod);
+    if (graphMethod == NULL)
+        return NULL;
+    value = fastRead(graph, graphInstanceMethod, graphMethod, args);
+    Py_DECREF(graphMethod);
+    if (value != NULL || PyErr_Occurred())
+        return value;
+    return PyObject_CallMethodObjArgs(graph, str__readValue, graphInstanceMethod, args, NULL);
+}
+
+static PyMethodDef methods[] = {
+    {"readValue", readValue, METH_VARARGS,
+     "readValue(graph, graphInstanceMethod, args)\n\n"
+     "Returns the value of the graph instance method called with args on graph."},
+    {NULL, NULL, 0, NULL}
+};
+
+static int
+initStrings(void)
+{
+#define INTERN(name) \
+    if ((str_##name = PyUnicode_InternFromString(#name)) == NULL) return -1
+#if PY_MAJOR_VERSION < 3
+#undef INTERN
+#define INTERN(name) \
+    if ((str_##name = PyString_InternFromString(#name)) == NULL) return -1
+#endif
+    INTERN(graphMethod); INTERN(_node); INTERN(_nodes); INTERN(_graph); INTERN(argKey);
+    INTERN(cache); INTERN(lock); INTERN(tracer); INTERN(_activeScope);
+    INTERN(_flags); INTERN(activeNode); INTERN(_expiring); INTERN(eventListeners);
+    INTERN(_isOverlaid); INTERN(_overlaidValue); INTERN(_isSet); INTERN(_setValue);
+    INTERN(_isCalced); INTERN(_verifiedAt); INTERN(revision); INTERN(_calcedValue);
+    INTERN(counters); INTERN(lookups); INTERN(hits); INTERN(_inputs); INTERN(_outputs);
+    INTERN(_reads); INTERN(_readValue); INTERN(_computing); INTERN(graph);
+#undef INTERN
+#if PY_MAJOR_VERSION < 3
+    one = PyInt_FromLong(1);
+#else
+    one = PyLong_FromLong(1);
+#endif
+    return one == NULL ? -1 : 0;
+}
+
+#if PY_MAJOR_VERSION >= 3
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_speedups", NULL, -1, methods
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    if (initStrings() < 0)
+        return NULL;
+    return PyModule_Create(&module);
+}
+
+#else
+
+PyMODINIT_FUNC
+init_speedups(void)
+{
+    if (initStrings() < 0)
+        return;
+    Py_InitModule("_speedups", methods);
+}
+
+#endif
@@ -0,0 +1,103 @@
+"""nodes.attribution: Attributing recalculation costs to the changes
+that caused them.
+
+While an Attribution is attached to a graph, every change to a node is
+given a change id, and each calculated value the change invalidates is
+tagged with its cause: the (change id, source node, change) that
+invalidated it.  When a tagged node is next recalculated, the time
+spent in its own calculation (excluding the nodes it reads that had to
+recalculate in turn) is charged to the source node.
+
+    attribution = Attribution(graph, window=300)
+    ...
+    print attribution.report()
+
+lists the inputs whose changes cost the most recalculation over the
+last five minutes.  Only changes that invalidate (rather than lazily
+revision) their outputs are attributed, so attribution applies to the
+Invalidate and Eager propagation strategies.
+
+"""
+import collections
+import time
+
+from .nodes import _nodeLabel
+
+class Attribution(object):
+    """Tags invalidations with their causes and aggregates recalculation
+    time per source node over a sliding window of window seconds.
+
+    """
+    def __init__(self, graph, window=60.0, clock=time.time):
+        if graph.attribution is not None:
+            raise RuntimeError("The graph already has an attribution attached.")
+        self.graph = graph
+        self.window = window
+        self.clock = clock
+        self.changeId = 0
+        self._records = collections.deque()   # (time, cause, node, seconds), oldest first.
+        self._calcs = []                      # [start, child seconds] per calculation in progress.
+        graph.attribution = self
+
+    def close(self):
+        """Stops attributing changes on the graph.
+
+        """
+        self.graph.attribution = None
+
+    def onChange(self, node, change):
+        """Returns the cause with which to tag nodes the change to node
+        invalidates.  Called by the graph.
+
+        """
+        self.changeId += 1
+        return (self.changeId, node, change)
+
+    def beginCalc(self):
+        self._calcs.append([self.clock(), 0.0])
+
+    def endCalc(self, node):
+        start, childSeconds = self._calcs.pop()
+        now = self.clock()
+        elapsed = now - start
+        if self._calcs:
+            self._calcs[-1][1] += elapsed
+        cause, node._cause = node._cause, None
+        if cause is not None:
+            self._records.append((now, cause, node, elapsed - childSeconds))
+            self._prune(now)
+
+    def _prune(self, now):
+        while self._records and self._records[0][0] < now - self.window:
+            self._records.popleft()
+
+    def causeOf(self, node):
+        """Returns the (change id, source node, change) that invalidated
+        the node's calculated value, or None if it is not known.
+
+        """
+        return node._cause
+
+    def costByInput(self):
+        """Returns a list of (source node, seconds, recalculations) for
+        each node whose changes caused recalculation within the window,
+        most expensive first.
+
+        """
+        self._prune(self.clock())
+        costs = {}
+        for now, (changeId, source, change), node, seconds in self._records:
+            total = costs.setdefault(source, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+        return sorted(((source, seconds, count) for source, (seconds, count) in costs.items()),
+                      key=lambda cost: -cost[1])
+
+    def report(self, limit=10):
+        """Returns the costliest inputs within the window as a table.
+
+        """
+        lines = ['%-50s %12s %10s' % ('input', 'seconds', 'recalcs')]
+        for source, seconds, count in self.costByInput()[:limit]:
+            lines.append('%-50s %12.6f %10d' % (_nodeLabel(source)[:50], seconds, count))
+        return '\n'.join(lines)
@@ -0,0 +1,187 @@
+"""nodes.autodiff: Reverse-mode automatic differentiation of graph
+methods.
+
+graph.gradient(target) returns the derivatives of a node's value with
+respect to every settable, numeric node it depends on, from a single
+evaluation rather than one bumped evaluation per input:
+
+    gradient = graph.gradient(book.Value.node())
+    gradient[curve.Rate.node()]
+
+The target is evaluated in a throwaway lazy graph context, within the
+active graph context if there is one, in which each input is overlaid
+by a Var, a number that records the operations made on it.  Everything
+downstream of the inputs is recalculated on Vars (and nothing else is),
+and the derivatives are then accumulated backwards over the recorded
+operations.  The graph itself is left as it was.  Under lazy
+propagation, which lazy contexts do not support, the throwaway context
+is an ordinary one instead.
+
+Graph methods only need to stick to arithmetic and the functions in
+this module (exp, log, sqrt, sin, cos) for their results to be
+differentiable; comparisons (including == and !=) work on the
+underlying values, so control flow is allowed.
+
+"""
+import itertools
+import math
+
+_sequence = itertools.count()    # Numbers Vars in order of creation.
+
+class Var(object):
+    """A number that records how it was calculated.
+
+    """
+    __slots__ = ('value', '_parents', '_sequence')
+
+    def __init__(self, value, parents=()):
+        self.value = value
+        self._parents = parents      # (Var, partial derivative) pairs.
+        self._sequence = next(_sequence)
+
+    def __repr__(self):
+        return 'Var(%r)' % (self.value,)
+
+    def __float__(self):
+        return float(self.value)
+
+    def __add__(self, other):
+        if isinstance(other, Var):
+            return Var(self.value + other.value, ((self, 1.0), (other, 1.0)))
+        return Var(self.value + other, ((self, 1.0),))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Var):
+            return Var(self.value - other.value, ((self, 1.0), (other, -1.0)))
+        return Var(self.value - other, ((self, 1.0),))
+
+    def __rsub__(self, other):
+        return Var(other - self.value, ((self, -1.0),))
+
+    def __mul__(self, other):
+        if isinstance(other, Var):
+            return Var(self.value * other.value, ((self, other.value), (other, self.value)))
+        return Var(self.value * other, ((self, other),))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Var):
+            return Var(self.value / other.value,
+                       ((self, 1.0 / other.value), (other, -self.value / other.value ** 2)))
+        return Var(self.value / other, ((self, 1.0 / other),))
+
+    def __rtruediv__(self, other):
+        return Var(other / self.value, ((self, -other / self.value ** 2),))
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __pow__(self, other):
+        if isinstance(other, Var):
+            value = self.value ** other.value
+            # The derivative with respect to the exponent is undefined
+            # for a base of zero or less; take it as zero.
+            partial = value * math.log(self.value) if self.value > 0 else 0.0
+            return Var(value, ((self, other.value * self.value ** (other.value - 1)),
+                               (other, partial)))
+        return Var(self.value ** other, ((self, other * self.value ** (other - 1)),))
+
+    def __rpow__(self, other):
+        value = other ** self.value
+        return Var(value, ((self, value * math.log(other)),))
+
+    def __neg__(self):
+        return Var(-self.value, ((self, -1.0),))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return self if self.value >= 0 else -self
+
+    def __eq__(self, other):
+        return self.value == _value(other)
+
+    def __ne__(self, other):
+        return self.value != _value(other)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __lt__(self, other):
+        return self.value < _value(other)
+
+    def __le__(self, other):
+        return self.value <= _value(other)
+
+    def __gt__(self, other):
+        return self.value > _value(other)
+
+    def __ge__(self, other):
+        return self.value >= _value(other)
+
+def _value(x):
+    return x.value if isinstance(x, Var) else x
+
+def _unary(function, derivative):
+    def apply(x):
+        if isinstance(x, Var):
+            return Var(function(x.value), ((x, derivative(x.value)),))
+        return function(x)
+    apply.__name__ = function.__name__
+    return apply
+
+exp = _unary(math.exp, math.exp)
+log = _unary(math.log, lambda x: 1.0 / x)
+sqrt = _unary(math.sqrt, lambda x: 0.5 / math.sqrt(x))
+sin = _unary(math.sin, math.cos)
+cos = _unary(math.cos, lambda x: -math.sin(x))
+
+def derivatives(output, variables):
+    """Returns the derivatives of the Var output with respect to each of
+    variables, by accumulating adjoints backwards over the recorded
+    operations.
+
+    """
+    if not isinstance(output, Var):
+        return [0.0] * len(variables)
+    # Find the recorded operations, then visit them latest first: a Var
+    # is always created after its parents, so each is visited only once
+    # everything calculated from it has added to its adjoint.
+    found = {id(output): output}
+    stack = [output]
+    while stack:
+        for parent, partial in stack.pop()._parents:
+            if id(parent) not in found:
+                found[id(parent)] = parent
+                stack.append(parent)
+    adjoints = {id(output): 1.0}
+    for var in sorted(found.values(), key=lambda var: -var._sequence):
+        adjoint = adjoints.get(id(var), 0.0)
+        if adjoint:
+            for parent, partial in var._parents:
+                adjoints[id(parent)] = adjoints.get(id(parent), 0.0) + adjoint * partial
+    return [adjoints.get(id(variable), 0.0) for variable in variables]
+
+def _isNumber(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def gradient(graph, target, inputs=None):
+    """Returns a dict mapping each input node to the derivative of the
+    target node's value with respect to it.  inputs defaults to the
+    settable nodes with numeric values that the target depends on.
+
+    """
+    graph.getValue(target)
+    if inputs is None:
+        inputs = [node for node in graph.upstream(target)
+                  if node.graphMethod.isSettable() and _isNumber(graph.getValue(node))]
+    variables = [Var(graph.getValue(input)) for input in inputs]
+    with graph._scratchContext():
+        for input, variable in zip(inputs, variables):
+            graph.overlayValue(input, variable)
+        output = graph.getValue(target)
+    return dict(zip(inputs, derivatives(output, variables)))
@@ -0,0 +1,182 @@
+"""nodes.changelog: Ordered logs of graph changes, and replicas that
+replay them.
+
+A ChangeLog attached to a writer's graph records every change made to
+its nodes (sets, overlays applied or removed by graph contexts, clears
+and invalidations) as a stream of compact, pickled records.  A Replica
+in another process replays the stream onto its own, read-only graph,
+keeping its node state in step with the writer's while memoizing and
+serving reads independently.
+
+Objects are identified across processes by keys assigned through an
+ObjectRegistry, which the writer and its replicas populate alike:
+
+    registry = ObjectRegistry()
+    registry.register('usd', Curve())
+
+    log = ChangeLog(graph, registry, open('changes.log', 'wb'))
+
+and, in the replica's process:
+
+    replica = Replica(graph, registry)
+    replica.follow(open('changes.log', 'rb'))
+
+"""
+import pickle
+
+# Record codes.  A DEFINE record assigns a number to a node, identified by
+# (object key, method name, args), the first time it changes; change
+# records refer to the node by that number.  A SET_VALUES record, for a
+# batch of sets made as one change (see Graph.applyChanges), has no node
+# number; its value is a list of (node number, value) pairs.
+#
+DEFINE        = 0
+SET_VALUE     = 1
+CLEAR_SET     = 2
+OVERLAY_VALUE = 3
+CLEAR_OVERLAY = 4
+INVALIDATE    = 5
+SET_VALUES    = 6
+
+_codes = {
+    'setValue': SET_VALUE,
+    'clearSet': CLEAR_SET,
+    'overlayValue': OVERLAY_VALUE,
+    'clearOverlay': CLEAR_OVERLAY,
+    'invalidate': INVALIDATE,
+    'setValues': SET_VALUES,
+    }
+
+class ObjectRegistry(object):
+    """A two-way mapping between GraphObjects and keys identifying them
+    across processes.
+
+    """
+    def __init__(self):
+        self._objects = {}
+        self._keys = {}
+
+    def register(self, key, graphObject):
+        self._objects[key] = graphObject
+        self._keys[id(graphObject)] = key
+
+    def keyOf(self, graphObject):
+        """Returns the key of a registered object, or raises KeyError.
+
+        """
+        return self._keys[id(graphObject)]
+
+    def lookup(self, key):
+        return self._objects[key]
+
+class ChangeLog(object):
+    """Records the changes made to a graph's nodes, in order, to a stream.
+
+    Each record is a tuple (sequence number, code, node number, value)
+    pickled to the stream as soon as the change is made.  Only changes
+    to nodes of registered objects are recorded.
+
+    """
+    def __init__(self, graph, registry, stream):
+        self.graph = graph
+        self.registry = registry
+        self.stream = stream
+        self.sequence = 0
+        self._numbers = {}
+        graph.changeListeners.append(self.onNodeChanged)
+
+    def close(self):
+        """Stops recording changes.
+
+        """
+        self.graph.changeListeners.remove(self.onNodeChanged)
+
+    def _write(self, code, number, value=None):
+        self.sequence += 1
+        pickle.dump((self.sequence, code, number, value), self.stream, 2)
+
+    def _number(self, node):
+        """Returns the node's number, defining it if need be, or None if
+        the node's object is not registered.
+
+        """
+        number = self._numbers.get(node)
+        if number is None:
+            try:
+                key = self.registry.keyOf(node.graphObject)
+            except KeyError:
+                return None
+            number = self._numbers[node] = len(self._numbers)
+            self._write(DEFINE, number, (key, node.graphMethod.name, node.args))
+        return number
+
+    def onNodeChanged(self, node, change, value):
+        if change == 'setValues':
+            numbered = [(self._number(node), value) for node, value in value]
+            numbered = [(number, value) for number, value in numbered if number is not None]
+            if not numbered:
+                return
+            self._write(SET_VALUES, None, numbered)
+        else:
+            number = self._number(node)
+            if number is None:
+                return
+            self._write(_codes[change], number, value)
+        if hasattr(self.stream, 'flush'):
+            self.stream.flush()
+
+class Replica(object):
+    """Replays a change log onto a graph, which is made read-only to
+    its users.
+
+    """
+    def __init__(self, graph, registry):
+        self.graph = graph
+        self.registry = registry
+        self.sequence = 0
+        self._nodes = {}
+        graph.readOnly = True
+
+    def apply(self, record):
+        """Applies a single change log record.
+
+        Raises an exception if records are applied out of order.
+
+        """
+        sequence, code, number, value = record
+        if sequence != self.sequence + 1:
+            raise RuntimeError("Expected change %d but got %d." % (self.sequence + 1, sequence))
+        self.sequence = sequence
+        if code == DEFINE:
+            key, name, args = value
+            method = getattr(self.registry.lookup(key), name)
+            self._nodes[number] = method.node(*args)
+            return
+        if code == SET_VALUES:
+            self.graph._setValues([(self._nodes[number], value) for number, value in value])
+            return
+        node = self._nodes[number]
+        if code == SET_VALUE:
+            node.setValue(value)
+        elif code == CLEAR_SET:
+            node.clearSet()
+        elif code == OVERLAY_VALUE:
+            node.overlayValue(value)
+        elif code == CLEAR_OVERLAY:
+            node.clearOverlay()
+        elif code == INVALIDATE:
+            node.graph.invalidate(node)
+
+    def follow(self, stream):
+        """Applies every record remaining in the stream and returns the
+        number applied.
+
+        """
+        applied = 0
+        while True:
+            try:
+                record = pickle.load(stream)
+            except EOFError:
+                return applied
+            self.apply(record)
+            applied += 1
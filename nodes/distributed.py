@@ -0,0 +1,415 @@
+"""nodes.distributed: Partitioning GraphObjects across graph servers.
+
+Each partition is a GraphServer owning a set of GraphObjects, registered
+under ids unique within the partition.  Objects in one partition refer
+to objects in another through RemoteObject proxies, whose graph methods
+fetch their values from the owning partition.  Each proxy method call
+is a node on the local graph, so the fetched value is memoized locally
+and local nodes depend on it like any other.
+
+When a value read remotely is invalidated, the owning server queues the
+invalidation for the partition that read it.  A Cluster, which is the
+client's own endpoint, drains these queues after each change and
+forwards them in batches, partition by partition, until no
+invalidations remain.
+
+For example, with positions in partition 'a' and the book that sums
+them in partition 'b', all in a single process:
+
+    a, b = GraphServer('a'), GraphServer('b', peers={'a': LocalTransport(a)})
+    a.register('pos1', Position())
+    b.register('book', Book(Positions=[b.proxy('a', 'pos1')]))
+
+    cluster = Cluster({'a': LocalTransport(a), 'b': LocalTransport(b)})
+    cluster.proxy('b', 'book').Value()
+    cluster.proxy('a', 'pos1').Quantity = 10     # Invalidates the book's value.
+
+Servers in other processes are run with serve(), or a GraphService
+that can be closed, and reached through a SocketTransport, both given
+the same authkey.
+
+Partitions rely on the default (invalidate) propagation strategy.
+
+"""
+import collections
+import errno
+import pickle
+import threading
+
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from . import nodes
+
+class LocalTransport(object):
+    """An in-process stand-in for a connection to a GraphServer.
+
+    Messages and replies are pickled on the way through, so values are
+    copied just as they would be over a socket, and the server runs
+    outside of whatever computation made the request.
+
+    """
+    def __init__(self, server):
+        self.server = server
+
+    def request(self, messages):
+        """Sends a batch of messages and returns their replies.
+
+        """
+        graph = self.server.graph
+        activeNode, graph.activeNode = graph.activeNode, None
+        computing, nodes._computing.graph = nodes._computing.graph, None
+        try:
+            replies = []
+            for message in messages:
+                reply = self.server.handle(pickle.loads(pickle.dumps(message, 2)))
+                replies.append(pickle.loads(pickle.dumps(reply, 2)))
+            return replies
+        finally:
+            graph.activeNode = activeNode
+            nodes._computing.graph = computing
+
+class SocketTransport(object):
+    """A connection to a GraphServer run by serve() in another process.
+
+    The connection is opened on first use.  Messages in a batch are
+    all sent before any reply is read, so a batch costs one round trip.
+    authkey must be the one the server was run with.
+
+    """
+    def __init__(self, address, authkey):
+        if not authkey:
+            raise RuntimeError("A SocketTransport needs an authkey.")
+        self.address = address
+        self.authkey = authkey
+        self._connection = None
+
+    def request(self, messages):
+        if self._connection is None:
+            self._connection = Client(self.address, authkey=self.authkey)
+        for message in messages:
+            self._connection.send(message)
+        return [self._connection.recv() for message in messages]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class RemoteMethod(nodes.GraphInstanceMethod):
+    """A graph method of a RemoteObject.
+
+    Reading it yields a local node whose value is fetched from the
+    owning partition; setting or clearing it changes the remote node.
+
+    """
+    def setValue(self, value, *args):
+        self.graphObject._endpoint._change(self.graphObject, ('set', self.name, args, value))
+
+    def clearSet(self, *args):
+        self.graphObject._endpoint._change(self.graphObject, ('clearSet', self.name, args))
+
+def _fetcher(name):
+    def fetch(proxy, *args):
+        return proxy._endpoint._fetch(proxy, name, args)
+    return fetch
+
+class RemoteObject(nodes.GraphObject):
+    """A proxy for a GraphObject owned by another partition.
+
+    Create proxies with GraphServer.proxy (or Cluster.proxy).
+
+    """
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = RemoteMethod(self, nodes.GraphMethod(_fetcher(name), name))
+        object.__setattr__(self, name, method)
+        return method
+
+    def __setattr__(self, name, value):
+        getattr(self, name).setValue(value)
+
+    def __repr__(self):
+        return '<RemoteObject %s:%s>' % (self._partitionId, self._objectId)
+
+class RemoteError(RuntimeError):
+    """Raised when a request fails on the server handling it.  The
+    server-side exception is available as the cause attribute.
+
+    """
+    def __init__(self, cause):
+        RuntimeError.__init__(self, '%s: %s' % (cause.__class__.__name__, cause))
+        self.cause = cause
+
+def _unwrap(reply):
+    status, value = reply
+    if status == 'error':
+        raise RemoteError(value)
+    return value
+
+class GraphServer(object):
+    """A graph partition: serves the values of its registered objects
+    to other partitions, and holds proxies for objects it reads from
+    other partitions.
+
+    peers maps partition ids to transports for reaching them.  graph is
+    the graph the partition's objects and proxies live on, by default
+    the current default graph (see nodes.defaultGraph); partitions in one
+    process can share a graph or each have their own.
+
+    """
+    def __init__(self, partitionId, peers=None, graph=None):
+        self.partitionId = partitionId
+        self.peers = dict(peers or {})
+        self.graph = graph or nodes.defaultGraph()
+        self._objects = {}                              # Registered objects by id.
+        self._proxies = {}                              # Proxies by (partition id, object id).
+        self._keys = {}                                 # Served nodes to their remote keys.
+        self._subscribers = {}                          # Served nodes to the partitions that read them.
+        self._pending = collections.defaultdict(list)   # Invalidated keys by subscribing partition.
+        self._prefetched = {}                           # Values fetched ahead of being read.
+
+    def register(self, objectId, graphObject):
+        """Makes a GraphObject on the partition's graph available to
+        other partitions.
+
+        """
+        if graphObject._graph is not self.graph:
+            raise RuntimeError("%r is not on the partition's graph." % (graphObject,))
+        self._objects[objectId] = graphObject
+
+    def proxy(self, partitionId, objectId):
+        """Returns a proxy for an object owned by another partition.
+
+        """
+        key = (partitionId, objectId)
+        if key not in self._proxies:
+            proxy = RemoteObject(graph=self.graph)
+            object.__setattr__(proxy, '_endpoint', self)
+            object.__setattr__(proxy, '_partitionId', partitionId)
+            object.__setattr__(proxy, '_objectId', objectId)
+            self._proxies[key] = proxy
+        return self._proxies[key]
+
+    # Requests made of other partitions.
+
+    def _request(self, partitionId, messages):
+        return [_unwrap(reply) for reply in self.peers[partitionId].request(messages)]
+
+    def _fetch(self, proxy, name, args):
+        key = (proxy._partitionId, proxy._objectId, name, args)
+        if key in self._prefetched:
+            return self._prefetched.pop(key)
+        return self._request(proxy._partitionId, [('get', self.partitionId, proxy._objectId, name, args)])[0]
+
+    def _change(self, proxy, change):
+        self._request(proxy._partitionId, [change[:1] + (proxy._objectId,) + change[1:]])
+
+    def prefetch(self, calls):
+        """Fetches the values of many remote calls at once, one pipelined
+        batch per partition, so that reading them costs no further
+        round trips.  calls is a sequence of (remoteMethod, args) pairs.
+
+        Calls whose values are already memoized locally are skipped.
+
+        """
+        batches = collections.defaultdict(list)
+        for method, args in calls:
+            if method.node(*args).isValid():
+                continue
+            proxy = method.graphObject
+            batches[proxy._partitionId].append((proxy._objectId, method.name, tuple(args)))
+        for partitionId, batch in batches.items():
+            values = self._request(partitionId, [('get', self.partitionId) + call for call in batch])
+            for call, value in zip(batch, values):
+                self._prefetched[(partitionId,) + call] = value
+
+    # Requests made by other partitions.
+
+    def handle(self, message):
+        """Handles a request from another partition, returning a
+        ('ok', value) or ('error', exception) reply.
+
+        """
+        try:
+            return 'ok', getattr(self, '_handle_' + message[0])(*message[1:])
+        except Exception as e:
+            return 'error', e
+
+    def _handle_get(self, subscriberId, objectId, name, args):
+        method = getattr(self._objects[objectId], name)
+        node = method.node(*args)
+        value = method(*args)
+        self._keys[node] = (self.partitionId, objectId, name, args)
+        self._subscribers.setdefault(node, set()).add(subscriberId)
+        return value
+
+    def _handle_set(self, objectId, name, args, value):
+        method = getattr(self._objects[objectId], name)
+        self._changing(method.node(*args), lambda: method.setValue(value, *args))
+
+    def _handle_clearSet(self, objectId, name, args):
+        method = getattr(self._objects[objectId], name)
+        self._changing(method.node(*args), lambda: method.clearSet(*args))
+
+    def _handle_invalidate(self, keys):
+        """Invalidates the local nodes of proxies for the specified
+        remote keys.
+
+        """
+        for partitionId, objectId, name, args in keys:
+            proxy = self._proxies.get((partitionId, objectId))
+            if proxy is None:
+                continue
+            self._prefetched.pop((partitionId, objectId, name, args), None)
+            node = getattr(proxy, name).node(*args)
+            graph = node._graph
+            self._changing(node, lambda: graph.invalidate(node))
+
+    def _handle_drain(self):
+        """Returns and forgets the invalidations queued for each
+        subscribing partition.
+
+        """
+        pending = dict(self._pending)
+        self._pending.clear()
+        return pending
+
+    def _changing(self, node, change):
+        """Applies a change to a node, queueing invalidations of any
+        served nodes it affects for the partitions that read them.
+
+        """
+        affected = [node]
+        affected.extend(node._graph.invalidatedBy(node))
+        change()
+        for served in affected:
+            subscribers = self._subscribers.pop(served, None)
+            if subscribers:
+                key = self._keys[served]
+                for subscriberId in subscribers:
+                    self._pending[subscriberId].append(key)
+
+class Cluster(GraphServer):
+    """The client's endpoint onto a set of partitions.
+
+    Changes made through the cluster's proxies are forwarded to their
+    owning partitions, after which the resulting invalidations are
+    propagated across all partitions, including the client's own
+    proxies.
+
+    """
+    def __init__(self, transports, clientId='client', graph=None):
+        GraphServer.__init__(self, clientId, peers=transports, graph=graph)
+
+    def _change(self, proxy, change):
+        GraphServer._change(self, proxy, change)
+        self.propagate()
+
+    def propagate(self):
+        """Forwards queued invalidations between partitions, in batches,
+        until none remain.
+
+        """
+        while True:
+            batches = collections.defaultdict(list)
+            for partitionId in self.peers:
+                for subscriberId, keys in self._request(partitionId, [('drain',)])[0].items():
+                    batches[subscriberId].extend(keys)
+            for subscriberId, keys in self._handle_drain().items():
+                batches[subscriberId].extend(keys)
+            if not batches:
+                return
+            for subscriberId, keys in batches.items():
+                if subscriberId == self.partitionId:
+                    self._handle_invalidate(keys)
+                else:
+                    self._request(subscriberId, [('invalidate', keys)])
+
+def _isConnectionFailure(e):
+    """Returns True if e is the failure of a single connection (to
+    authenticate, or by closing early), rather than of the listener.
+
+    """
+    if isinstance(e, (AuthenticationError, EOFError)):
+        return True
+    # Python 3 raises ConnectionError for these, and Python 2 socket.error.
+    return getattr(e, 'errno', None) in (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
+
+class GraphService(object):
+    """Serves requests for a GraphServer on address, to clients that
+    know authkey, handling each connection on its own thread.
+
+    Messages are unpickled, so a service cannot run without an authkey;
+    connections that fail to authenticate are dropped.  address is the
+    address actually listened on, which tells the port when given 0.
+
+    The graph is single threaded, so requests are handled one at
+    a time.
+
+    """
+    def __init__(self, server, address, authkey):
+        if not authkey:
+            raise RuntimeError("You cannot serve a graph without an authkey.")
+        self.server = server
+        self.authkey = authkey
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def run(self):
+        """Accepts connections until the service is closed.
+
+        """
+        try:
+            while not self._closed:
+                try:
+                    connection = self._listener.accept()
+                except Exception as e:
+                    if self._closed or _isConnectionFailure(e):
+                        continue
+                    raise
+                if self._closed:
+                    connection.close()
+                    return
+                thread = threading.Thread(target=self._handleConnection, args=(connection,))
+                thread.daemon = True
+                thread.start()
+        finally:
+            self._listener.close()
+
+    def close(self):
+        """Stops run(), waking it with a connection of the service's own.
+        Connections already accepted are served until their clients
+        close them.
+
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except Exception:
+            pass        # run() has already stopped listening.
+
+    def _handleConnection(self, connection):
+        try:
+            while True:
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    return
+                with self._lock:
+                    reply = self.server.handle(message)
+                connection.send(reply)
+        finally:
+            connection.close()
+
+def serve(server, address, authkey):
+    """Serves requests for a GraphServer on address (see GraphService).
+    Does not return.
+
+    """
+    GraphService(server, address, authkey).run()
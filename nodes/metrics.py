@@ -0,0 +1,66 @@
+"""nodes.metrics: Exporting a graph's counters to monitoring systems.
+
+Every graph keeps running counts of the work it does (see
+Graph.stats).  An exporter is any callable taking a stats snapshot;
+those appended to a graph's statsExporters are called each time the
+graph's exportStats() is.  TextfileExporter writes the snapshot in the
+Prometheus text exposition format, for a local scraper (such as the
+node exporter's textfile collector) to pick up:
+
+    graph.statsExporters.append(TextfileExporter('/var/lib/metrics/nodes.prom',
+                                                 labels={'service': 'pricing'}))
+    ...
+    graph.exportStats()    # Periodically, from the application's own loop.
+
+"""
+import os
+import re
+
+# Stats that are levels rather than running totals.
+#
+_gauges = frozenset(['maxInvalidationWalk', 'nodes'])
+
+def _metricName(prefix, name):
+    return prefix + re.sub('([a-z0-9])([A-Z])', r'\1_\2', name).lower()
+
+def _labelText(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                             for key, value in sorted(labels.items()))
+
+def prometheusText(stats, prefix='nodes_', labels=None):
+    """Returns a stats snapshot in the Prometheus text exposition
+    format.  Running totals are exported as counters named with a
+    _total suffix, levels as gauges.
+
+    """
+    lines = []
+    labelText = _labelText(labels)
+    for name in sorted(stats):
+        metric = _metricName(prefix, name)
+        if name in _gauges:
+            kind = 'gauge'
+        else:
+            kind, metric = 'counter', metric + '_total'
+        lines.append('# TYPE %s %s' % (metric, kind))
+        lines.append('%s%s %s' % (metric, labelText, stats[name]))
+    return '\n'.join(lines) + '\n'
+
+class TextfileExporter(object):
+    """Writes each snapshot to a file in the Prometheus text format.
+
+    The file is replaced atomically, so a scraper never reads a
+    partial snapshot.
+
+    """
+    def __init__(self, path, prefix='nodes_', labels=None):
+        self.path = path
+        self.prefix = prefix
+        self.labels = labels
+
+    def __call__(self, stats):
+        temporary = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(temporary, 'w') as f:
+            f.write(prometheusText(stats, self.prefix, self.labels))
+        os.rename(temporary, self.path)
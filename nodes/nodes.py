@@ -1,49 +1,482 @@
 """nodes: An easy-to-use graph-oriented programming model for Python.
 
 """
+# Only what the core engine needs is imported here, so that importing
+# nodes stays cheap; anything used off the hot path is imported where
+# it is used, as are the optional subsystems (see nodes/__init__.py).
+#
 import collections
-import copy
+import heapq
+import time
 import types
 
+try:
+    from _thread import get_ident as _threadId, _local
+except ImportError:
+    from thread import get_ident as _threadId, _local
+
+from .speedups import readValue as _readValue, _computing
+
 Settable     = 0x1
 Serializable = 0x2
 Saved        = Settable | Serializable
 Overlayable  = 0x4
+NoMemo       = 0x8
+Revalidate   = 0x10
+
+# Propagation strategies.  See Graph.setPropagation.
+#
+Invalidate = 'invalidate'
+Lazy       = 'lazy'
+Eager      = 'eager'
+
+class GraphCycleError(RuntimeError):
+    """Raised when a node's value depends on itself, either directly or
+    through other nodes.
+
+    The nodes attribute holds the cycle as a list of nodes, each
+    depending on the next, starting and ending with the same node.
+
+    """
+    def __init__(self, nodes):
+        RuntimeError.__init__(self)
+        self.nodes = list(nodes)
+
+    def _unwind(self, node):
+        """Adds a node being computed to the front of the path as the error
+        propagates out of its computation, until the cycle is closed.
+
+        """
+        if len(self.nodes) > 1 and self.nodes[0] is self.nodes[-1]:
+            return
+        self.nodes.insert(0, node)
+
+    def __str__(self):
+        return 'Cycle detected: %s' % ' -> '.join(_nodeLabel(node) for node in self.nodes)
+
+class GraphCounters(object):
+    """Running totals of the work done by a graph, kept cheaply enough to
+    be always on.
+
+        * lookups               Node lookups.
+        * creations             Nodes created by lookups.
+        * hits                  Node reads answered without calculating.
+        * misses                Node reads that had to calculate.
+        * calcs                 Calculations, including those made to
+                                keep nodes current in eager mode.
+        * invalidations         Calculated values invalidated by changes.
+        * invalidationWalks     Walks over the outputs of changed nodes.
+        * invalidationWalkNodes Nodes visited by those walks.
+        * maxInvalidationWalk   The most nodes visited by a single walk.
+        * contextEnters         Graph context entries.
+        * contextExits          Graph context exits.
+        * overlaysApplied       Overlays applied to nodes.
+
+    """
+    __slots__ = ('lookups', 'creations', 'hits', 'misses', 'calcs',
+                 'invalidations', 'invalidationWalks', 'invalidationWalkNodes',
+                 'maxInvalidationWalk', 'contextEnters', 'contextExits',
+                 'overlaysApplied')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def snapshot(self):
+        """Returns the current counts as a dict keyed by counter name.
+
+        """
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+def _exclusive(method):
+    """Makes a method of a graph (or of an object with a _graph) run
+    exclusively of other threads' operations on the graph, if the graph
+    has a lock.
+
+    """
+    def exclusive(self, *args):
+        graph = getattr(self, '_graph', self)
+        if graph.lock is None or graph._lockOwner == _threadId():
+            return method(self, *args)
+        return graph._runExclusively(method, self, *args)
+    exclusive.__name__ = method.__name__
+    exclusive.__doc__ = method.__doc__
+    return exclusive
 
 class Graph(object):
     """A directed, acyclic graph of nodes.
 
     """
     def __init__(self):
-        self.nodes = {}
+        self.graphObjects = set()                      # Objects with nodes; each indexes its own, see lookupNode.
+        self.nodeCount = 0
         self.activeNode = None                         # The active node during a computation.
         self.activeGraphContext = None                 # The currently active context.
-        self.rootGraphLayer = GraphLayer()             # The top level graph layer.
+        self.rootGraphLayer = GraphLayer(self)         # The top level graph layer.
         self.activeGraphLayer = self.rootGraphLayer    # The currently active graph layer.
-        self.activeOverlay = self.rootGraphLayer._activeOverlay
+        self.activeOverlay = self.rootGraphLayer._rootOverlay
+        self._activeScope = None                       # The lazy context, layer or overlay reads resolve in.
+        self.propagation = Invalidate
+        self.revision = 0                              # Bumped by each change in lazy mode.
+        self.subscriptions = set()                     # Nodes kept up to date in eager mode.
+        self._expiring = set()                         # Cache policies whose values can expire.
+        self.changeListeners = []                      # Called with (node, change, value) on each change.
+        self.eventListeners = []                       # Called with (event, subject, value) on each user operation.
+        self.readOnly = False                          # If True, users cannot set or clear values.
+        self.valueStore = None                         # Adopts calculated values; see nodes.sharedmem.
+        self.counters = GraphCounters()                # Hot path instrumentation; see stats().
+        self.statsExporters = []                       # Called with a stats() snapshot by exportStats().
+        self.tracer = None                             # Records each read while tracing; see trace().
+        self.attribution = None                        # Attributes recalculation costs; see nodes.attribution.
+        self.changeCount = 0                           # Bumped by every change to a node.
+        self.lock = None                               # If set, serializes operations across threads; see nodes.precompute.
+        self._lockOwner = None                         # The thread holding the lock.
+        self._scheduler = None                         # Orders evaluate() requests; see nodes.scheduler.
+        self.revalidator = None                        # Recalculates stale Revalidate nodes; see nodes.revalidate.
+
+    def _runExclusively(self, function, *args):
+        """Calls function holding the graph's lock.
+
+        Top-level operations (reads, changes, and entering or exiting
+        contexts, layers and overlays) take the lock when the graph has
+        one, so that a graph can be shared with a background thread.
+        Nested operations run under the lock already held.
 
-    def onNodeChanged(self, node):
-        outputs = node.outputs
-        for output in outputs:
-            if output.valid:
-                output._flags &= ~output.VALID
-                self.onNodeChanged(output)
+        """
+        with self.lock:
+            self._lockOwner = _threadId()
+            try:
+                return function(*args)
+            finally:
+                self._lockOwner = None
+
+    def runExclusively(self, function, *args):
+        """Calls function, holding the graph's lock if it has one and the
+        current thread does not hold it already.  For threads sharing
+        the graph (see nodes.precompute and nodes.revalidate).
+
+        """
+        if self.lock is None or self._lockOwner == _threadId():
+            return function(*args)
+        return self._runExclusively(function, *args)
+
+    def shareWithThreads(self):
+        """Gives the graph a lock, if it has none, so that it can be
+        shared with background threads.
+
+        """
+        if self.lock is None:
+            import threading
+            self.lock = threading.RLock()
+
+    def isQuiet(self):
+        """Returns True if no graph context, layer or overlay is in use,
+        so that values calculated now are the graph's own.
+
+        """
+        return (self.activeGraphContext is None and self._activeScope is None
+                and self.activeGraphLayer is self.rootGraphLayer)
+
+    def activate(self):
+        """Makes the graph the current thread's default graph (see
+        defaultGraph) until the returned context manager exits:
+
+            with graph.activate():
+                o = Example()       # Bound to graph.
+
+        """
+        return _GraphActivation(self)
+
+    def stats(self):
+        """Returns a snapshot of the graph's counters, plus the number of
+        nodes it currently holds, as a dict.  See GraphCounters.
+
+        """
+        stats = self.counters.snapshot()
+        stats['nodes'] = self.nodeCount
+        return stats
+
+    def trace(self):
+        """Returns a Trace (see nodes.tracing) that records every node
+        read on the graph while it is active:
+
+            with graph.trace() as t:
+                o.X()
+            t.writeChromeTrace(open('x.json', 'w'))
+
+        """
+        from .tracing import Trace
+        return Trace(self)
+
+    def exportStats(self):
+        """Passes a stats() snapshot to each of the graph's stats
+        exporters (see nodes.metrics) and returns it.
+
+        """
+        stats = self.stats()
+        for exporter in self.statsExporters:
+            exporter(stats)
+        return stats
+
+    @_exclusive
+    def setPropagation(self, propagation):
+        """Sets how changes to nodes propagate to their outputs.
+
+            * Invalidate    (The default.)  A change invalidates the
+                            calculated values downstream of the node,
+                            which are recomputed when next read.
+            * Lazy          A change only bumps the graph revision.  A
+                            calculated node read at a later revision
+                            first checks whether any of its inputs
+                            changed since it was last verified, so a
+                            change costs O(1) however large its fan-out,
+                            and the cost of validation is paid on read.
+            * Eager         As Invalidate, but subscribed nodes that were
+                            invalidated are recomputed as soon as the
+                            change completes.
+
+        """
+        if propagation not in (Invalidate, Lazy, Eager):
+            raise RuntimeError("Unknown propagation strategy: %r" % (propagation,))
+        if self.isComputing():
+            raise RuntimeError("You cannot change propagation during graph evaluation.")
+        if propagation == Lazy and self._activeScope is not None:
+            raise RuntimeError("You cannot use lazy propagation within a lazy graph context, layer or overlay.")
+        if propagation == Lazy and self.propagation != Lazy:
+            # Everything calculated is current; start verifying from here.
+            for node in self.allNodes():
+                node._verifiedAt = self.revision
+        elif propagation != Lazy and self.propagation == Lazy:
+            # Invalidation relies on calculated nodes being current, so
+            # drop anything not verified since the last change.
+            for node in self.allNodes():
+                if node._isCalced and node._verifiedAt != self.revision:
+                    node._invalidateCalc()
+        self.propagation = propagation
+        self.pushChanges()
+
+    @_exclusive
+    def subscribe(self, node):
+        """Keeps the node's value current in eager mode.
+
+        """
+        self.subscriptions.add(node)
+
+    @_exclusive
+    def unsubscribe(self, node):
+        self.subscriptions.discard(node)
+
+    def onNodeChanged(self, node, change, value=None):
+        """Propagates a change to the node's value according to the
+        propagation strategy, then notifies any change listeners.
+
+        change names the operation: one of 'setValue', 'clearSet',
+        'overlayValue', 'clearOverlay' or 'invalidate'.  value is the
+        new value for a set or overlay.  (Change listeners are also
+        called with change 'setValues' by onNodesSet.)
+
+        """
+        self.changeCount += 1
+        if self.propagation == Lazy:
+            self.revision += 1
+            node._changedAt = self.revision
+        elif self.attribution is not None:
+            cause = self.attribution.onChange(node, change)
+            if change == 'invalidate':
+                node._cause = cause
+            node._invalidateOutputCalcs(cause)
+        else:
+            node._invalidateOutputCalcs()
+        if self.changeListeners:
+            for listener in self.changeListeners:
+                listener(node, change, value)
+
+    def onNodesSet(self, changes):
+        """Propagates the setting of many nodes, given as a list of
+        (node, value) pairs, as a single change: in invalidate and eager
+        modes, one invalidation walk over the outputs of them all.
+        Change listeners are notified once, with node None, change
+        'setValues' and value the list of pairs.
+
+        """
+        self.changeCount += 1
+        if self.propagation == Lazy:
+            self.revision += 1
+            for node, value in changes:
+                node._changedAt = self.revision
+        elif self.attribution is not None:
+            self._invalidateOutputs([(node, self.attribution.onChange(node, 'setValue'))
+                                     for node, value in changes])
+        else:
+            self._invalidateOutputs([(node, None) for node, value in changes])
+        if self.changeListeners:
+            for listener in self.changeListeners:
+                listener(None, 'setValues', changes)
+
+    def _invalidateOutputs(self, sources):
+        """Invalidates any outputs calculated from the nodes of sources,
+        a list of (node, cause) pairs, tagging each with the cause of a
+        source it was calculated from, in a single walk.
+
+        The walk is iterative and stops at nodes that are already
+        invalid (their outputs were invalidated along with them) and
+        at set or overlaid nodes (their outputs do not depend on
+        their calculated value), so each edge is followed at most once.
+        Evicted nodes are invalid but their outputs may not be, so the
+        walk continues through them.
+
+        """
+        outputs = [(output, cause) for node, cause in sources for output in node._outputs]
+        visited = invalidated = 0
+        while outputs:
+            output, cause = outputs.pop()
+            visited += 1
+            if output._isCalced:
+                output._invalidateCalc()
+                output._cause = cause
+                invalidated += 1
+            elif output._flags & output.EVICTED:
+                output._flags &= ~output.EVICTED
+            else:
+                continue
+            if not (output._isSet or output._isOverlaid):
+                outputs.extend((downstream, cause) for downstream in output._outputs)
+        counters = self.counters
+        counters.invalidationWalks += 1
+        counters.invalidationWalkNodes += visited
+        counters.invalidations += invalidated
+        if visited > counters.maxInvalidationWalk:
+            counters.maxInvalidationWalk = visited
+
+    def pushChanges(self):
+        """In eager mode, recomputes any subscribed nodes invalidated
+        by changes made so far.  Does nothing in other modes.
+
+        """
+        if self.propagation != Eager or self.isComputing():
+            return
+        if self._activeScope is not None:
+            return
+        for node in list(self.subscriptions):
+            if not node.isValid():
+                self.getValue(node)
+
+    def _verify(self, node):
+        """Brings the inputs a calculated node read when last calculated
+        up to date, in the order it read them, and returns True if none
+        of them changed since the node was last verified.
+
+        Stops at the first input that changed, as the node must then be
+        recalculated, and will read whatever inputs it now needs: one
+        that an earlier input has made irrelevant (say, by switching a
+        branch) is never brought up to date.
+
+        Used in lazy mode; node must be the active node.
+
+        """
+        reads = node._reads
+        node._reads = []        # Not to be recorded again by the reads below.
+        try:
+            for input in reads:
+                self.getValue(input)
+                if input._changedAt > node._verifiedAt:
+                    return False
+        finally:
+            node._reads = reads
+        node._verifiedAt = self.revision
+        return True
 
     def lookupNode(self, graphInstanceMethod, args, create=True):
         """Returns the Node underlying the given object and its method
         as called with the specified arguments.
 
+        Nodes are indexed on the graph instance method itself: the node
+        for a call without arguments in a slot, and any others in a dict
+        keyed by their arguments (see GraphMethod.keyArgs).  So a lookup
+        hashes only the arguments, and an object's nodes go when it does
+        (see removeObject).
+
+        Finding an existing node takes no lock.  Creating one takes the
+        graph's lock, if it has one, so that threads reading the same
+        call at once all get the same node.
+
         """
-        key = (graphInstanceMethod.graphObject, graphInstanceMethod.name) + args
-        if key not in self.nodes and create:
-            self.nodes[key] = Node(graphInstanceMethod.graphObject, graphInstanceMethod.graphMethod, args)
-        return self.nodes.get(key)
+        self.counters.lookups += 1
+        if args:
+            nodes = graphInstanceMethod._nodes
+            node = nodes.get(graphInstanceMethod.graphMethod.keyArgs(args)) if nodes is not None else None
+        else:
+            node = graphInstanceMethod._node
+        if node is None:
+            if not create:
+                return None
+            if graphInstanceMethod._graph is not self:
+                raise RuntimeError("%r belongs to another graph." % (graphInstanceMethod.graphObject,))
+            if self.lock is not None and self._lockOwner != _threadId():
+                return self._runExclusively(self._addNode, graphInstanceMethod, args)
+            return self._addNode(graphInstanceMethod, args)
+        if node._graph is not self:
+            raise RuntimeError("%r belongs to another graph." % (node,))
+        return node
 
-    def _lookupNode(self, graphInstanceMethod, args=(), create=True):
-        raise NotImplementedError()
+    def _addNode(self, graphInstanceMethod, args):
+        """Creates and indexes the node for a call, unless another thread
+        did so first, and returns it.  Called holding the graph's lock,
+        if it has one.
+
+        """
+        if args:
+            key = graphInstanceMethod.graphMethod.keyArgs(args)
+            nodes = graphInstanceMethod._nodes
+            node = nodes.get(key) if nodes is not None else None
+        else:
+            node = graphInstanceMethod._node
+        if node is not None:
+            return node
+        self.counters.creations += 1
+        node = Node(graphInstanceMethod.graphObject, graphInstanceMethod.graphMethod, args, graph=self)
+        if not args:
+            graphInstanceMethod._node = node
+        elif nodes is None:
+            graphInstanceMethod._nodes = {key: node}
+        else:
+            nodes[key] = node
+        self.graphObjects.add(graphInstanceMethod.graphObject)
+        self.nodeCount += 1
+        return node
+
+    def allNodes(self):
+        """Yields every node in the graph.
+
+        """
+        for graphObject in list(self.graphObjects):
+            for graphInstanceMethod in graphObject._graphInstanceMethods():
+                if graphInstanceMethod._node is not None:
+                    yield graphInstanceMethod._node
+                if graphInstanceMethod._nodes:
+                    for node in list(graphInstanceMethod._nodes.values()):
+                        yield node
+
+    def _readValue(self, graphInstanceMethod, args):
+        """Returns the value of the graph instance method called with
+        args.  The full read path behind nodes.speedups.readValue.
+
+        """
+        graphMethod = graphInstanceMethod.graphMethod
+        if graphMethod.flags & NoMemo:
+            return graphMethod(graphInstanceMethod.graphObject, *args)
+        return self.getValue(self.lookupNode(graphInstanceMethod, args))
+
+    def _lookupNode(self, graphInstanceMethod, args=(), create=True, graphLayer=None):
+        # Nodes are shared by all graph layers, so the layer makes no
+        # difference to the node found.
+        return self.lookupNode(graphInstanceMethod, args, create)
 
     def _createNode(self, graphInstanceMethod, args=()):
-        raise NotImplementedError()
+        return self.lookupNode(graphInstanceMethod, args, create=True)
 
     def isComputing(self):
         """Returns True if the graph is currently computing a value,
@@ -59,30 +492,172 @@ class Graph(object):
         return self.activeNode
 
     def _isComputing(self):
-        raise NotImplementedError()
+        return self.isComputing()
 
     def getValue(self, node, graphContext=None):
         """Returns the value of the node, recalculating if necessary,
         honoring any active graph context.
 
+        Nodes cannot depend on nodes of other graphs, so raises an
+        exception if another graph is calculating a value on the thread.
+
         """
         # TODO: Consider rewriting as a visitor or context.
         #
+        if self.lock is not None and self._lockOwner != _threadId():
+            if node._flags & Node.STALE and self._serveStale(node):
+                return node._calcedValue
+            return self._runExclusively(self.getValue, node)
+        if node._flags & Node.COMPUTING:
+            raise GraphCycleError([node])
+        if self.activeNode is None:
+            if _computing.graph is not None and _computing.graph is not self:
+                # The read would record no edge, so the value calculated
+                # would not be invalidated by changes to the node.
+                raise RuntimeError("You cannot read a node of one graph while calculating a node of another.")
+            if self._expiring:
+                self._expire()
+            if self.eventListeners:
+                self.notify('read', node)
+            if node._flags & Node.STALE and self._serveStale(node):
+                return node._calcedValue
+        tracer = self.tracer
+        if tracer is not None:
+            span = tracer.enter(node)
         outputNode, self.activeNode = self.activeNode, node
+        if outputNode is None:
+            _computing.graph = self
         try:
             if outputNode:
                 outputNode.addInput(node)
                 node.addOutput(outputNode)
+            scope = self._activeScope
+            if scope is not None:
+                return scope._lazyValue(node)
             return node.getValue()
+        except GraphCycleError as e:
+            e._unwind(node)
+            raise
         finally:
             self.activeNode = outputNode
+            if outputNode is None:
+                _computing.graph = None
+            if tracer is not None:
+                tracer.exit(span)
+
+    def _serveStale(self, node):
+        """Returns True if a top-level read of the stale node should be
+        answered with its last calculated value, in which case the node is
+        queued for recalculation by the graph's revalidator.
+
+        Stale values are only served outside graph contexts, layers and
+        overlays, and never to a node's own computation, so no calculated
+        value is ever derived from a stale one.
+
+        """
+        revalidator = self.revalidator
+        return (revalidator is not None and not (node._isSet or node._isOverlaid)
+                and self.activeGraphContext is None and self._activeScope is None
+                and self.activeGraphLayer is self.rootGraphLayer
+                and revalidator.submit(node))
+
+    def _expire(self):
+        """Invalidates calculated values whose time to live has passed.
+
+        Only called before top-level reads, so a computation never
+        sees a value expire part way through.
+
+        """
+        for policy in list(self._expiring):
+            for node in policy.expired():
+                node._graph.invalidate(node)
+            if not policy.isPending():
+                self._expiring.discard(policy)
+
+    @_exclusive
+    def invalidate(self, node):
+        """Discards the node's calculated value, if any, as if one of
+        its inputs had changed, and propagates the change to its
+        outputs.
+
+        Intended for nodes whose value depends on something outside
+        the graph.
+
+        """
+        if self.isComputing():
+            raise RuntimeError("You cannot invalidate a node during graph evaluation.")
+        if node._isCalced:
+            node._invalidateCalc()
+            self.counters.invalidations += 1
+            self.onNodeChanged(node, 'invalidate')
+
+    def notify(self, event, subject, value=None):
+        """Notifies event listeners of a user operation on the graph:
+
+            * 'read'            A top-level read of the node subject.
+            * 'setValue', 'clearSet', 'overlayValue', 'clearOverlay'
+                                A change to the node subject through the
+                                graph; value is the new value, if any.
+            * 'enterContext', 'exitContext'
+                                Entry to or exit from the GraphContext
+                                subject.
+
+        """
+        for listener in self.eventListeners:
+            listener(event, subject, value)
+
+    @_exclusive
+    def removeNode(self, node):
+        """Removes a node from the graph, along with its edges.  Values
+        calculated from the node are invalidated, so they are calculated
+        afresh from the node that replaces it when next read.
+
+        """
+        if node._outputs:
+            self.changeCount += 1
+            node._invalidateOutputCalcs()
+        for input in node._inputs:
+            input._outputs.discard(node)
+        for output in node._outputs:
+            output._inputs.discard(node)
+        node._inputs.clear()
+        node._outputs.clear()
+        del node._reads[:]
+        self.subscriptions.discard(node)
+        graphInstanceMethod = getattr(node._graphObject, node._graphMethod.name)
+        if node._args:
+            nodes = graphInstanceMethod._nodes
+            key = node._graphMethod.keyArgs(node._args)
+            if nodes is not None and nodes.get(key) is node:
+                del nodes[key]
+                self.nodeCount -= 1
+        elif graphInstanceMethod._node is node:
+            graphInstanceMethod._node = None
+            self.nodeCount -= 1
+
+    @_exclusive
+    def removeObject(self, graphObject):
+        """Removes all of the object's nodes from the graph, along with
+        their edges.
+
+        """
+        for graphInstanceMethod in graphObject._graphInstanceMethods():
+            if graphInstanceMethod._node is not None:
+                self.removeNode(graphInstanceMethod._node)
+            if graphInstanceMethod._nodes:
+                for node in list(graphInstanceMethod._nodes.values()):
+                    self.removeNode(node)
+        self.graphObjects.discard(graphObject)
 
     def _getValue(self, graphInstanceMethod, args=()):
-        raise NotImplementedError()
+        return self.getValue(self.lookupNode(graphInstanceMethod, args))
 
     def _calculateValue(self, graphInstanceMethod, args=()):
-        raise NotImplementedError()
+        node = self.lookupNode(graphInstanceMethod, args)
+        self.invalidate(node)
+        return self.getValue(node)
 
+    @_exclusive
     def setValue(self, node, value):
         """Sets for value of a node, and raises an exception
         if the node is not settable.
@@ -92,11 +667,62 @@ class Graph(object):
         # 
         if self.isComputing():
             raise RuntimeError("You cannot set a node during graph evaluation.")
-        node.setValue(value)
+        if self.activeGraphLayer is not self.rootGraphLayer:
+            self.activeGraphLayer.setValue(node, value)
+        elif self.readOnly:
+            raise RuntimeError("You cannot set a node on a read-only graph.")
+        else:
+            node.setValue(value)
+        if self.eventListeners:
+            self.notify('setValue', node, value)
+        self.pushChanges()
 
     def _setValue(self, graphInstanceMethod, value, args=()):
-        raise NotImplementedError()
+        self.setValue(self.lookupNode(graphInstanceMethod, args), value)
+
+    @_exclusive
+    def applyChanges(self, nodeChanges):
+        """Sets the nodes of a NodeChangeSet, or of any iterable of
+        NodeChange objects, to their new values as a single change:
+        every node is set before anything is recalculated, and their
+        outputs are then invalidated in one walk (see onNodesSet).
 
+        Raises an exception, having set nothing, if any of the nodes
+        is not settable.
+
+        """
+        if self.isComputing():
+            raise RuntimeError("You cannot set a node during graph evaluation.")
+        graphLayer = self.activeGraphLayer
+        if graphLayer is self.rootGraphLayer and self.readOnly:
+            raise RuntimeError("You cannot set a node on a read-only graph.")
+        if not isinstance(nodeChanges, NodeChangeSet):
+            nodeChanges = NodeChangeSet(nodeChanges=nodeChanges)
+        changes = list(nodeChanges._changes(self))
+        for node, value in changes:
+            if not node._graphMethod.isSettable():
+                raise RuntimeError("You cannot set a read-only node.")
+        if graphLayer is not self.rootGraphLayer:
+            for node, value in changes:
+                graphLayer.setValue(node, value)
+        elif changes:
+            self._setValues(changes)
+        if self.eventListeners:
+            for node, value in changes:
+                self.notify('setValue', node, value)
+        self.pushChanges()
+
+    def _setValues(self, changes):
+        """Sets the nodes of a list of (node, value) pairs to their
+        values, then propagates the change to all of them at once.
+
+        """
+        for node, value in changes:
+            node._setValue = value
+            node._isSet = True
+        self.onNodesSet(changes)
+
+    @_exclusive
     def clearSet(self, node):
         """Clears the current node if it has been set.
 
@@ -110,39 +736,344 @@ class Graph(object):
         """
         if self.isComputing():
             raise RuntimeError("You cannot clear a set value during graph evaluation.")
-        node.clearSet()
+        if self.activeGraphLayer is not self.rootGraphLayer:
+            self.activeGraphLayer.clearSet(node)
+        elif self.readOnly:
+            raise RuntimeError("You cannot clear a set value on a read-only graph.")
+        else:
+            node.clearSet()
+        if self.eventListeners:
+            self.notify('clearSet', node)
+        self.pushChanges()
 
     def _clearValue(self, graphInstanceMethod, args):
-        raise NotImplementedError()
+        self.clearSet(self.lookupNode(graphInstanceMethod, args))
 
+    @_exclusive
     def overlayValue(self, node, value):
         """Adds a overlay to the active graph context and immediately applies it to the node.
 
+        Outside a graph context, adds the overlay to the active graph
+        overlay, if any.
+
         """
         if self.isComputing():
             raise RuntimeError("You cannot overlay a node during graph evaluation.")
-        if not self.activeGraphContext:
+        if self.activeGraphContext:
+            self.activeGraphContext.overlayValue(node, value)
+        elif self.activeOverlay is not self.activeGraphLayer._rootOverlay:
+            self.activeOverlay.addOverlay(node, value)
+        else:
             raise RuntimeError("You cannot overlay a node outside a graph context.")
-        self.activeGraphContext.overlayValue(node, value)
+        if self.eventListeners:
+            self.notify('overlayValue', node, value)
+        self.pushChanges()
 
     def _overlayValue(self, graphInstanceMethod, args, value):
-        raise NotImplementedError()
+        self.overlayValue(self.lookupNode(graphInstanceMethod, args), value)
 
+    @_exclusive
     def clearOverlay(self, node):
         """Clears an overlay previously set in the active graph context.
 
         """
         if self.isComputing():
             raise RuntimeError("You cannot clear a overlay during graph evaluation.")
-        if not self.activeGraphContext:
+        if self.activeGraphContext:
+            self.activeGraphContext.clearOverlay(node)
+        elif self.activeOverlay is not self.activeGraphLayer._rootOverlay:
+            self.activeOverlay.removeOverlay(node)
+        else:
             raise RuntimeError("You cannot clear a overlay outside a graph context.")
-        self.activeGraphContext.clearOverlay(node)
+        if self.eventListeners:
+            self.notify('clearOverlay', node)
+        self.pushChanges()
 
     def _clearOverlay(self, graphInstanceMethod, args=()):
-        raise NotImplementedError()
+        self.clearOverlay(self.lookupNode(graphInstanceMethod, args))
+
+    # Queries over the recorded dependency edges.  Edges are recorded as
+    # nodes are evaluated, so these reflect the graph as last computed.
+    #
+    # All of these are generators that walk the graph iteratively and
+    # touch each edge at most once.
+
+    def upstream(self, *nodes):
+        """Yields every node the specified nodes depend on, directly
+        or indirectly.
+
+        """
+        return _walk(nodes, _nodeInputs)
+
+    def downstream(self, *nodes):
+        """Yields every node that depends on the specified nodes,
+        directly or indirectly.
+
+        """
+        return _walk(nodes, _nodeOutputs)
+
+    def invalidatedBy(self, *nodes):
+        """Yields the nodes whose calculated values would be discarded
+        if any of the specified nodes were changed (set, cleared,
+        overlaid).
+
+        Nodes not currently calculated are skipped, along with
+        everything downstream of them, as are the outputs of set or
+        overlaid nodes, whose values would not change.  (Nodes whose
+        values were evicted by a cache policy are walked through.)
+
+        """
+        visited = set()
+        yetToVisit = []
+        for node in nodes:
+            yetToVisit.extend(node._outputs)
+        while yetToVisit:
+            node = yetToVisit.pop()
+            if node in visited:
+                continue
+            if node._isCalced:
+                visited.add(node)
+                yield node
+            elif node._flags & Node.EVICTED:
+                visited.add(node)
+            else:
+                continue
+            if not (node._isSet or node._isOverlaid):
+                yetToVisit.extend(node._outputs)
+
+    def topologicalOrder(self, nodes=None):
+        """Yields the specified nodes and everything upstream of
+        them, inputs before the nodes that depend on them.  If no
+        nodes are specified, orders every node in the graph.
+
+        Raises an exception if the recorded edges contain a cycle.
+
+        """
+        if nodes is None:
+            subgraph = set(self.allNodes())
+        else:
+            nodes = list(nodes)
+            subgraph = set(nodes)
+            subgraph.update(self.upstream(*nodes))
+        pending = {}
+        ready = collections.deque()
+        for node in subgraph:
+            count = sum(1 for input in node._inputs if input in subgraph)
+            if count:
+                pending[node] = count
+            else:
+                ready.append(node)
+        while ready:
+            node = ready.popleft()
+            yield node
+            for output in node._outputs:
+                if output in pending:
+                    pending[output] -= 1
+                    if not pending[output]:
+                        del pending[output]
+                        ready.append(output)
+        if pending:
+            # Every remaining node has an input that also remains, so
+            # following inputs must eventually revisit a node.
+            #
+            path = [next(iter(pending))]
+            index = {path[0]: 0}
+            while True:
+                node = next(input for input in path[-1]._inputs if input in pending)
+                if node in index:
+                    raise GraphCycleError(path[index[node]:] + [node])
+                index[node] = len(path)
+                path.append(node)
+
+    def pathBetween(self, source, target):
+        """Returns a shortest list of nodes [source, ..., target] such that
+        each node is an input to the next, or None if target does not
+        depend on source.
+
+        """
+        if source is target:
+            return [source]
+        parents = {source: None}
+        yetToVisit = collections.deque([source])
+        while yetToVisit:
+            node = yetToVisit.popleft()
+            for output in node._outputs:
+                if output in parents:
+                    continue
+                parents[output] = node
+                if output is target:
+                    path = [output]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    path.reverse()
+                    return path
+                yetToVisit.append(output)
+        return None
+
+    def edges(self, nodes=None):
+        """Yields an (input, output) pair for each output edge of the
+        specified nodes, or of every node in the graph if no nodes
+        are specified.
+
+        """
+        if nodes is None:
+            nodes = self.allNodes()
+        for node in nodes:
+            for output in node._outputs:
+                yield node, output
+
+    def writeEdgeList(self, f, nodes=None):
+        """Writes the output edges of the specified nodes (or of the
+        whole graph) to the file-like object f as a compact edge list.
+
+        Each node is declared once, the first time it is seen, by a
+        line "n<TAB>id<TAB>label"; each edge is a line "e<TAB>id<TAB>id"
+        from input to output.  Lines are written as the edges are
+        walked, so the list is never held in memory.
+
+        """
+        ids = {}
+        def nodeId(node):
+            if node not in ids:
+                ids[node] = len(ids)
+                f.write('n\t%d\t%s\n' % (ids[node], _nodeLabel(node)))
+            return ids[node]
+        for input, output in self.edges(nodes):
+            f.write('e\t%d\t%d\n' % (nodeId(input), nodeId(output)))
+
+    def writeDot(self, f, nodes=None):
+        """Writes the output edges of the specified nodes (or of the
+        whole graph) to the file-like object f in Graphviz DOT format,
+        streaming as the edges are walked.
+
+        """
+        ids = {}
+        def nodeId(node):
+            if node not in ids:
+                ids[node] = len(ids)
+                label = _nodeLabel(node).replace('\\', '\\\\').replace('"', '\\"')
+                f.write('  n%d [label="%s"];\n' % (ids[node], label))
+            return ids[node]
+        f.write('digraph nodes {\n')
+        for input, output in self.edges(nodes):
+            f.write('  n%d -> n%d;\n' % (nodeId(input), nodeId(output)))
+        f.write('}\n')
+
+    # Scenarios.
+
+    def evaluateScenarios(self, targets, deltas, baseContext=None):
+        """Evaluates the target nodes under a base graph context and under
+        each of a list of deltas from it, each delta a dict mapping nodes
+        to overlay values.  Returns a pair
+
+            (base values, [values under each delta])
+
+        where each list of values is in the order of targets.
+
+        The targets are evaluated once in the base context and each
+        delta is then evaluated in a lazy child context of it, so a
+        delta only recalculates the nodes downstream of its own
+        overlays; everything else is shared with the base.
+
+        baseContext defaults to an empty context, within the active graph
+        context if there is one.  A context that is not lazy is copied
+        into a lazy one with the same overlays.
+
+        Lazy contexts cannot be used with lazy propagation, so under
+        lazy propagation the base and delta contexts are ordinary ones
+        instead, and each delta also recalculates everything downstream
+        of the base context's overlays.
+
+        """
+        baseContext = self._scratchContext(baseContext)
+        with baseContext:
+            baseValues = [self.getValue(target) for target in targets]
+            results = []
+            for delta in deltas:
+                with GraphContext(graph=self, parentGraphContext=baseContext, lazy=baseContext._lazy):
+                    for node, value in delta.items():
+                        self.overlayValue(node, value)
+                    results.append([self.getValue(target) for target in targets])
+        return baseValues, results
+
+    def gradient(self, target, inputs=None):
+        """Returns the derivatives of the target node's value with respect
+        to each of the input nodes (by default, every settable numeric
+        node it depends on), as a dict, from a single evaluation.  See
+        nodes.autodiff.
+
+        """
+        from .autodiff import gradient
+        return gradient(self, target, inputs)
+
+    def _scratchContext(self, graphContext=None):
+        """Returns a graph context to evaluate what-ifs in: graphContext
+        itself if it will do as it is, or else a new context holding a
+        copy of its overlays, if any.
+
+        The context is lazy, and a child of the active graph context if
+        that is lazy too, except under lazy propagation, which lazy
+        contexts do not support; it is then an ordinary context.
+
+        """
+        lazy = self.propagation != Lazy
+        if graphContext is not None and graphContext._lazy == lazy:
+            return graphContext
+        active = self.activeGraphContext
+        parent = active if lazy and active is not None and active._lazy else None
+        scratchContext = GraphContext(graph=self, parentGraphContext=parent, lazy=lazy)
+        if graphContext is not None:
+            with scratchContext:
+                for node, value in graphContext.allOverlays().items():
+                    self.overlayValue(node, value)
+        return scratchContext
+
+    def sensitivities(self, targets, inputs, bump, baseContext=None):
+        """Returns the finite-difference sensitivities of the target nodes
+        to each of the input nodes, as a dict mapping each input to a list
+        of (bumped value - base value) / bump, one per target, where the
+        bumped value is read with the input overlaid by its base value
+        plus bump.
+
+        The targets are evaluated once in the base context, and inputs
+        that none of them depend on are given zero sensitivities without
+        being bumped.  Each remaining bump recalculates only the nodes
+        downstream of its input (see evaluateScenarios, which also
+        describes how the base context is chosen within an active graph
+        context and under lazy propagation).
+
+        """
+        baseContext = self._scratchContext(baseContext)
+        with baseContext:
+            for target in targets:
+                self.getValue(target)
+            upstream = set(self.upstream(*targets))
+            bumped = [input for input in inputs if input in upstream]
+            deltas = [{input: self.getValue(input) + bump} for input in bumped]
+        baseValues, results = self.evaluateScenarios(targets, deltas, baseContext)
+        sensitivities = dict((input, [0.0] * len(targets)) for input in inputs)
+        for input, values in zip(bumped, results):
+            sensitivities[input] = [(value - baseValue) / float(bump)
+                                    for value, baseValue in zip(values, baseValues)]
+        return sensitivities
+
+    def evaluate(self, requests):
+        """Evaluates target nodes in priority order and returns a Result
+        (see nodes.scheduler) for each, in the order requested.
+
+        Each request is a node or a (node, priority, deadline) tuple,
+        where deadline is the number of seconds the caller can wait.  A
+        target that would miss its deadline gets the value last delivered
+        for it, flagged as stale.
+
+        """
+        if self._scheduler is None:
+            from .scheduler import Scheduler
+            self._scheduler = Scheduler(self)
+        return self._scheduler.evaluate(requests)
 
 class GraphVisitor(object):
-    """Visits a hierarchy of graph nodes in depth first order.
+    """Visits a hierarchy of graph nodes in breadth first order.
 
     Assumes the node has been evaluated at least once so
     that its inputs have been updated.  Even this is imperfect
@@ -155,9 +1086,13 @@ class GraphVisitor(object):
     #       method call on the graph object.
     #
     def visit(self, node):
-        yetToVisit = [node]
+        visited = set([node])
+        yetToVisit = collections.deque([node])
         while yetToVisit:
-            yetToVisit.extend(self.visitNode(yetToVisit.pop(0)))
+            for n in self.visitNode(yetToVisit.popleft()) or ():
+                if n not in visited:
+                    visited.add(n)
+                    yetToVisit.append(n)
 
     def visitNode(self, node):
         """Visits a node and returns a list of additional nodes
@@ -172,28 +1107,217 @@ class _GraphVisitor(object):
         self._graph = graph
 
     def _visitOutputs(self, node, graphContext):
-        outputs = node.outputs
-        while outputs:
-            output = outputs.pop(0)
+        for output in _walk([node], _nodeOutputs):
             self._visit(output, graphContext)
-            outputs.extend(output.outputs)
 
     def _visitInputs(self, node, graphContext):
-        inputs = node.inputs
-        while inputs:
-            input = inputs.pop(0)
+        for input in _walk([node], _nodeInputs):
             self._visit(input, graphContext)
-            inputs.extend(input.inputs)
 
-    def _visit(self, node):
-        raise NotImeplementedError()
+    def _visit(self, node, graphContext):
+        raise NotImplementedError()
+
+def _nodeOutputs(node):
+    return node._outputs
+
+def _nodeInputs(node):
+    return node._inputs
+
+def _walk(nodes, neighbours):
+    """Yields every node reachable from nodes by repeatedly following
+    neighbours (a callable returning a node's adjacent nodes), each
+    exactly once.  The starting nodes themselves are not yielded
+    unless they are reachable from one another.
+
+    Iterative, so the depth of the graph is not limited by the
+    recursion limit, and linear in the number of edges walked.
+
+    """
+    visited = set()
+    yetToVisit = collections.deque()
+    for node in nodes:
+        yetToVisit.extend(neighbours(node))
+    while yetToVisit:
+        node = yetToVisit.popleft()
+        if node in visited:
+            continue
+        visited.add(node)
+        yield node
+        yetToVisit.extend(neighbours(node))
+
+def _nodeLabel(node):
+    """Returns a short, human-readable label for a node, e.g.
+    Example.X('a', 1).
+
+    """
+    return '%s.%s(%s)' % (
+            node._graphObject.__class__.__name__,
+            node._graphMethod.name,
+            ', '.join(repr(arg) for arg in node._args)
+            )
 
 # TODO: Split collections of overlays from the contexts.
+_noOverlay = object()    # Marks the absence of an overlay in a lazy context.
+
+class _Scope(object):
+    """The machinery shared by lazy graph contexts, graph layers and graph
+    overlays: scopes whose node values are resolved as nodes are read,
+    rather than applied to the graph's nodes.
+
+    A scope holds values for some nodes (overlays or sets) in
+    _scopeValues, and has an optional parent scope whose values it
+    inherits.  A node read in a scope that depends on none of the
+    values in it or its parents is served from (and memoized on) the
+    graph as usual; one that does is calculated and memoized in the
+    scope until the next change to the graph or to the values of the
+    scope or its parents.
+
+    """
+    def _initScope(self, graph):
+        self._graph = graph
+        self._scopeValues = {}        # Values by node.
+        self._version = 0             # Bumped by each change to the scope's values.
+        self._memo = {}               # Values of nodes depending on the values of the scope or its parents.
+        self._taint = {}              # Whether nodes depend on the values of the scope or its parents.
+        self._ownTaint = {}           # Whether nodes depend on the scope's own values.
+        self._memoStamp = None        # The state of the graph and scopes the memo reflects.
+        self._frames = []             # Whether each calculation in progress read a scope value.
+
+    def _scopeParent(self):
+        raise NotImplementedError()
+
+    def _findValue(self, node):
+        """Returns (True, value) if the scope or one of its parents holds
+        a value for the node, or (False, None) otherwise.
+
+        """
+        scope = self
+        while scope is not None:
+            if node in scope._scopeValues:
+                return True, scope._scopeValues[node]
+            scope = scope._scopeParent()
+        return False, None
+
+    def _checkMemo(self):
+        """Discards the scope's memo if the graph or the values of the
+        scope or its parents have changed since it was made.
+
+        """
+        stamp = [self._graph.changeCount]
+        scope = self
+        while scope is not None:
+            stamp.append(scope._version)
+            scope = scope._scopeParent()
+        if stamp != self._memoStamp:
+            self._memo.clear()
+            self._taint.clear()
+            self._ownTaint.clear()
+            self._memoStamp = stamp
+
+    def _isTainted(self, node, own=False):
+        """Returns True if the value of a node that is valid on the graph
+        depends on a value in this scope or its parents, or, if own is
+        True, on a value in this scope itself.
+
+        """
+        taint = self._ownTaint if own else self._taint
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current in taint:
+                stack.pop()
+                continue
+            if current in self._scopeValues if own else self._findValue(current)[0]:
+                taint[current] = True
+            elif current._isSet or current._isOverlaid or (own and self._findValue(current)[0]):
+                # Fixed on the graph or, for own, by a parent scope.
+                taint[current] = False
+            elif not current._inputs and not current._isCalced:
+                # Never calculated, so its inputs are unknown.
+                taint[current] = True
+            else:
+                pending = [input for input in current._inputs if input not in taint]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                taint[current] = any(taint[input] for input in current._inputs)
+            stack.pop()
+        return taint[node]
+
+    def _inherited(self, node):
+        """Returns (True, value) if a parent scope memoized a value for the
+        node that none of the values in between affect, or (False, None)
+        otherwise.  This is how a child scope shares its parents'
+        calculations until it diverges from them.
+
+        """
+        scope = self
+        while scope._scopeParent() is not None:
+            if scope._isTainted(node, own=True):
+                break
+            scope = scope._scopeParent()
+            scope._checkMemo()
+            if node in scope._memo:
+                return True, scope._memo[node]
+        return False, None
+
+    def _lazyValue(self, node):
+        """Returns the value of a node within this scope.  Called by the
+        graph, with the node active.
+
+        """
+        self._checkMemo()
+        found, value = self._findValue(node)
+        if not found and node in self._memo:
+            found, value = True, self._memo[node]
+        if not found:
+            found, value = self._inherited(node)
+        if found:
+            self._graph.counters.hits += 1
+            if self._frames:
+                self._frames[-1] = True
+            return value
+        if node.isValid() and not self._isTainted(node):
+            return node.getValue()
+        self._graph.counters.misses += 1
+        self._graph.counters.calcs += 1
+        self._frames.append(False)
+        node._flags |= node.COMPUTING
+        reads, node._reads = node._reads, []
+        try:
+            value = node._graphMethod(node._graphObject, *node._args)
+        finally:
+            node._flags &= ~node.COMPUTING
+            tainted = self._frames.pop()
+            reads, node._reads = node._reads, reads
+        self._taint[node] = tainted
+        if tainted:
+            self._memo[node] = value
+            if self._frames:
+                self._frames[-1] = True
+        elif not node.isValid():
+            node._reads = reads
+            node._storeCalc(value)
+            value = node._calcedValue
+        return value
+
+    def _activate(self):
+        """Makes this the scope in which the graph resolves reads,
+        returning the scope it replaces.
+
+        """
+        previous, self._graph._activeScope = self._graph._activeScope, self
+        # Parents may have memoized (and recorded the inputs of) more
+        # nodes since this scope was last active.
+        self._ownTaint.clear()
+        return previous
+
+
 # TODO: Decouple this from the graph, making graph a paramter to __init__?
 # TODO: Store nodes in contexts (not as some global that gets 
 #       special handling if a context is active).
 
-class GraphContext(object):
+class GraphContext(_Scope):
     """A graph context is collection of temporary node changes
     (called overlays) that can be applied and unapplied
     without modifying the global node settings or overlays in
@@ -222,19 +1346,41 @@ class GraphContext(object):
     One can also create a GraphContext that inherits nodes
     from a parent context.
 
+    By default entering a context applies each of its overlays to its
+    node, invalidating the node's outputs, and exiting it clears them
+    all again, which costs time in proportion to the overlays' fan-out
+    whether or not they are read.  A lazy context,
+
+        with GraphContext(lazy=True) as c:
+            ...
+
+    instead leaves the graph's nodes untouched, so entry and exit cost
+    O(1), and resolves overlays as nodes are read within it.  A node
+    read in a lazy context that depends on none of its overlays is
+    served from (and memoized on) the graph as usual; one that does is
+    calculated and memoized in the context until the next change to the
+    graph or the context's overlays.  Lazy contexts cannot be used with
+    lazy propagation, and the parent of a lazy context must be lazy too.
+
     """
-    def __init__(self, graph=None, parentGraphContext=None):
-        self._graph = graph or _graph
+    def __init__(self, graph=None, parentGraphContext=None, lazy=False):
+        if parentGraphContext is not None and parentGraphContext._lazy != lazy:
+            raise RuntimeError("A graph context must be lazy if and only if its parent is.")
+        if graph is None:
+            graph = parentGraphContext._graph if parentGraphContext is not None else defaultGraph()
+        self._initScope(graph)
         self._parentGraphContext = parentGraphContext
+        self._lazy = lazy
+        self._transient = {}          # Overlays to restore on exit from a lazy context.
         self._nodes = {}
-        self._overlays = {}           # Node overlays by node.
+        self._overlays = self._scopeValues    # Node overlays by node.
         self._state = {}              # Node values by node.
         self._applied = set()         # Nodes whose overlays in this context have been applied.
         self._removed = set()         # Nodes set at a higher level but cleared here.
         self._populating = True
 
     def _lookupNode(self, graphInstanceMethod, args, create=True):
-        key = (graphInstanceMethod.graphObject, graphInstanceMethod.name) + args
+        key = (graphInstanceMethod.graphObject, graphInstanceMethod.name) + graphInstanceMethod.graphMethod.keyArgs(args)
         if key not in self._nodes and create:
             self._nodes[key] = self.createNode(graphInstanceMethod, args)
         return self._nodes.get(key)
@@ -293,6 +1439,12 @@ class GraphContext(object):
         the node.
 
         """
+        if self._lazy:
+            if not node._graphMethod.isOverlayable():
+                raise RuntimeError("You cannot overlay this node.")
+            self._changingOverlay(node)
+            self._overlays[node] = value
+            return
         self.addOverlay(node, value)
         self.applyOverlay(node)
 
@@ -314,6 +1466,11 @@ class GraphContext(object):
         removes it from the overlay data.
 
         """
+        if self._lazy:
+            if node in self._overlays:
+                self._changingOverlay(node)
+                del self._overlays[node]
+            return
         if self.isOverlaid(node):
             if node in self._state:
                 node.overlayValue(self._state[node])
@@ -370,6 +1527,19 @@ class GraphContext(object):
         """
         return self.allOverlays(includeParent=includeParent)[node]
 
+    def _scopeParent(self):
+        return self._parentGraphContext
+
+    def _changingOverlay(self, node):
+        """Notes a change to an overlay in a lazy context, remembering
+        the overlay to restore on exit if the context is being reused.
+
+        """
+        if not self._populating and node not in self._transient:
+            self._transient[node] = self._overlays.get(node, _noOverlay)
+        self._version += 1
+
+    @_exclusive
     def __enter__(self):
         """Enter the graph context, activating any overlays it contains.
 
@@ -378,52 +1548,134 @@ class GraphContext(object):
         away to be restored when we exit the current context.
 
         """
+        self._graph.counters.contextEnters += 1
+        if self._graph.activeGraphLayer is not self._graph.rootGraphLayer:
+            raise RuntimeError("You cannot enter a graph context within a graph layer.")
+        active = self._graph.activeGraphContext
+        if self._lazy:
+            if self._graph.propagation == Lazy:
+                raise RuntimeError("You cannot use a lazy graph context with lazy propagation.")
+            if active is not None and active._lazy:
+                ancestor = self._parentGraphContext
+                while ancestor is not None and ancestor is not active:
+                    ancestor = ancestor._parentGraphContext
+                if ancestor is None:
+                    raise RuntimeError("A lazy graph context can only be entered within its parents.")
+            self.activeParentGraphContext, self._graph.activeGraphContext = active, self
+            self._previousScope = self._activate()
+            if self._graph.eventListeners:
+                self._graph.notify('enterContext', self)
+            return self
+        if active is not None and active._lazy:
+            raise RuntimeError("You cannot enter a graph context within a lazy one.")
         self.activeParentGraphContext, self._graph.activeGraphContext = self._graph.activeGraphContext, self
         if not self._populating:
-            self._graph.activeGraphContext = GraphContext(parentGraphContext=self._graph.activeGraphContext)
+            self._graph.activeGraphContext = GraphContext(self._graph, parentGraphContext=self._graph.activeGraphContext)
         for node in self._graph.activeGraphContext.allOverlays():
             self._graph.activeGraphContext.applyOverlay(node)
+        if self._graph.eventListeners:
+            self._graph.notify('enterContext', self)
+        self._graph.pushChanges()
         return self
 
+    @_exclusive
     def __exit__(self, *args):
         """Exit the graph context and remove any applied overlays.
 
         """
+        self._graph.counters.contextExits += 1
+        if self._lazy:
+            if self._populating:
+                self._populating = False
+            elif self._transient:
+                for node, overlay in self._transient.items():
+                    if overlay is _noOverlay:
+                        self._overlays.pop(node, None)
+                    else:
+                        self._overlays[node] = overlay
+                self._transient.clear()
+                self._version += 1
+            self._graph.activeGraphContext = self.activeParentGraphContext
+            self._graph._activeScope = self._previousScope
+            if self._graph.eventListeners:
+                self._graph.notify('exitContext', self)
+            self._graph.pushChanges()
+            return
         if self._populating:
             self._populating = False
         for node in self._graph.activeGraphContext.allOverlays():
             self._graph.activeGraphContext.clearOverlay(node)
         self._graph.activeGraphContext = self.activeParentGraphContext
+        if self._graph.eventListeners:
+            self._graph.notify('exitContext', self)
+        self._graph.pushChanges()
 
-class GraphOverlay(object):
+class GraphOverlay(_Scope):
     """An GraphOverlay is a collection of node changes that can
     be applied and unapplied by the user.
 
+    An overlay belongs to a graph layer and is applied within it:
+
+        with graphOverlay() as o:
+            o.addOverlay(node, value)     # Or graph.overlayValue(node, value).
+            ...
+
+    Like a lazy graph context, an overlay is resolved as nodes are
+    read rather than applied to them, so applying and unapplying it
+    costs O(1).  Its overlays persist from one application to the next.
+    An overlay created within another inherits its overlays.  Like lazy
+    graph contexts, overlays cannot be used with lazy propagation.
+
     """
-    def __init__(self, graph, graphLayer):
+    def __init__(self, graph, graphLayer, parentOverlay=None):
         """Creates an overlay for the specified layer.
 
         """
-        self._graph = graph
+        self._initScope(graph)
         self._graphLayer = graphLayer
-        self._overlays = {}
+        self._parentOverlay = parentOverlay
+        self._overlays = self._scopeValues
+        self._activeStack = []
+
+    def _scopeParent(self):
+        if self._parentOverlay is not None:
+            return self._parentOverlay
+        return self._graphLayer._scope()
 
     def addOverlay(self, node, value):
-        raise NotImplementedError()
+        if not node._graphMethod.isOverlayable():
+            raise RuntimeError("You cannot overlay this node.")
+        self._overlays[node] = value
+        self._version += 1
 
     def removeOverlay(self, node):
-        raise NotImplementedError()
+        if node in self._overlays:
+            del self._overlays[node]
+            self._version += 1
 
+    @_exclusive
     def __enter__(self):
-        self._previousOverlay, self._graph.activeOverlay = self._graph.activeOverlay, self
-        self._previousLayerOverlay, self._graphLayer._activeOverlay = self._graphLayer._activeOverlay, self
-        return
+        if self._graph.activeGraphLayer is not self._graphLayer:
+            raise RuntimeError("You can only apply an overlay within its own graph layer.")
+        if self._graph.activeGraphContext is not None:
+            raise RuntimeError("You cannot apply an overlay within a graph context.")
+        if self._graph.propagation == Lazy:
+            raise RuntimeError("You cannot apply an overlay with lazy propagation.")
+        self._activeStack.append((self._graph.activeOverlay, self._activate()))
+        self._graph.activeOverlay = self
+        return self
 
+    @_exclusive
     def __exit__(self, *args):
-        return
+        self._graph.activeOverlay, self._graph._activeScope = self._activeStack.pop()
 
-def graphOverlay():
-    return GraphOverlay(_graph, _graph.activeGraphLayer)
+def graphOverlay(graph=None):
+    graph = graph or defaultGraph()
+    graphLayer = graph.activeGraphLayer
+    parentOverlay = graph.activeOverlay
+    if parentOverlay is graphLayer._rootOverlay:
+        parentOverlay = None
+    return GraphOverlay(graph, graphLayer, parentOverlay)
 
 def graphVisit(node, visitor):
     """Visits the specified node.  The visitor is a callable
@@ -434,74 +1686,103 @@ def graphVisit(node, visitor):
     time in order to prevent cycles, regardless of how
     many times it is in the node list returned by the visitor.
 
+    Nodes are visited depth first, using an explicit stack
+    rather than recursion.
+
     """
     nodesVisited = set()
-    def visit(node):
+    yetToVisit = [node]
+    while yetToVisit:
+        node = yetToVisit.pop()
         if node in nodesVisited:
-            return []
+            continue
         nodesVisited.add(node)
-        for n in visitor(node):
-            visit(n)
-    visit(node)
+        yetToVisit.extend(reversed(list(visitor(node) or ())))
 
-class GraphLayer(object):
+class GraphLayer(_Scope):
     """A hierarchy of nodes and node states.
 
+    Nodes are shared by every layer of a graph, but each layer below
+    the graph's root layer keeps its own set values, layered over those
+    of its parent:
+
+        with graphLayer() as sandbox:
+            o.X = 10                      # Set in the sandbox only.
+            o.Y()
+
+    A layer memoizes only the values that depend on its own sets or
+    those of its parents; everything else is read from (and memoized
+    on) its parent, so creating a layer costs O(1), as does throwing
+    it away.  Changes to the graph itself reset the memos of its
+    layers.
+
+    Values set in a parent layer or on the graph can be overridden in
+    a layer but not cleared.  Graph contexts cannot be used within a
+    layer; graph overlays can.  Like lazy graph contexts, layers below
+    the root cannot be used with lazy propagation.
+
     """
     def __init__(self, graph=None, parentGraphLayer=None):
-        self._graph = graph
+        if graph is None:
+            graph = parentGraphLayer._graph if parentGraphLayer is not None else defaultGraph()
+        self._initScope(graph)
         self._parentGraphLayer = parentGraphLayer
-        self._nodes = {}
+        self._values = self._scopeValues    # Values set in this layer, by node.
         self._rootOverlay = GraphOverlay(self._graph, self)
-        self._activeOverlay = self._rootOverlay
-        self._overlayStack = collections.defaultdict(lambda: [])
         self._activeStack = []
 
-    def nodeKey(self, graphInstanceMethod, args):
-        return (graphInstanceMethod.graphObject, graphInstanceMethod.name) + args
+    def _scope(self):
+        """Returns the layer, or None for the root layer, whose state is
+        that of the graph's nodes themselves.
+
+        """
+        if self is self._graph.rootGraphLayer:
+            return None
+        return self
+
+    def _scopeParent(self):
+        if self._parentGraphLayer is None:
+            return None
+        return self._parentGraphLayer._scope()
 
     def lookupNode(self, graphInstanceMethod, args, create=True):
-        key = self.nodeKey(graphInstanceMethod, args)
-        if key not in self._nodes and create:
-            node = self.createNode(graphInstanceMethod, args)
-        return self._nodes.get(key)
+        return self._graph.lookupNode(graphInstanceMethod, args, create)
 
-    def createNode(self, graphInstanceMethod, args):
-        key = self.nodeKey(graphInstanceMethod, args)
-        if key in self._nodes:
-            raise RuntimeError("That node already exists in this layer.")
-        node = self._nodes[key] = self._newNode(graphInstanceMethod, args)
-        return node
+    def setValue(self, node, value):
+        """Sets the value of a node in this layer.
+
+        """
+        if not node._graphMethod.isSettable():
+            raise RuntimeError("You cannot set a read-only node.")
+        if self._scope() is None:
+            node.setValue(value)
+            return
+        self._values[node] = value
+        self._version += 1
 
-    def _newNode(self, graphInstanceMethod, args):
-        """Creates and returns a new Node that references this
-        layer.
+    def clearSet(self, node):
+        """Clears a value set in this layer, if any.
 
         """
-        return Node(graphInstanceMethod.graphObject, graphInstanceMethod.graphMethod, args, self)
+        if self._scope() is None:
+            node.clearSet()
+            return
+        if node in self._values:
+            del self._values[node]
+            self._version += 1
+        elif self.isSet(node):
+            raise RuntimeError("You cannot clear a value set in a parent layer.")
 
-    def setValue(self, graphInstanceMethod, value, args):
-        key = self.lookupNode(graphInstanceMethod, args)
-        node._value = value
-        node._flags |= node.SET
-
-    def applyOverlay(self, node, overlay):
-        if node.isValid or node.set:
-            self._overlayStack[node].append([node._value, node._flags])
-        node._flags &= ~(node.VALID|node.SET)
-        node._value = overlay
-        #        for output in node.outputs:
-        #    output.invalidate()
-        #
-        # TODO: Invalidate node - or graph
+    def isSet(self, node):
+        """Returns True if the node is set in this layer or its parents.
 
-    def removeNodeOverlay(self, node):
-        """Removes only the most recent overlay."""
-        if not node in self._overlayStack:
-            raise RuntimeError("No overlay has been applied to that node in this graph layer.")
-        node._value, node._flags = self._overlayStack[node].pop()
-        # TODO: Invalidate grpah.
+        """
+        scope = self._scope()
+        if scope is not None and scope._findValue(node)[0]:
+            return True
+        return node.isSet()
 
+    @_exclusive
     def __enter__(self):
         # We save the state to a stack (not just a pair of variables) because the
         # user might do something like:
@@ -512,18 +1793,181 @@ class GraphLayer(object):
         #         ...
         #         with i:   <-- Without a stack this would overwrite the prior history,
         #
-        self._activeStack.append((self._graph.activeGraphLayer, self._graph.activeOverlay))
+        if self._graph.activeGraphContext is not None:
+            raise RuntimeError("You cannot enter a graph layer within a graph context.")
+        if self._scope() is not None and self._graph.propagation == Lazy:
+            raise RuntimeError("You cannot enter a graph layer with lazy propagation.")
+        self._activeStack.append((self._graph.activeGraphLayer, self._graph.activeOverlay, self._graph._activeScope))
         self._graph.activeGraphLayer = self
-        self._graph.activeOverlay = self.rootOverlay
+        self._graph.activeOverlay = self._rootOverlay
+        if self._scope() is None:
+            self._graph._activeScope = None
+        else:
+            self._activate()
         return self
 
-    def __exit__(self):
-        self._graph.activeGraphLayer, self._graph.activeOverlay = self._activeStack.pop()
+    @_exclusive
+    def __exit__(self, *args):
+        self._graph.activeGraphLayer, self._graph.activeOverlay, self._graph._activeScope = self._activeStack.pop()
 
-def graphLayer(parentGraphLayer=None):
-    parentGraphLayer = parentGraphLayer or _graph.activeGraphLayer
+def graphLayer(parentGraphLayer=None, graph=None):
+    parentGraphLayer = parentGraphLayer or (graph or defaultGraph()).activeGraphLayer
     return GraphLayer(parentGraphLayer._graph, parentGraphLayer=parentGraphLayer)
 
+def identityKey(*args):
+    """An argument key that distinguishes arguments by identity rather
+    than by value, so unhashable or expensive-to-hash arguments can
+    be passed to a graph method without being hashed.
+
+    Two calls share a node only if they pass the very same objects.
+    (Ids cannot be reused while the node exists, as the node holds
+    on to its arguments.)
+
+    """
+    return tuple(id(arg) for arg in args)
+
+def _contentKey(value):
+    """Returns a hashable key derived from the contents of value."""
+    import hashlib
+    if hasattr(value, 'dtype') and hasattr(value, 'tobytes'):
+        # A NumPy array or scalar.
+        return (type(value).__name__, str(value.dtype), getattr(value, 'shape', ()),
+                hashlib.sha1(value.tobytes()).hexdigest())
+    if isinstance(value, dict):
+        return ('dict', frozenset((k, _contentKey(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_contentKey(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ('set', frozenset(_contentKey(v) for v in value))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        import pickle
+        return (type(value).__name__, hashlib.sha1(pickle.dumps(value, 2)).hexdigest())
+
+class ContentKey(object):
+    """An argument key that distinguishes arguments by their contents,
+    so lists, dicts, sets and NumPy arrays can be passed to a graph method
+    and calls with equal arguments share a node.
+
+    Keys are interned by argument identity: passing the same object
+    again reuses its key rather than rehashing it.  The intern table
+    holds on to at most cacheSize arguments, least recently used
+    first out.  Arguments must therefore not be mutated once passed.
+
+    keyFunction, if provided, replaces the default content hashing
+    and is called with a single argument to return its key.
+
+    """
+    def __init__(self, keyFunction=None, cacheSize=1024):
+        self.keyFunction = keyFunction or _contentKey
+        self.cacheSize = cacheSize
+        self._interned = collections.OrderedDict()  # id(arg) -> (arg, key)
+
+    def keyArg(self, arg):
+        interned = self._interned.pop(id(arg), None)
+        if interned is None or interned[0] is not arg:
+            interned = (arg, self.keyFunction(arg))
+            if len(self._interned) >= self.cacheSize:
+                self._interned.popitem(last=False)
+        self._interned[id(arg)] = interned
+        return interned[1]
+
+    def __call__(self, *args):
+        return tuple(self.keyArg(arg) for arg in args)
+
+class CachePolicy(object):
+    """Governs how long the calculated values of a graph method's nodes
+    are kept.  The default policy (no policy) keeps every value until
+    it is invalidated.
+
+    A policy is notified when a node of its method is calculated and
+    whenever a calculated value is read.
+
+    """
+    def onCalc(self, node):
+        pass
+
+    def onRead(self, node):
+        pass
+
+class LruCache(CachePolicy):
+    """Keeps the calculated values of at most maxSize nodes of the method,
+    across all instances, evicting the least recently read.
+
+    Evicting a value does not invalidate its outputs; the value is
+    simply recalculated if read again.  Evicted nodes that nothing
+    depends on are removed from the graph altogether.  Neither the
+    node just calculated nor nodes still being calculated are evicted,
+    so the cache can exceed maxSize while a calculation is under way.
+
+    """
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self._nodes = collections.OrderedDict()
+
+    def onCalc(self, node):
+        self._nodes.pop(node, None)
+        self._nodes[node] = None
+        excess = len(self._nodes) - self.maxSize
+        if excess <= 0:
+            return
+        evicting = []
+        for candidate in self._nodes:
+            if len(evicting) == excess:
+                break
+            if candidate is not node and not candidate._flags & Node.COMPUTING:
+                evicting.append(candidate)
+        for evicted in evicting:
+            del self._nodes[evicted]
+            evicted._evictCalc()
+            if not (evicted._outputs or evicted.isSet() or evicted.isOverlaid()
+                    or evicted in evicted._graph.subscriptions):
+                evicted._graph.removeNode(evicted)
+
+    def onRead(self, node):
+        self._nodes[node] = self._nodes.pop(node, None)
+
+class TtlCache(CachePolicy):
+    """Keeps a calculated value for at most ttl seconds, after which it
+    (and everything calculated from it) is invalidated.
+
+    Expiry is checked before each top-level read.
+
+    """
+    def __init__(self, ttl, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self._expiries = {}
+        self._heap = []
+
+    def onCalc(self, node):
+        expiry = self.clock() + self.ttl
+        self._expiries[node] = expiry
+        heapq.heappush(self._heap, (expiry, id(node), node))
+        node._graph._expiring.add(self)
+
+    def expired(self):
+        """Returns the nodes whose values have expired, forgetting
+        them.
+
+        """
+        now = self.clock()
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            expiry, _, node = heapq.heappop(self._heap)
+            if self._expiries.get(node) == expiry:
+                del self._expiries[node]
+                expired.append(node)
+        return expired
+
+    def isPending(self):
+        """Returns True if any values are yet to expire.
+
+        """
+        return bool(self._heap)
+
 class GraphMethod(object):
     """An unbound graph-enabled method.
 
@@ -532,7 +1976,7 @@ class GraphMethod(object):
 
     """
 
-    def __init__(self, method, name, flags=0, delegateTo=None):
+    def __init__(self, method, name, flags=0, delegateTo=None, argKey=None, cache=None):
         """Creates a new graph method, which lifts a regular method
         into a version that supports graph-based dependency
         tracking and other graph features.
@@ -552,6 +1996,11 @@ class GraphMethod(object):
             * Serializable  The value (whether set or computed) will be
                             extracted as part of object state.
             * Saved         Equivalent to setting both Settable and Serializable.
+            * Revalidate    When invalidated, the last calculated value is
+                            kept and served to top-level reads, marked
+                            stale, while the graph's revalidator (see
+                            nodes.revalidate) recalculates it in the
+                            background.
 
 
         delegateTo is optional and if provided must be set to
@@ -562,13 +2011,32 @@ class GraphMethod(object):
 
         The delegate must return a list of NodeChange objects,
         each of which is a mapping between a GraphInstanceMethod (and
-        any arguments specific to its node) and the value it will be set to.
+        any arguments specific to its node) and the value it will be set to,
+        or a NodeChangeSet.  The changes are applied together, as a single
+        change to the graph.
+
+        argKey is optional and if provided must be a callable that
+        accepts the arguments of a call and returns a hashable key
+        identifying its node; calls with equal keys share a node.  By
+        default the arguments are the key.  See identityKey and
+        ContentKey for keys supporting unhashable or large arguments.
+
+        cache is optional and if provided must be a CachePolicy
+        (such as LruCache or TtlCache) governing how long calculated
+        values are kept.  Alternatively, the NoMemo flag skips
+        memoization altogether: the method runs on every call, as part
+        of its caller's computation, and no node is created for it.
+        NoMemo methods cannot be set or overlaid.
 
         """
+        if flags & NoMemo and flags & Settable:
+            raise RuntimeError("A graph method cannot be both NoMemo and Settable.")
         self.method = method
         self.name = name
         self.flags = flags
         self.delegateTo = delegateTo
+        self.argKey = argKey
+        self.cache = cache
 
     def isSettable(self):
         """Returns True if a bound instance of the
@@ -578,7 +2046,15 @@ class GraphMethod(object):
         return self.flags & Settable
 
     def isOverlayable(self):
-        return self.isSettable or self.flags & Overlayable
+        if self.flags & NoMemo:
+            return False
+        return self.isSettable() or bool(self.flags & Overlayable)
+
+    def isMemoized(self):
+        """Returns False if the NoMemo flag is set, True otherwise.
+
+        """
+        return not self.flags & NoMemo
 
     def isChangeable(self):
         return self.isSettable() or self.isOverlayable() or self.delegatesChanges()
@@ -615,6 +2091,15 @@ class GraphMethod(object):
         """
         return self.delegateTo is not None
 
+    def keyArgs(self, args):
+        """Returns the part of a node key identifying a call with
+        the specified arguments.
+
+        """
+        if self.argKey is None:
+            return args
+        return (self.argKey(*args),)
+
     def __call__(self, graphObject, *args):
         """A short-cut to calling the underlying method with the supplied
         arguments.
@@ -642,18 +2127,22 @@ class Node(object):
     by the arguments used to call it.
 
     """
-    INVALID  = 0x0000
-    VALID    = 0x0001   # Applies to node computation only.
-    SET      = 0x0002
-    OVERLAID = 0x0004
-
-    def __init__(self, graphObject, graphMethod, args=(), graphContext=None):
+    INVALID   = 0x0000
+    VALID     = 0x0001   # Applies to node computation only.
+    SET       = 0x0002
+    OVERLAID  = 0x0004
+    COMPUTING = 0x0008   # The node's method is running.
+    EVICTED   = 0x0010   # The calculated value was dropped by a cache policy.
+    STALE     = 0x0020   # Invalid, but the last calculated value is kept; see Revalidate.
+
+    def __init__(self, graphObject, graphMethod, args=(), graphContext=None, graph=None):
         """Creates a new node on the graph.
 
         Fundamentally a node represents a value that is either
         calculated or directly specified by a user.
 
         """
+        self._graph = graph or _graph
         self._graphObject = graphObject
         self._graphMethod = graphMethod
         self._args = args
@@ -691,6 +2180,23 @@ class Node(object):
         self._value = None
         self._flags = self.INVALID
 
+        # Graph revisions at which the node's value last changed and at
+        # which its calculated value was last known to be current.  Only
+        # meaningful in lazy mode.
+        #
+        self._changedAt = 0
+        self._verifiedAt = 0
+
+        # The inputs read by the last calculation, in the order read,
+        # which is the order lazy mode verifies them in.
+        #
+        self._reads = []
+
+        # The change that last invalidated the node's calculated value,
+        # while attribution is enabled.  See nodes.attribution.
+        #
+        self._cause = None
+
     @property
     def valid(self):
         return self._flags & self.VALID
@@ -707,6 +2213,22 @@ class Node(object):
     def fixed(self):
         return self._flags & (self.SET|self.OVERLAID)
 
+    @property
+    def graph(self):
+        return self._graph
+
+    @property
+    def graphObject(self):
+        return self._graphObject
+
+    @property
+    def graphMethod(self):
+        return self._graphMethod
+
+    @property
+    def args(self):
+        return self._args
+
     @property
     def outputs(self):
         return self._outputs
@@ -729,6 +2251,7 @@ class Node(object):
 
         """
         self._inputs.add(inputNode)
+        self._reads.append(inputNode)
 
     def addOutput(self, outputNode):
         """Informs the node of a new output, that is, a node
@@ -768,12 +2291,21 @@ class Node(object):
         #       how a node was fixed/calced.  Short story: this will
         #       be rewritten.
         #
+        counters = self._graph.counters
         if self.isOverlaid():
+            counters.hits += 1
             return self._overlaidValue
         if self.isSet():
+            counters.hits += 1
             return self._setValue
-        if not self.isCalced():
+        if not self._isCalced or (self._verifiedAt != self._graph.revision
+                                  and not self._graph._verify(self)):
+            counters.misses += 1
             self.calcValue()
+        else:
+            counters.hits += 1
+            if self._graphMethod.cache is not None:
+                self._graphMethod.cache.onRead(self)
         return self._calcedValue
 
     def calcValue(self):
@@ -790,25 +2322,73 @@ class Node(object):
         is an issue with the graph.
 
         """
-        self._calcedValue = self._graphMethod(self._graphObject, *self._args)
+        self._graph.counters.calcs += 1
+        attribution = self._graph.attribution
+        if attribution is not None:
+            attribution.beginCalc()
+        reads, self._reads = self._reads, []
+        self._flags |= self.COMPUTING
+        try:
+            value = self._graphMethod(self._graphObject, *self._args)
+        except BaseException:
+            # Keep the reads that led to the recalculation, so lazy mode
+            # does not take a failed one for a verified one.
+            self._reads = reads
+            raise
+        finally:
+            self._flags &= ~self.COMPUTING
+            if attribution is not None:
+                attribution.endCalc(self)
+        if len(self._reads) > len(self._inputs):
+            # Read some inputs more than once; keep the first reads.
+            self._reads = list(collections.OrderedDict.fromkeys(self._reads))
+        self._storeCalc(value)
+
+    def _storeCalc(self, value):
+        """Memoizes a value calculated by the node's method.
+
+        """
+        if self._graph.valueStore is not None:
+            value = self._graph.valueStore.adopt(value)
+        self._calcedValue = value
         self._isCalced = True
+        self._changedAt = self._verifiedAt = self._graph.revision
+        self._flags &= ~(self.EVICTED|self.STALE)
+        if self._graphMethod.cache is not None:
+            self._graphMethod.cache.onCalc(self)
 
     def _invalidateCalc(self):
         """Removes any calculated value, forcing a recalculation
         the next time the node has no set or overlaid value.
 
+        Revalidate nodes keep the value, marked stale.
+
         """
-        self._invalidateOutputCalcs()
         self._isCalced = False
-        self._calcedValue = False
+        if self._graphMethod.flags & Revalidate and self._graph.activeGraphContext is None:
+            # Keep the value to serve while recalculating, unless it
+            # may belong to a graph context being entered or exited.
+            self._flags |= self.STALE
+        else:
+            self._calcedValue = False
+
+    def _evictCalc(self):
+        """Drops the calculated value to free memory.  Unlike
+        invalidation, outputs calculated from the value remain valid.
 
-    def _invalidateOutputCalcs(self):
+        """
+        if self._isCalced:
+            self._isCalced = False
+            self._calcedValue = None
+            self._flags = (self._flags | self.EVICTED) & ~self.STALE
+
+    def _invalidateOutputCalcs(self, cause=None):
         """Invalidates any outputs that were dependent on this
-        node as part of a calculation.
+        node as part of a calculation, tagging each with cause if
+        one is given (see Graph._invalidateOutputs).
 
         """
-        for output in self._outputs:
-            output._invalidateCalc()
+        self._graph._invalidateOutputs([(self, cause)])
 
     def setValue(self, value):
         """Sets a specific value on the node.
@@ -819,9 +2399,9 @@ class Node(object):
         """
         if not self._graphMethod.isSettable():
             raise RuntimeError("You cannot set a read-only node.")
-        self._invalidateOutputCalcs()
         self._setValue = value
         self._isSet = True
+        self._graph.onNodeChanged(self, 'setValue', value)
 
     def _setValue(self, value):
         raise NotImplementedError()
@@ -835,9 +2415,9 @@ class Node(object):
             raise RuntimeError("You cannot clear a read-only node.")
         if not self.isSet():
             return
-        self._invalidateOutputCalcs()
         self._isSet = False
         self._setValue = None
+        self._graph.onNodeChanged(self, 'clearSet')
 
     def _clearValue(self):
         raise NotImplementedError()
@@ -851,9 +2431,10 @@ class Node(object):
         # TODO: Perhaps optimize for _overlaidValue == value case.
         if not self._graphMethod.isOverlayable():
             raise RuntimeError("You cannot overlay this node.")
-        self._invalidateOutputCalcs()
         self._overlaidValue = value
         self._isOverlaid = True
+        self._graph.counters.overlaysApplied += 1
+        self._graph.onNodeChanged(self, 'overlayValue', value)
 
     def clearOverlay(self):
         """Clears the current overlay, if any, invalidating
@@ -864,9 +2445,9 @@ class Node(object):
             raise RuntimeError("You cannot overlay this node, so certainly you can't clear any overlay!")
         if not self.isOverlaid():
             return
-        self._invalidateOutputCalcs()
         self._isOverlaid = False
         self._overlaidValue = None
+        self._graph.onNodeChanged(self, 'clearOverlay')
 
     def getOverlay(self):
         """Returns the value of the current overlay, if any, or
@@ -906,6 +2487,25 @@ class Node(object):
         """
         return self._isCalced
 
+    def isStale(self):
+        """Return True if the node is invalid but its last calculated
+        value is being kept, and served, until it is recalculated.  See
+        the Revalidate flag.
+
+        """
+        return bool(self._flags & self.STALE)
+
+    def isComputing(self):
+        """Return True if the node's method is currently running.
+
+        The graph uses this to detect cycles: a request for the value
+        of a node that is already computing can only come from the
+        node's own computation.  Evaluators that compute nodes
+        concurrently can use it to detect a node already in flight.
+
+        """
+        return bool(self._flags & self.COMPUTING)
+
     # TODO: Move this out.  Let's make nodes totally dumb.
     #       All the know is their value and inputs and outputs.
     #       They don't actually expose methods (except for helpers)
@@ -950,11 +2550,110 @@ class NodeChange(object):
 
     @property
     def node(self):
-        return _graph.lookupNode(self.graphInstanceMethod, self.args, create=True)
+        return self.graphInstanceMethod._graph.lookupNode(self.graphInstanceMethod, self.args, create=True)
 
     def _toNode(self, graph, graphContext):
         return graph.lookupNode(self.graphInstanceMethod, self.args, graphContext, create=True)
 
+class NodeChangeSet(object):
+    """A batch of pending changes to nodes, which a delegate can return
+    in place of a list of NodeChange objects.  The graph applies the
+    batch as one change (see Graph.applyChanges).
+
+    Changes are kept by graph instance method, as a list of argument
+    tuples and a sequence of values, rather than as a NodeChange each.
+    Given a typecode, the values are kept in an array.array of that
+    type:
+
+        def changePoints(self, rates):
+            changes = NodeChangeSet('d')
+            changes.extend(self.Point, [(tenor,) for tenor in self.Tenors()], rates)
+            return changes
+
+    pack() and unpack() turn a change set into a tuple that pickles
+    compactly and back again, naming objects by their keys in an
+    ObjectRegistry (see nodes.changelog), so a batch can be sent to
+    another process and applied to its graph.
+
+    """
+    def __init__(self, typecode=None, nodeChanges=()):
+        self.typecode = typecode
+        self._methods = []               # Graph instance methods, in the order first changed.
+        self._groups = {}                # (argument tuples, values) by graph instance method.
+        for nodeChange in nodeChanges:
+            self.add(nodeChange.graphInstanceMethod, nodeChange.value, *nodeChange.args)
+
+    def _group(self, graphInstanceMethod):
+        group = self._groups.get(graphInstanceMethod)
+        if group is None:
+            if self.typecode is None:
+                values = []
+            else:
+                import array
+                values = array.array(self.typecode)
+            group = self._groups[graphInstanceMethod] = ([], values)
+            self._methods.append(graphInstanceMethod)
+        return group
+
+    def add(self, graphInstanceMethod, value, *args):
+        """Adds a change of the method's node for args to value.
+
+        """
+        argsList, values = self._group(graphInstanceMethod)
+        values.append(value)
+        argsList.append(args)
+
+    def extend(self, graphInstanceMethod, argsList, values):
+        """Adds a change of the method's node for each tuple of
+        arguments in argsList to the corresponding value.
+
+        """
+        if len(argsList) != len(values):
+            raise RuntimeError("Expected a value for each of the %d argument tuples, got %d." % (len(argsList), len(values)))
+        group = self._group(graphInstanceMethod)
+        group[1].extend(values)
+        group[0].extend(tuple(args) for args in argsList)
+
+    def __len__(self):
+        return sum(len(self._groups[method][0]) for method in self._methods)
+
+    def __iter__(self):
+        for method in self._methods:
+            argsList, values = self._groups[method]
+            for args, value in zip(argsList, values):
+                yield NodeChange(method, value, *args)
+
+    def _changes(self, graph):
+        """Yields the (node, value) pairs of the changes, looking the
+        nodes up on graph.
+
+        """
+        for method in self._methods:
+            argsList, values = self._groups[method]
+            for args, value in zip(argsList, values):
+                yield graph.lookupNode(method, args), value
+
+    def pack(self, registry):
+        """Returns the changes as a picklable tuple, naming each object
+        by its key in registry.
+
+        """
+        return (self.typecode, tuple((registry.keyOf(method.graphObject), method.name,
+                                      tuple(self._groups[method][0]), self._groups[method][1])
+                                     for method in self._methods))
+
+    @classmethod
+    def unpack(cls, packed, registry):
+        """Returns the NodeChangeSet packed by pack(), for the objects
+        registered under the same keys in registry.
+
+        """
+        typecode, groups = packed
+        nodeChanges = cls(typecode)
+        for key, name, argsList, values in groups:
+            nodeChanges.extend(getattr(registry.lookup(key), name), argsList, values)
+        return nodeChanges
+
 class NodeReference(object):
     """A handle on the node details that are shared across
     all graph layers.
@@ -978,26 +2677,35 @@ class GraphInstanceMethod(object):
     def __init__(self, graphObject, graphMethod):
         self.graphObject = graphObject
         self.graphMethod = graphMethod
+        self._graph = graphObject._graph
+        self._node = None             # The node for calls without arguments.
+        self._nodes = None            # Nodes for calls with arguments, by argument key.
 
     @property
     def name(self):
         return self.graphMethod.name
 
+    @property
+    def graph(self):
+        return self._graph
+
     def node(self, *args):
-        return _graph.lookupNode(self, args, create=True)
+        return self._graph.lookupNode(self, args, create=True)
 
     def __call__(self, *args):
-        return self.getValue(*args)
+        return _readValue(self._graph, self, args)
 
     def getValue(self, *args):
         """Returns the current value of underlying node based on the current
         graph state.
 
+        Memoized values are read by nodes.speedups in a single call.
+
         """
-        return _graph.getValue(self.node(*args))
+        return _readValue(self._graph, self, args)
 
     def _getValue(self, *args):
-        return _graph._getValue(self, args)
+        return self._graph._getValue(self, args)
 
     def setValue(self, value, *args):
         # TODO: Is this the right place for delegation, or should
@@ -1010,41 +2718,42 @@ class GraphInstanceMethod(object):
         #       easy to refactor as needs demand.
         #
         if self.graphMethod.delegatesChanges():
-            nodeChanges = self.graphMethod.delegateTo(self.graphObject, value, *args)
-            for nodeChange in nodeChanges:
-                _graph.setValue(nodeChange.node, nodeChange.value)
+            self._graph.applyChanges(self.graphMethod.delegateTo(self.graphObject, value, *args))
             return
-        _graph.setValue(self.node(*args), value)
+        self._graph.setValue(self.node(*args), value)
 
     def _setValue(self, value, *args):
         # TODO: Handle delegation in the graph.  Perhaps add a switch
         #       here to indicate whether to delegate or not?
-        _graph._setValue(self, value, args)
+        self._graph._setValue(self, value, args)
 
     def clearSet(self, *args):
-        _graph.clearSet(self.node(*args))
+        self._graph.clearSet(self.node(*args))
 
     def _clearValue(self, *args):
-        _graph._clearValue(self, args)
+        self._graph._clearValue(self, args)
 
     def overlayValue(self, value, *args):
-        _graph.overlayValue(self.node(*args), value)
+        self._graph.overlayValue(self.node(*args), value)
 
     def _overlayValue(self, value, *args):
-        _graph._overlayValue(self, value, args)
+        self._graph._overlayValue(self, args, value)
 
     def clearOverlay(self, *args):
-        _graph.clearOverlay(self.node(*args))
+        self._graph.clearOverlay(self.node(*args))
 
     def _clearOverlay(self, *args):
-        _graph._clearOverlay(self, args)
+        self._graph._clearOverlay(self, args)
 
     def isSet(self, *args):
-        return self.node(*args).isSet()
+        return self._graph.activeGraphLayer.isSet(self.node(*args))
 
     def isOverlaid(self, *args):
         return self.node(*args).isOverlaid()
 
+    def isStale(self, *args):
+        return self.node(*args).isStale()
+
 class GraphType(type):
     """Metaclass responsible for creating on-graph objects.
 
@@ -1055,6 +2764,7 @@ class GraphType(type):
 
         for k,v in attrs.items():
             if isinstance(v, GraphMethod) and v.name != k:
+                import copy
                 v_ = copy.copy(v)
                 v_.name = k
                 v_.flags = v.flags
@@ -1083,7 +2793,13 @@ class GraphObject(object):
             return
         object.__setattr__(self, name, value)
 
-    def __init__(self, **kwargs):
+    def __init__(self, graph=None, **kwargs):
+        """Creates the object on graph, by default the current default
+        graph (see defaultGraph), setting the graph methods named by
+        kwargs to their values.
+
+        """
+        object.__setattr__(self, '_graph', graph or defaultGraph())
         for k in dir(self):
             v = getattr(self, k)
             if isinstance(v, GraphMethod):
@@ -1094,6 +2810,9 @@ class GraphObject(object):
                 raise RuntimeError("Not a GraphInstanceMethod: %s" % k)
             self.__setattr__(attr.graphMethod.name, v)
 
+    def _graphInstanceMethods(self):
+        return [v for v in self.__dict__.values() if isinstance(v, GraphInstanceMethod)]
+
     def toDict(self):
         """Returns a dictionary of name/value pairs for all saved methods.
 
@@ -1101,7 +2820,7 @@ class GraphObject(object):
         # TODO: Flesh this out a bit: deep toDict, including settable nodes, perhaps, etc.
         return dict((k.name, getattr(self, k.name)()) for k in self._savedGraphMethods)
 
-def graphMethod(funcOrFlags=0, delegateTo=None):
+def graphMethod(funcOrFlags=0, delegateTo=None, argKey=None, cache=None):
     """Declare a GraphObject method as on-graph.
 
     Use as a decorator, for example:
@@ -1116,14 +2835,44 @@ def graphMethod(funcOrFlags=0, delegateTo=None):
             def Y(self):
                 return ...
 
+            @graphMethod(argKey=ContentKey(), cache=LruCache(1000))
+            def Z(self, shocks):
+                return ...
+
     """
     if type(funcOrFlags) == types.FunctionType:
         return GraphMethod(funcOrFlags, funcOrFlags.__name__)
     def wrap(f):
-        return GraphMethod(f, f.__name__, funcOrFlags, delegateTo=delegateTo)
+        return GraphMethod(f, f.__name__, funcOrFlags, delegateTo=delegateTo, argKey=argKey, cache=cache)
     return wrap
 
-_graph = Graph()
+class _GraphActivation(object):
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        _activeGraphs.__dict__.setdefault('stack', []).append(self.graph)
+        return self.graph
+
+    def __exit__(self, *args):
+        _activeGraphs.stack.pop()
+
+_activeGraphs = _local()        # Graphs activated on each thread.
+
+def defaultGraph():
+    """Returns the graph that graph objects, contexts and layers are
+    created on unless they are given one: the graph most recently
+    activated on the current thread (see Graph.activate), or else the
+    global graph.
+
+    """
+    stack = getattr(_activeGraphs, 'stack', None)
+    if stack:
+        return stack[-1]
+    return _graph
+
+_graph = Graph()                # The global graph.
 
 # TODO: Add a node garbage collector (perhaps weakref).
 # TODO: Add multithreading support.
@@ -0,0 +1,137 @@
+"""nodes.precompute: Recalculating likely reads while the graph is idle.
+
+A Precomputer watches the top-level reads made on a graph to learn
+which nodes are read most often.  Once the graph has seen no changes
+for a short while, a background thread recalculates those of them that
+are invalid, so the next read is a memo hit:
+
+    precomputer = Precomputer(graph, idle=0.05)
+    precomputer.start()
+    ...
+    precomputer.stop()
+
+Work is done one node at a time, inputs first, taking the graph's lock
+(see Graph.lock, which start() installs) for each node, so a reader or
+writer waits for at most a single node's calculation.  A change to the
+graph cancels the remaining work, which starts again once the graph is
+next idle.  Nothing is precomputed while a graph context, layer or
+overlay is in use.
+
+"""
+import collections
+import threading
+import time
+
+class Precomputer(object):
+    """Precomputes the limit most read nodes of a graph once it has been
+    idle for idle seconds.
+
+    """
+    def __init__(self, graph, idle=0.1, limit=10, clock=time.time):
+        self.graph = graph
+        self.idle = idle
+        self.limit = limit
+        self.clock = clock
+        self.reads = collections.Counter()   # Top-level reads by node.
+        self.precomputed = 0                 # Nodes calculated in the background.
+        self._generation = 0                 # Bumped by each change; cancels work in progress.
+        self._lastChange = clock()
+        self._pending = False                # Whether changes may have invalidated targets.
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        graph.eventListeners.append(self.onEvent)
+        graph.changeListeners.append(self.onNodeChanged)
+
+    def onEvent(self, event, subject, value):
+        if event == 'read' and threading.current_thread() is not self._thread:
+            self.reads[subject] += 1
+
+    def onNodeChanged(self, node, change, value):
+        with self._condition:
+            self._generation += 1
+            self._lastChange = self.clock()
+            self._pending = True
+            self._condition.notify()
+
+    def targets(self):
+        """Returns the most read nodes, most read first."""
+        return [node for node, count in self.reads.most_common(self.limit)]
+
+    def precompute(self, generation=None):
+        """Recalculates the invalid targets and their invalid inputs, one
+        node at a time, until done or until the graph changes.  Returns
+        True if it finished.
+
+        """
+        graph = self.graph
+        if generation is None:
+            generation = self._generation
+        def plan():
+            if self._generation != generation or not graph.isQuiet():
+                return None
+            return [node for node in graph.topologicalOrder(self.targets()) if not node.isValid()]
+        nodes = graph.runExclusively(plan)
+        if nodes is None:
+            return False
+        for node in nodes:
+            def step():
+                if self._generation != generation or not graph.isQuiet():
+                    return False
+                if not node.isValid():
+                    try:
+                        graph.getValue(node)
+                    except Exception:
+                        pass        # The next reader will see the error.
+                    self.precomputed += 1
+                return True
+            if not graph.runExclusively(step):
+                return False
+        return True
+
+    def start(self):
+        """Starts precomputing on a background thread, giving the graph a
+        lock if it has none.
+
+        """
+        self.graph.shareWithThreads()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread and stops watching the graph.
+
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.graph.eventListeners.remove(self.onEvent)
+        self.graph.changeListeners.remove(self.onNodeChanged)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._pending:
+                        wait = self._lastChange + self.idle - self.clock()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._condition.wait(wait)
+                if self._stopped:
+                    return
+                self._pending = False
+                generation = self._generation
+            if not self.precompute(generation):
+                with self._condition:
+                    self._pending = True
+                    if self._generation == generation:
+                        # Cancelled because the graph is in use; try
+                        # again once it has been idle for a while.
+                        self._lastChange = self.clock()
@@ -0,0 +1,182 @@
+"""nodes.recording: Recording a graph's input traffic, and replaying it
+to measure latency.
+
+A Recorder captures the operations made on a live graph (sets, clears,
+overlays, graph context entries and exits, and top-level reads) into a
+compact stream of pickled records.  replay() re-runs a recording
+against whatever version of nodes is importable, timing each operation,
+and returns a ReplayReport of latency percentiles per read target and
+per kind of change.
+
+Objects are identified by keys from an ObjectRegistry (see
+nodes.changelog), which the replaying process must populate with
+equivalent objects.  From the command line:
+
+    python -m nodes.recording traffic.rec mymodule:makeRegistry
+
+where makeRegistry is a callable returning the populated registry.
+
+"""
+import collections
+import math
+import pickle
+import sys
+import time
+
+from . import nodes
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+class Recorder(object):
+    """Records the operations made on a graph to a stream.
+
+    Each record is a tuple (seconds since recording began, event,
+    reference, value).  Nodes and contexts are referred to by number,
+    assigned by a 'defineNode' or 'defineContext' record the first
+    time they appear; a context is defined by its parent's number and
+    whether it is lazy.  Operations on nodes of unregistered objects are
+    not recorded.
+
+    """
+    def __init__(self, graph, registry, stream):
+        self.graph = graph
+        self.registry = registry
+        self.stream = stream
+        self._start = _clock()
+        self._nodes = {}
+        self._contexts = {}
+        graph.eventListeners.append(self.onEvent)
+
+    def close(self):
+        """Stops recording.
+
+        """
+        self.graph.eventListeners.remove(self.onEvent)
+
+    def _write(self, event, reference, value=None):
+        pickle.dump((_clock() - self._start, event, reference, value), self.stream, 2)
+
+    def _nodeNumber(self, node):
+        number = self._nodes.get(node)
+        if number is None:
+            key = self.registry.keyOf(node.graphObject)
+            number = self._nodes[node] = len(self._nodes)
+            self._write('defineNode', number, (key, node.graphMethod.name, node.args))
+        return number
+
+    def _contextNumber(self, graphContext):
+        number = self._contexts.get(graphContext)
+        if number is None:
+            parent = graphContext._parentGraphContext
+            parentNumber = None if parent is None else self._contextNumber(parent)
+            number = self._contexts[graphContext] = len(self._contexts)
+            self._write('defineContext', number, (parentNumber, graphContext._lazy))
+        return number
+
+    def onEvent(self, event, subject, value):
+        if event in ('enterContext', 'exitContext'):
+            self._write(event, self._contextNumber(subject))
+            return
+        try:
+            number = self._nodeNumber(subject)
+        except KeyError:
+            return
+        self._write(event, number, value)
+
+def percentile(sortedValues, fraction):
+    """Returns the nearest-rank percentile of a sorted list."""
+    if not sortedValues:
+        return None
+    # The rank is the smallest covering fraction of the values; the
+    # tolerance keeps a product like 0.7 * 10 = 7.000000000000001 from
+    # rounding up a rank.
+    rank = int(math.ceil(fraction * len(sortedValues) - 1e-9))
+    index = max(0, min(len(sortedValues) - 1, rank - 1))
+    return sortedValues[index]
+
+class ReplayReport(object):
+    """Latencies, in seconds, of the operations in a replayed recording.
+
+    reads maps a label for each read target to the latencies of its
+    reads; changes maps each kind of change (including context entry
+    and exit) to its latencies.
+
+    """
+    def __init__(self):
+        self.reads = collections.defaultdict(list)
+        self.changes = collections.defaultdict(list)
+
+    def percentiles(self, latencies, fractions=(0.5, 0.9, 0.99, 1.0)):
+        latencies = sorted(latencies)
+        return [percentile(latencies, fraction) for fraction in fractions]
+
+    def summary(self):
+        """Returns a table of count and p50/p90/p99/max latencies, in
+        milliseconds, for each read target and kind of change.
+
+        """
+        lines = ['%-50s %8s %10s %10s %10s %10s' % ('operation', 'count', 'p50', 'p90', 'p99', 'max')]
+        for title, latencies in sorted(self.changes.items()) + sorted(self.reads.items()):
+            lines.append('%-50s %8d %10.3f %10.3f %10.3f %10.3f' % (
+                    (title[:50], len(latencies)) + tuple(1000 * p for p in self.percentiles(latencies))))
+        return '\n'.join(lines)
+
+def replay(stream, registry, graph=None):
+    """Replays a recording against the objects in registry, whose graph
+    is graph (by default the current default graph), and returns a
+    ReplayReport.
+
+    """
+    graph = graph or nodes.defaultGraph()
+    report = ReplayReport()
+    nodesByNumber = {}
+    contexts = {}
+    while True:
+        try:
+            offset, event, reference, value = pickle.load(stream)
+        except EOFError:
+            return report
+        if event == 'defineNode':
+            key, name, args = value
+            nodesByNumber[reference] = getattr(registry.lookup(key), name).node(*args)
+            continue
+        if event == 'defineContext':
+            parentNumber, lazy = value
+            contexts[reference] = nodes.GraphContext(graph, parentGraphContext=contexts.get(parentNumber), lazy=lazy)
+            continue
+        if event in ('enterContext', 'exitContext'):
+            context = contexts[reference]
+            start = _clock()
+            if event == 'enterContext':
+                context.__enter__()
+            else:
+                context.__exit__(None, None, None)
+            report.changes[event].append(_clock() - start)
+            continue
+        node = nodesByNumber[reference]
+        start = _clock()
+        if event == 'read':
+            node.graph.getValue(node)
+            report.reads[nodes._nodeLabel(node)].append(_clock() - start)
+            continue
+        if event in ('setValue', 'overlayValue'):
+            getattr(node.graph, event)(node, value)
+        else:
+            getattr(node.graph, event)(node)
+        report.changes[event].append(_clock() - start)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        sys.stderr.write('usage: python -m nodes.recording RECORDING MODULE:REGISTRY_FACTORY\n')
+        return 2
+    moduleName, factoryName = argv[1].split(':')
+    __import__(moduleName)
+    registry = getattr(sys.modules[moduleName], factoryName)()
+    with open(argv[0], 'rb') as stream:
+        report = replay(stream, registry)
+    sys.stdout.write(report.summary() + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
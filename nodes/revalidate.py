@@ -0,0 +1,148 @@
+"""nodes.revalidate: Serving stale values while recalculating them.
+
+Reading an invalid node normally blocks until it is recalculated.  For
+expensive nodes, the Revalidate flag keeps the last calculated value
+when the node is invalidated, and a top-level read answers with that
+value straight away while a Revalidator recalculates the node on a
+background thread:
+
+    class Book(nodes.GraphObject):
+        @nodes.graphMethod(nodes.Revalidate)
+        def Report(self):
+            ...
+
+    revalidator = Revalidator(graph)
+    revalidator.start()
+    book.Report()                   # Returns at once, ...
+    book.Report.isStale()           # ... flagged stale until recalculated.
+    ...
+    revalidator.stop()
+
+Only top-level reads outside graph contexts, layers and overlays are
+answered with stale values; a node calculated from a stale node waits
+for it to be recalculated, so no calculated value rests on a stale one.
+
+The background thread takes the graph's lock (see Graph.lock, which
+start() installs) for one node at a time, inputs first.  A stale read
+does not wait for the lock, so readers are not held up by the
+recalculation of the node they are reading.
+
+"""
+import collections
+import threading
+
+class Revalidator(object):
+    """Recalculates the stale nodes read on a graph, in the order they
+    were first read.
+
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.revalidated = 0                 # Stale nodes recalculated.
+        self._queue = collections.deque()
+        self._queued = set()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._revalidating = None            # The thread running revalidate().
+
+    def submit(self, node):
+        """Queues a stale node for recalculation and returns True, or
+        returns False if called while recalculating, in which case the
+        caller should calculate the node itself.
+
+        """
+        if threading.current_thread() is self._revalidating:
+            return False
+        with self._condition:
+            if node not in self._queued:
+                self._queued.add(node)
+                self._queue.append(node)
+                self._condition.notify()
+        return True
+
+    def pending(self):
+        """Returns the nodes waiting to be recalculated."""
+        with self._condition:
+            return list(self._queue)
+
+    def revalidate(self, node):
+        """Recalculates the node, if still stale, and its invalid inputs,
+        one node at a time.  Returns True if it finished, or False if it
+        gave up because a graph context, layer or overlay is in use (the
+        node is queued again by its next stale read).
+
+        """
+        graph = self.graph
+        def plan():
+            if not graph.isQuiet():
+                return None
+            if not node.isStale():
+                return []
+            return [input for input in graph.topologicalOrder([node]) if not input.isValid()]
+        self._revalidating = threading.current_thread()
+        try:
+            inputs = graph.runExclusively(plan)
+            if inputs is None:
+                return False
+            for input in inputs:
+                def step():
+                    if not graph.isQuiet():
+                        return False
+                    if not input.isValid():
+                        try:
+                            graph.getValue(input)
+                        except Exception:
+                            pass        # The next reader will see the error.
+                    return True
+                if not graph.runExclusively(step):
+                    return False
+        finally:
+            self._revalidating = None
+        if inputs:
+            self.revalidated += 1
+        return True
+
+    def runPending(self):
+        """Recalculates the queued nodes until none are left."""
+        while True:
+            with self._condition:
+                if not self._queue:
+                    return
+                node = self._queue.popleft()
+                self._queued.discard(node)
+            self.revalidate(node)
+
+    def start(self):
+        """Starts recalculating on a background thread and has the graph
+        serve stale values, giving the graph a lock if it has none.
+
+        """
+        self.graph.shareWithThreads()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        self.graph.revalidator = self
+
+    def stop(self):
+        """Stops serving stale values and stops the background thread.
+
+        """
+        if self.graph.revalidator is self:
+            self.graph.revalidator = None
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._queue:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+            self.runPending()
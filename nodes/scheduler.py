@@ -0,0 +1,108 @@
+"""nodes.scheduler: Evaluating targets in priority order, within
+deadlines.
+
+When many targets are invalid at once, Graph.evaluate() recalculates
+them by priority rather than in whatever order they happen to be read,
+so a latency-sensitive target never waits behind a heavy one that
+shares its inputs:
+
+    quote, report = graph.evaluate([(quote.Price.node(), 10, 0.05),
+                                    (book.Report.node(), 0, None)])
+
+Each request is a (node, priority, deadline) tuple, where deadline is
+the number of seconds the caller can wait for the value, or None.
+Higher priorities are evaluated first and, among equal priorities,
+earlier deadlines.  Each invalid node a target needs is calculated in
+turn, inputs first, and the scheduler remembers how long each took.  If
+a target's remaining work would overrun its deadline, the value last
+delivered for the target is returned instead, flagged as stale, and the
+target is left to be recalculated later.
+
+Estimates rely on invalidation, so the scheduler is meant for the
+Invalidate and Eager propagation strategies.
+
+"""
+import time
+import weakref
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+class Result(object):
+    """The outcome of a request:
+
+        * value     The target's value.
+        * stale     True if value is the one last delivered, returned
+                    because recalculating would have missed the deadline.
+        * late      True if value is current but was delivered after
+                    the deadline (no stale value was available).
+
+    """
+    __slots__ = ('node', 'value', 'stale', 'late')
+
+    def __init__(self, node, value, stale=False, late=False):
+        self.node = node
+        self.value = value
+        self.stale = stale
+        self.late = late
+
+    def __repr__(self):
+        return '<Result value=%r;stale=%s;late=%s>' % (self.value, self.stale, self.late)
+
+class Scheduler(object):
+    """Orders the evaluation of a graph's targets.  Created by, and
+    normally used through, Graph.evaluate().
+
+    """
+    def __init__(self, graph, clock=_clock):
+        self.graph = graph
+        self.clock = clock
+        self.costs = weakref.WeakKeyDictionary()       # Last calculation time by node.
+        self.delivered = weakref.WeakKeyDictionary()   # Last value delivered by target.
+
+    def evaluate(self, requests):
+        """Evaluates the requested targets and returns a Result for each,
+        in the order requested.
+
+        """
+        start = self.clock()
+        requests = [(request, 0, None) if not isinstance(request, tuple) else
+                    tuple(request) + (0, None)[len(request) - 1:] for request in requests]
+        def rank(index):
+            node, priority, deadline = requests[index]
+            return (-priority, float('inf') if deadline is None else deadline, index)
+        results = [None] * len(requests)
+        for index in sorted(range(len(requests)), key=rank):
+            node, priority, deadline = requests[index]
+            results[index] = self._evaluate(node, None if deadline is None else start + deadline)
+        return results
+
+    def _plan(self, target):
+        """Returns the invalid nodes the target needs, inputs first."""
+        needed = set()
+        stack = [target]
+        while stack:
+            node = stack.pop()
+            if node in needed or node.isValid():
+                continue
+            needed.add(node)
+            stack.extend(node._inputs)
+        return [node for node in self.graph.topologicalOrder(needed) if node in needed]
+
+    def _evaluate(self, target, deadline):
+        graph = self.graph
+        plan = self._plan(target)
+        if deadline is not None and target in self.delivered:
+            remaining = sum(self.costs.get(node, 0.0) for node in plan)
+            if self.clock() + remaining > deadline:
+                return Result(target, self.delivered[target], stale=True)
+        for node in plan:
+            if deadline is not None and target in self.delivered:
+                if self.clock() + self.costs.get(node, 0.0) > deadline:
+                    return Result(target, self.delivered[target], stale=True)
+            if not node.isValid():
+                start = self.clock()
+                graph.getValue(node)
+                self.costs[node] = self.clock() - start
+        value = graph.getValue(target)
+        self.delivered[target] = value
+        return Result(target, value, late=deadline is not None and self.clock() > deadline)
@@ -0,0 +1,118 @@
+"""nodes.sharedmem: Keeping large array results in shared memory.
+
+A SharedValueStore installed as a graph's valueStore moves each large
+NumPy array a node calculates into a memory-mapped segment, and the
+node memoizes a read-only view of the segment in its place.  Such views
+pickle as a reference to their segment rather than as their contents,
+so sending one to another process on the same machine (a process pool
+worker, a snapshot, a LocalTransport) copies nothing: the receiving
+process maps the same segment.
+
+    graph.valueStore = SharedValueStore()
+
+Segments are files in /dev/shm (where available) or the temporary
+directory.  A segment is removed once the view owning it is garbage
+collected in the process that created it; processes that have already
+mapped it keep their mapping.  A process that receives a reference
+only after that point cannot attach to it, so values should not be
+sent anywhere after the node holding them is invalidated.
+
+Requires NumPy; without it the store leaves every value as it is.
+
+"""
+import os
+import tempfile
+import uuid
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def _attach(path, dtype, shape):
+    """Maps an existing segment read-only and returns a SharedArray view
+    of it.  Used to unpickle SharedArrays.
+
+    """
+    mapped = numpy.memmap(path, dtype=numpy.dtype(dtype), mode='r', shape=shape)
+    view = mapped.view(SharedArray)
+    view._segment = (path, dtype, shape, view.__array_interface__['data'][0])
+    return view
+
+if numpy is not None:
+
+    class SharedArray(numpy.ndarray):
+        """A read-only array held in a shared memory segment.
+
+        The full array pickles as a reference to its segment; slices and
+        other derived views pickle by value as usual.
+
+        """
+        def __array_finalize__(self, obj):
+            self._segment = getattr(obj, '_segment', None)
+
+        def _isWholeSegment(self):
+            if self._segment is None:
+                return False
+            path, dtype, shape, address = self._segment
+            return (self.shape == shape and self.dtype.str == dtype
+                    and self.flags.c_contiguous
+                    and self.__array_interface__['data'][0] == address)
+
+        def __reduce__(self):
+            if self._isWholeSegment():
+                path, dtype, shape, address = self._segment
+                return _attach, (path, dtype, shape)
+            return numpy.asarray(self).__reduce__()
+
+else:
+    SharedArray = None
+
+def _defaultDirectory():
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+class SharedValueStore(object):
+    """Moves NumPy arrays of at least threshold bytes into shared
+    memory segments under directory.
+
+    """
+    def __init__(self, directory=None, threshold=1 << 20):
+        self.directory = directory or _defaultDirectory()
+        self.threshold = threshold
+        self._owned = {}       # Segment path -> weak reference to the owning view.
+
+    def adopt(self, value):
+        """Returns value, or a read-only shared view of it if it is a large
+        enough array.
+
+        """
+        if (numpy is None or not isinstance(value, numpy.ndarray)
+                or isinstance(value, SharedArray) or value.dtype.hasobject
+                or value.nbytes < max(self.threshold, 1)):
+            return value
+        path = os.path.join(self.directory, 'nodes-%s' % uuid.uuid4().hex)
+        segment = numpy.memmap(path, dtype=value.dtype, mode='w+', shape=value.shape)
+        segment[...] = value
+        segment.flush()
+        del segment
+        view = _attach(path, value.dtype.str, value.shape)
+        self._owned[path] = weakref.ref(view, lambda ref, path=path: self._release(path))
+        return view
+
+    def _release(self, path):
+        self._owned.pop(path, None)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def close(self):
+        """Removes every segment this store created.  Views already
+        mapped remain readable.
+
+        """
+        for path in list(self._owned):
+            self._release(path)
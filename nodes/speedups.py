@@ -0,0 +1,76 @@
+"""nodes.speedups: The memoized read path in a single call.
+
+Calling a graph method normally passes through GraphInstanceMethod,
+Graph.lookupNode, Graph.getValue and Node.getValue before returning a
+memoized value.  readValue() does the lookup, validity check and edge
+recording for that common case itself, and hands everything else (a
+node that must be created or recalculated, a locked, traced or scoped
+graph, listeners to notify, argument keys and cache policies, and a
+read made while another graph is calculating) to the full path,
+Graph._readValue.
+
+readValue is implemented by the _speedups C extension where it has
+been built (see setup.py), except on Python 3.11 and later, and
+otherwise in Python.  Both behave identically; accelerated tells which
+is in use.
+
+"""
+import sys
+
+try:
+    from _thread import _local
+except ImportError:
+    from thread import _local
+
+_COMPUTING = 0x0008     # Node.COMPUTING
+
+class _Computing(_local):
+    graph = None        # The graph calculating a value on the thread, if any.
+
+_computing = _Computing()
+
+def _pyReadValue(graph, graphInstanceMethod, args):
+    """Returns the value of the graph instance method called with args
+    on graph.
+
+    """
+    graphMethod = graphInstanceMethod.graphMethod
+    if (graphMethod.argKey is None and graphMethod.cache is None and graph.lock is None
+            and graph.tracer is None and graph._activeScope is None):
+        if args:
+            nodes = graphInstanceMethod._nodes
+            node = nodes.get(args) if nodes is not None else None
+        else:
+            node = graphInstanceMethod._node
+        if node is not None and node._graph is graph and not node._flags & _COMPUTING:
+            outputNode = graph.activeNode
+            if outputNode is not None or not (graph._expiring or graph.eventListeners
+                                              or _computing.graph is not None):
+                if node._isOverlaid:
+                    value = node._overlaidValue
+                elif node._isSet:
+                    value = node._setValue
+                elif node._isCalced and node._verifiedAt == graph.revision:
+                    value = node._calcedValue
+                else:
+                    return graph._readValue(graphInstanceMethod, args)
+                counters = graph.counters
+                counters.lookups += 1
+                counters.hits += 1
+                if outputNode is not None:
+                    outputNode._inputs.add(node)
+                    outputNode._reads.append(node)
+                    node._outputs.add(outputNode)
+                return value
+    return graph._readValue(graphInstanceMethod, args)
+
+readValue = _pyReadValue
+accelerated = False
+if sys.version_info < (3, 11):
+    # From 3.11 the interpreter specializes the attribute accesses above,
+    # and runs them faster than the extension's generic ones.
+    try:
+        from ._speedups import readValue
+        accelerated = True
+    except ImportError:
+        pass
@@ -0,0 +1,68 @@
+import nodes
+import unittest
+
+keyCalls = []
+
+def countingKey(arg):
+    keyCalls.append(arg)
+    return tuple(arg)
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(argKey=nodes.ContentKey())
+    def Total(self, values):
+        return sum(values)
+
+    @nodes.graphMethod(argKey=nodes.identityKey)
+    def Length(self, values):
+        return len(values)
+
+    @nodes.graphMethod(argKey=nodes.ContentKey(countingKey))
+    def First(self, values):
+        return values[0]
+
+    @nodes.graphMethod(nodes.Settable, argKey=lambda scenario: scenario['name'])
+    def Scenario(self, scenario):
+        return scenario['value']
+
+    @nodes.graphMethod(argKey=nodes.ContentKey())
+    def Lookup(self, table, key):
+        return table[key]
+
+class NodesArgKeysTest(unittest.TestCase):
+
+    def test_contentKey(self):
+        o = NodesClass1()
+        self.assertEquals(o.Total([1, 2, 3]), 6)
+        self.assertTrue(o.Total.node([1, 2, 3]) is o.Total.node([1, 2, 3]))
+        self.assertFalse(o.Total.node([1, 2, 3]) is o.Total.node([1, 2]))
+        self.assertEquals(o.Lookup({'a': [1], 'b': 2}, 'b'), 2)
+        self.assertTrue(o.Lookup.node({'a': [1], 'b': 2}, 'b') is o.Lookup.node({'b': 2, 'a': [1]}, 'b'))
+
+    def test_identityKey(self):
+        o = NodesClass1()
+        values = [1, 2]
+        self.assertEquals(o.Length(values), 2)
+        self.assertTrue(o.Length.node(values) is o.Length.node(values))
+        self.assertFalse(o.Length.node(values) is o.Length.node([1, 2]))
+
+    def test_internedKeys(self):
+        o = NodesClass1()
+        values = [4, 5, 6]
+        del keyCalls[:]
+        self.assertEquals(o.First(values), 4)
+        self.assertEquals(o.First(values), 4)
+        self.assertEquals(o.First(values), 4)
+        self.assertEquals(len(keyCalls), 1)
+        self.assertEquals(o.First([4, 5, 6]), 4)
+        self.assertEquals(len(keyCalls), 2)
+
+    def test_userKey(self):
+        o = NodesClass1()
+        self.assertEquals(o.Scenario({'name': 'base', 'value': 1}), 1)
+        self.assertEquals(o.Scenario({'name': 'base', 'value': 2}), 1)
+        o.Scenario.setValue(5, {'name': 'base'})
+        self.assertEquals(o.Scenario({'name': 'base', 'value': 1}), 5)
+
+if __name__ == '__main__':
+    unittest.main()
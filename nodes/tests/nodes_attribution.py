@@ -0,0 +1,78 @@
+import unittest
+
+import nodes
+
+from nodes.attribution import Attribution
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+clock = Clock()
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Noisy(self):
+        return 1
+
+    @nodes.graphMethod(nodes.Settable)
+    def Quiet(self):
+        return 1
+
+    @nodes.graphMethod
+    def Slow(self):
+        clock.now += 5
+        return self.Noisy() * 2
+
+    @nodes.graphMethod
+    def Total(self):
+        value = self.Slow() + self.Quiet()
+        clock.now += 1
+        return value
+
+class NodesAttributionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+        self.attribution = Attribution(self.graph, window=100, clock=clock)
+
+    def tearDown(self):
+        self.attribution.close()
+
+    def test_attribution(self):
+        o = NodesClass1()
+        o.Total()
+        o.Noisy = 2
+        changeId, source, change = self.attribution.causeOf(o.Total.node())
+        self.assertEquals((source, change), (o.Noisy.node(), 'setValue'))
+        o.Total()
+        self.assertEquals(self.attribution.causeOf(o.Total.node()), None)
+        o.Quiet = 2
+        o.Total()
+        self.assertEquals(self.attribution.costByInput(),
+                          [(o.Noisy.node(), 6.0, 2), (o.Quiet.node(), 1.0, 1)])
+        self.assertEquals(len(self.attribution.report().splitlines()), 3)
+
+    def test_window(self):
+        o = NodesClass1()
+        o.Total()
+        o.Noisy = 2
+        o.Total()
+        clock.now += 1000
+        self.assertEquals(self.attribution.costByInput(), [])
+
+    def test_invalidate(self):
+        o = NodesClass1()
+        o.Total()
+        self.graph.invalidate(o.Slow.node())
+        o.Total()
+        self.assertEquals([(source, count) for source, seconds, count in self.attribution.costByInput()],
+                          [(o.Slow.node(), 2)])
+
+if __name__ == '__main__':
+    unittest.main()
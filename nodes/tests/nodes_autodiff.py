@@ -0,0 +1,145 @@
+import math
+import unittest
+
+import nodes
+
+from nodes.autodiff import Var, derivatives, exp, log
+
+class Option(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Spot(self):
+        return 100.0
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Rate(self):
+        return 0.05
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Time(self):
+        return 2.0
+
+    @nodes.graphMethod(nodes.Settable)
+    def Name(self):
+        return 'option'
+
+    @nodes.graphMethod
+    def Discount(self):
+        return exp(-self.Rate() * self.Time())
+
+    @nodes.graphMethod
+    def Value(self):
+        intrinsic = self.Spot() - 90
+        if intrinsic < 0:
+            return 0.0
+        return intrinsic * self.Discount()
+
+    @nodes.graphMethod
+    def Scaled(self):
+        return 3 * self.Spot()
+
+    @nodes.graphMethod
+    def Doubled(self):
+        return 2 * self.Scaled()
+
+    @nodes.graphMethod
+    def Total(self):
+        return self.Scaled() + self.Doubled()
+
+    @nodes.graphMethod
+    def Capped(self):
+        if self.Rate() == 0:
+            return self.Spot()
+        return self.Spot() * self.Discount()
+
+class NodesAutodiffTest(unittest.TestCase):
+
+    def test_derivatives(self):
+        x, y = Var(3.0), Var(2.0)
+        z = x * y + log(x) / y - x ** 2
+        self.assertEquals(z.value, 6 + math.log(3) / 2 - 9)
+        dx, dy = derivatives(z, [x, y])
+        self.assertAlmostEquals(dx, 2 + 1 / 6.0 - 6)
+        self.assertAlmostEquals(dy, 3 - math.log(3) / 4)
+
+    def test_sharedIntermediate(self):
+        x = Var(2.0)
+        a = x * 3
+        b = a * 2
+        self.assertEquals(derivatives(a + b, [x]), [9.0])
+        self.assertEquals(derivatives(b + a, [x]), [9.0])
+        self.assertEquals(derivatives(a * b, [x, a]), [72.0, 24.0])
+
+    def test_gradientSharedIntermediate(self):
+        o = Option()
+        gradient = nodes.nodes._graph.gradient(o.Total.node(), [o.Spot.node()])
+        self.assertEquals(gradient, {o.Spot.node(): 9.0})
+
+    def test_gradient(self):
+        o = Option()
+        graph = nodes.nodes._graph
+        value = o.Value()
+        gradient = graph.gradient(o.Value.node())
+        self.assertEquals(set(gradient), set([o.Spot.node(), o.Rate.node(), o.Time.node()]))
+        discount = math.exp(-0.1)
+        self.assertAlmostEquals(gradient[o.Spot.node()], discount)
+        self.assertAlmostEquals(gradient[o.Rate.node()], -10 * 2.0 * discount)
+        self.assertAlmostEquals(gradient[o.Time.node()], -10 * 0.05 * discount)
+        self.assertEquals(o.Value(), value)
+        self.assertTrue(o.Value.node().isCalced())
+
+    def test_flat(self):
+        o = Option(Spot=50.0)
+        gradient = nodes.nodes._graph.gradient(o.Value.node(), [o.Spot.node()])
+        self.assertEquals(gradient, {o.Spot.node(): 0.0})
+
+    def test_varExponent(self):
+        x, y = Var(2.0), Var(3.0)
+        z = x ** y
+        self.assertEquals(z.value, 8.0)
+        dx, dy = derivatives(z, [x, y])
+        self.assertAlmostEquals(dx, 12.0)
+        self.assertAlmostEquals(dy, 8.0 * math.log(2.0))
+        x, y = Var(-2.0), Var(3.0)
+        z = x ** y
+        self.assertEquals(z.value, -8.0)
+        self.assertEquals(derivatives(z, [x, y]), [12.0, 0.0])
+        x = Var(0.0)
+        self.assertEquals(derivatives(x ** y, [x, y]), [0.0, 0.0])
+
+    def test_comparisons(self):
+        x = Var(0.0)
+        self.assertTrue(x == 0)
+        self.assertTrue(x == Var(0.0))
+        self.assertFalse(x != 0)
+        self.assertTrue(x != 1)
+        self.assertEquals(hash(x), hash(0.0))
+        self.assertTrue(x in set([0.0]))
+        o = Option(Rate=0.0)
+        gradient = nodes.nodes._graph.gradient(o.Capped.node(), [o.Spot.node(), o.Rate.node()])
+        self.assertEquals(gradient, {o.Spot.node(): 1.0, o.Rate.node(): 0.0})
+        o.Rate = 0.05
+        gradient = nodes.nodes._graph.gradient(o.Capped.node(), [o.Spot.node(), o.Rate.node()])
+        self.assertAlmostEquals(gradient[o.Spot.node()], math.exp(-0.1))
+        self.assertAlmostEquals(gradient[o.Rate.node()], -100 * 2.0 * math.exp(-0.1))
+
+    def test_activeContext(self):
+        o = Option()
+        with nodes.GraphContext(lazy=True):
+            o.Rate.overlayValue(0.1)
+            gradient = nodes.nodes._graph.gradient(o.Value.node(), [o.Spot.node()])
+            self.assertAlmostEquals(gradient[o.Spot.node()], math.exp(-0.2))
+            self.assertAlmostEquals(o.Value(), 10 * math.exp(-0.2))
+        self.assertAlmostEquals(o.Value(), 10 * math.exp(-0.1))
+
+    def test_lazyPropagation(self):
+        graph = nodes.Graph()
+        o = Option(graph=graph)
+        graph.setPropagation(nodes.Lazy)
+        value = o.Value()
+        gradient = graph.gradient(o.Value.node(), [o.Spot.node()])
+        self.assertAlmostEquals(gradient[o.Spot.node()], math.exp(-0.1))
+        self.assertEquals(o.Value(), value)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -70,6 +70,22 @@ class NodesClass5(nodes.GraphObject):
     def C(self):
         return 'X'
 
+class NodesClass6(nodes.GraphObject):
+
+    @nodes.graphMethod
+    def A(self):
+        return self.B()
+
+    @nodes.graphMethod
+    def B(self):
+        if self.C():
+            return self.A()
+        return 'b'
+
+    @nodes.graphMethod(nodes.Settable)
+    def C(self):
+        return True
+
 class NodesTest1(unittest.TestCase):
 
     def test_simple(self):
@@ -191,6 +207,20 @@ class NodesTest1(unittest.TestCase):
         o.C.clearSet()
         self.assertEquals(o.toDict(), {'C': 'X'})
 
+    def test_cycle(self):
+        o = NodesClass6()
+        try:
+            o.A()
+        except nodes.GraphCycleError as e:
+            self.assertEquals(e.nodes, [o.A.node(), o.B.node(), o.A.node()])
+            self.assertTrue('NodesClass6.A() -> NodesClass6.B() -> NodesClass6.A()' in str(e))
+        else:
+            self.fail("Expected a GraphCycleError.")
+        self.assertFalse(o.A.node().isComputing())
+        self.assertFalse(o.B.node().isComputing())
+        o.C = False
+        self.assertEquals(o.A(), 'b')
+
 if __name__ == '__main__':
     unittest.main()
 
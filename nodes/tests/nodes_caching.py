@@ -0,0 +1,141 @@
+import nodes
+import unittest
+
+from nodes.tests.recorded import Recorded
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+clock = Clock()
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod
+    def A(self):
+        return self.Double(self.B())
+
+    @nodes.graphMethod(nodes.Settable)
+    def B(self):
+        return 1
+
+    @nodes.graphMethod(nodes.NoMemo)
+    def Double(self, x):
+        return x * 2 + self.C()
+
+    @nodes.graphMethod(nodes.Settable)
+    def C(self):
+        return 0
+
+class NodesClass2(Recorded):
+
+    @nodes.graphMethod
+    def Sum(self):
+        return self.Scaled(1) + self.Scaled(2) + self.Scaled(3)
+
+    @nodes.graphMethod(cache=nodes.LruCache(2))
+    def Scaled(self, n):
+        self.calcs.append(n)
+        return self.Factor() * n
+
+    @nodes.graphMethod(nodes.Settable)
+    def Factor(self):
+        return 10
+
+class NodesClass3(Recorded):
+
+    @nodes.graphMethod
+    def Report(self):
+        return 'Spot: %s' % self.Spot()
+
+    @nodes.graphMethod(cache=nodes.TtlCache(5, clock=clock))
+    def Spot(self):
+        self.calcs.append(clock.now)
+        return clock.now
+
+class NodesClass4(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Deep(self):
+        return False
+
+    @nodes.graphMethod(cache=nodes.LruCache(1))
+    def Level(self, n):
+        if n and self.Deep():
+            return self.Level(n - 1) + 1
+        return 0
+
+class NodesCachingTest(unittest.TestCase):
+
+    def test_noMemo(self):
+        o = NodesClass1()
+        self.assertEquals(o.A(), 2)
+        self.assertEquals(o.Double.node(1).isCalced(), False)
+        self.assertTrue(o.C.node() in o.A.node().inputs)
+        o.C = 1
+        self.assertEquals(o.A(), 3)
+        o.B = 2
+        self.assertEquals(o.A(), 5)
+        self.assertRaises(RuntimeError, nodes.graphMethod(nodes.NoMemo|nodes.Settable), lambda self: None)
+
+    def test_lru(self):
+        o = NodesClass2()
+        self.assertEquals(o.Sum(), 60)
+        self.assertEquals(o.calcs, [1, 2, 3])
+        self.assertFalse(o.Scaled.node(1).isCalced())
+        self.assertTrue(o.Scaled.node(3).isCalced())
+        self.assertTrue(o.Sum.node().isCalced())
+        self.assertEquals(o.Scaled(1), 10)
+        self.assertEquals(o.calcs, [1, 2, 3, 1])
+        o.Factor = 1
+        self.assertFalse(o.Sum.node().isCalced())
+        self.assertEquals(o.Sum(), 6)
+
+    def test_lruEvictedNodesStillPropagate(self):
+        o = NodesClass2()
+        self.assertEquals(o.Sum(), 60)
+        o.Scaled(3)
+        o.Scaled(2)
+        self.assertFalse(o.Scaled.node(1).isCalced())
+        o.Factor = 2
+        self.assertEquals(o.Sum(), 12)
+
+    def test_ttl(self):
+        o = NodesClass3()
+        clock.now = 100.0
+        self.assertEquals(o.Report(), 'Spot: 100.0')
+        clock.now = 104.0
+        self.assertEquals(o.Report(), 'Spot: 100.0')
+        clock.now = 105.0
+        self.assertEquals(o.Report(), 'Spot: 105.0')
+        self.assertEquals(o.calcs, [100.0, 105.0])
+
+    def test_lruComputing(self):
+        graph = nodes.Graph()
+        o = NodesClass4(graph=graph)
+        self.assertEquals(o.Level(1), 0)
+        node = o.Level.node(1)
+        o.Deep = True
+        # Calculating Level(0) must not evict Level(1), which reads it.
+        self.assertEquals(o.Level(1), 1)
+        self.assertTrue(o.Level.node(1) is node)
+        self.assertTrue(node.isCalced())
+        self.assertEquals(graph.nodeCount, len(list(graph.allNodes())))
+
+    def test_ttlPruned(self):
+        graph = nodes.Graph()
+        o, other = NodesClass3(graph=graph), NodesClass1(graph=graph)
+        clock.now = 200.0
+        self.assertEquals(o.Spot(), 200.0)
+        self.assertEquals(graph._expiring, set([o.Spot.graphMethod.cache]))
+        clock.now = 205.0
+        self.assertEquals(other.B(), 1)
+        self.assertFalse(o.Spot.node().isCalced())
+        self.assertEquals(graph._expiring, set())
+
+if __name__ == '__main__':
+    unittest.main()
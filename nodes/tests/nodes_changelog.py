@@ -0,0 +1,88 @@
+import io
+import nodes
+import unittest
+
+from nodes.changelog import ChangeLog, ObjectRegistry, Replica
+
+class Curve(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Rate(self, tenor):
+        return 0.01
+
+    @nodes.graphMethod(nodes.Settable)
+    def Shift(self):
+        return 0.0
+
+    @nodes.graphMethod
+    def Discount(self, tenor):
+        return 1.0 / (1.0 + self.Rate(tenor) + self.Shift()) ** tenor
+
+class NodesChangeLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+        self.writer = Curve()
+        self.reader = Curve()
+        self.writerRegistry = ObjectRegistry()
+        self.writerRegistry.register('usd', self.writer)
+        self.readerRegistry = ObjectRegistry()
+        self.readerRegistry.register('usd', self.reader)
+
+    def tearDown(self):
+        self.graph.readOnly = False
+
+    def test_replay(self):
+        stream = io.BytesIO()
+        log = ChangeLog(self.graph, self.writerRegistry, stream)
+        try:
+            self.writer.Rate.setValue(0.02, 5)
+            self.writer.Rate.setValue(0.03, 10)
+            self.writer.Rate.clearSet(10)
+            with nodes.GraphContext():
+                self.writer.Shift.overlayValue(0.01)
+            self.writer.Shift = 0.005
+            Curve().Shift = 1.0
+        finally:
+            log.close()
+        self.assertEquals(log.sequence, 9)
+
+        stream.seek(0)
+        replica = Replica(self.graph, self.readerRegistry)
+        self.assertEquals(replica.follow(stream), 9)
+        for tenor in (1, 5, 10):
+            self.assertEquals(self.reader.Discount(tenor), self.writer.Discount(tenor))
+        self.assertEquals(self.reader.Rate(5), 0.02)
+        self.assertFalse(self.reader.Shift.isOverlaid())
+        self.assertEquals(self.reader.Shift(), 0.005)
+
+    def test_batch(self):
+        stream = io.BytesIO()
+        log = ChangeLog(self.graph, self.writerRegistry, stream)
+        try:
+            self.graph.applyChanges([nodes.NodeChange(self.writer.Rate, 0.02, 5),
+                                     nodes.NodeChange(Curve().Shift, 1.0),
+                                     nodes.NodeChange(self.writer.Shift, 0.005)])
+        finally:
+            log.close()
+        self.assertEquals(log.sequence, 3)
+
+        stream.seek(0)
+        replica = Replica(self.graph, self.readerRegistry)
+        self.assertEquals(replica.follow(stream), 3)
+        self.assertEquals(self.reader.Rate(5), 0.02)
+        self.assertEquals(self.reader.Shift(), 0.005)
+        self.assertEquals(self.reader.Discount(5), self.writer.Discount(5))
+
+    def test_readOnly(self):
+        Replica(self.graph, self.readerRegistry)
+        def setShift():
+            self.reader.Shift = 1.0
+        self.assertRaises(RuntimeError, setShift)
+
+    def test_outOfOrder(self):
+        replica = Replica(self.graph, self.readerRegistry)
+        self.assertRaises(RuntimeError, replica.apply, (2, 0, 0, ('usd', 'Shift', ())))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import array
+import pickle
+import unittest
+
+import nodes
+
+from nodes.changelog import ObjectRegistry
+from nodes.tests.recorded import Recorded
+
+def changePoints(self, rates):
+    changes = nodes.NodeChangeSet('d')
+    changes.extend(self.Point, [(tenor,) for tenor in range(len(rates))], rates)
+    return changes
+
+def changeBoth(self, value):
+    return [nodes.NodeChange(self.Point, value, 0), nodes.NodeChange(self.Total, value)]
+
+class Curve(Recorded):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Point(self, tenor):
+        return 0.0
+
+    @nodes.graphMethod(delegateTo=changePoints)
+    def Points(self):
+        return [self.Point(tenor) for tenor in range(3)]
+
+    @nodes.graphMethod(delegateTo=changeBoth)
+    def Both(self):
+        return None
+
+    @nodes.graphMethod
+    def Total(self):
+        self.calcs.append('Total')
+        return sum(self.Points())
+
+class NodesChangeSetsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.Graph()
+        self.curve = Curve(graph=self.graph)
+
+    def test_changeSet(self):
+        changes = nodes.NodeChangeSet('d')
+        changes.add(self.curve.Point, 1.5, 0)
+        changes.extend(self.curve.Point, [(1,), (2,)], [2.5, 3.5])
+        self.assertEquals(len(changes), 3)
+        self.assertTrue(isinstance(changes._groups[self.curve.Point][1], array.array))
+        self.assertEquals([(change.args, change.value) for change in changes],
+                          [((0,), 1.5), ((1,), 2.5), ((2,), 3.5)])
+        self.assertRaises(RuntimeError, changes.extend, self.curve.Point, [(3,)], [])
+
+    def test_delegate(self):
+        self.graph.setPropagation(nodes.Eager)
+        self.graph.subscribe(self.curve.Total.node())
+        self.assertEquals(self.curve.Total(), 0.0)
+        self.assertEquals(self.curve.calcs, ['Total'])
+        self.curve.Points = [1.0, 2.0, 3.0]
+        self.assertEquals(self.curve.Point(1), 2.0)
+        self.assertEquals(self.curve.calcs, ['Total', 'Total'])
+        self.assertEquals(self.curve.Total(), 6.0)
+
+    def test_atomic(self):
+        self.assertRaises(RuntimeError, self.curve.Both.setValue, 1.0)
+        self.assertFalse(self.curve.Point.isSet(0))
+        self.assertEquals(self.curve.Total(), 0.0)
+
+    def test_layer(self):
+        with nodes.graphLayer(graph=self.graph):
+            self.curve.Points = [1.0, 2.0, 3.0]
+            self.assertEquals(self.curve.Total(), 6.0)
+        self.assertEquals(self.curve.Total(), 0.0)
+
+    def test_pack(self):
+        registry = ObjectRegistry()
+        registry.register('usd', self.curve)
+        changes = changePoints(self.curve, [1.0, 2.0, 3.0])
+        packed = pickle.loads(pickle.dumps(changes.pack(registry), 2))
+        other = Curve(graph=nodes.Graph())
+        otherRegistry = ObjectRegistry()
+        otherRegistry.register('usd', other)
+        other.Total.graph.applyChanges(nodes.NodeChangeSet.unpack(packed, otherRegistry))
+        self.assertEquals(other.Total(), 6.0)
+        self.assertEquals(self.curve.Total(), 0.0)
+
+    def test_singleWalk(self):
+        self.assertEquals(self.curve.Total(), 0.0)
+        counters = self.graph.counters
+        walks, invalidations = counters.invalidationWalks, counters.invalidations
+        changed = []
+        self.graph.changeListeners.append(lambda node, change, value: changed.append((node, change, value)))
+        self.curve.Points = [1.0, 2.0, 3.0]
+        self.assertEquals(counters.invalidationWalks, walks + 1)
+        self.assertEquals(counters.invalidations, invalidations + 2)
+        self.assertEquals(changed, [(None, 'setValues', [(self.curve.Point.node(0), 1.0),
+                                                         (self.curve.Point.node(1), 2.0),
+                                                         (self.curve.Point.node(2), 3.0)])])
+        self.assertEquals(self.curve.Total(), 6.0)
+        self.assertEquals(self.curve.calcs, ['Total', 'Total'])
+
+    def test_lazyPropagation(self):
+        self.graph.setPropagation(nodes.Lazy)
+        self.assertEquals(self.curve.Total(), 0.0)
+        revision = self.graph.revision
+        self.curve.Points = [1.0, 2.0, 3.0]
+        self.assertEquals(self.graph.revision, revision + 1)
+        self.assertEquals(self.curve.Total(), 6.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import errno
+import nodes
+import socket
+import threading
+import unittest
+
+from multiprocessing import AuthenticationError
+from nodes.distributed import _isConnectionFailure, Cluster, GraphServer, GraphService, LocalTransport, RemoteError, SocketTransport, serve
+
+class Position(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Quantity(self):
+        return 1
+
+    @nodes.graphMethod(nodes.Settable)
+    def Price(self):
+        return 10
+
+    @nodes.graphMethod
+    def Value(self):
+        return self.Quantity() * self.Price()
+
+class Book(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Positions(self):
+        return []
+
+    @nodes.graphMethod
+    def Value(self):
+        return sum(position.Value() for position in self.Positions())
+
+class CountingTransport(LocalTransport):
+
+    def __init__(self, server):
+        LocalTransport.__init__(self, server)
+        self.messages = []
+
+    def request(self, messages):
+        self.messages.extend(messages)
+        return LocalTransport.request(self, messages)
+
+class NodesDistributedTest(unittest.TestCase):
+
+    def setUp(self):
+        # Each partition, and the client, has a graph of its own.
+        a = GraphServer('a', graph=nodes.Graph())
+        b = GraphServer('b', peers={'a': LocalTransport(a)}, graph=nodes.Graph())
+        a.register('pos1', Position(graph=a.graph))
+        a.register('pos2', Position(graph=a.graph, Quantity=2))
+        b.register('book', Book(graph=b.graph, Positions=[b.proxy('a', 'pos1'), b.proxy('a', 'pos2')]))
+        self.a, self.b = a, b
+        self.transport = CountingTransport(b)
+        self.cluster = Cluster({'a': LocalTransport(a), 'b': self.transport})
+
+    def gets(self):
+        return len([m for m in self.transport.messages if m[0] == 'get'])
+
+    def test_remoteRead(self):
+        book = self.cluster.proxy('b', 'book')
+        self.assertEquals(book.Value(), 30)
+        self.assertEquals(book.Value(), 30)
+        self.assertEquals(self.gets(), 1)
+
+    def test_invalidationForwarding(self):
+        book = self.cluster.proxy('b', 'book')
+        pos1 = self.cluster.proxy('a', 'pos1')
+        self.assertEquals(book.Value(), 30)
+        pos1.Quantity = 3
+        self.assertFalse(book.Value.node().isValid())
+        self.assertEquals(book.Value(), 50)
+        self.assertEquals(pos1.Value(), 30)
+        pos1.Quantity.clearSet()
+        self.assertEquals(book.Value(), 30)
+        self.assertEquals(self.gets(), 3)
+
+    def test_localDependents(self):
+        class Report(nodes.GraphObject):
+
+            @nodes.graphMethod(nodes.Settable)
+            def Book(self):
+                return None
+
+            @nodes.graphMethod
+            def Text(self):
+                return 'Book: %s' % self.Book().Value()
+
+        report = Report(Book=self.cluster.proxy('b', 'book'))
+        self.assertEquals(report.Text(), 'Book: 30')
+        self.cluster.proxy('a', 'pos2').Price = 100
+        self.assertEquals(report.Text(), 'Book: 210')
+
+    def test_prefetch(self):
+        pos1 = self.cluster.proxy('a', 'pos1')
+        book = self.cluster.proxy('b', 'book')
+        self.cluster.prefetch([(book.Value, ()), (pos1.Price, ())])
+        self.assertEquals(self.gets(), 1)
+        self.assertEquals(book.Value(), 30)
+        self.assertEquals(self.gets(), 1)
+
+    def test_sharedGraph(self):
+        a = GraphServer('a')
+        b = GraphServer('b', peers={'a': LocalTransport(a)})
+        a.register('pos1', Position(Price=5))
+        b.register('book', Book(Positions=[b.proxy('a', 'pos1')]))
+        cluster = Cluster({'a': LocalTransport(a), 'b': LocalTransport(b)})
+        self.assertEquals(cluster.proxy('b', 'book').Value(), 5)
+
+    def test_register(self):
+        self.assertRaises(RuntimeError, self.a.register, 'pos3', Position())
+        self.assertFalse('pos3' in self.a._objects)
+
+    def test_remoteError(self):
+        book = self.cluster.proxy('b', 'book')
+        self.assertRaises(RemoteError, book.NoSuchMethod)
+
+    def test_authkey(self):
+        self.assertRaises(RuntimeError, SocketTransport, ('localhost', 0), None)
+        self.assertRaises(RuntimeError, SocketTransport, ('localhost', 0), b'')
+        self.assertRaises(RuntimeError, serve, self.a, ('localhost', 0), None)
+        self.assertRaises(RuntimeError, GraphService, self.a, ('localhost', 0), b'')
+
+    def test_connectionFailures(self):
+        self.assertTrue(_isConnectionFailure(AuthenticationError('digest received was wrong')))
+        self.assertTrue(_isConnectionFailure(EOFError()))
+        self.assertTrue(_isConnectionFailure(socket.error(errno.ECONNRESET, 'reset')))
+        self.assertFalse(_isConnectionFailure(socket.error(errno.EMFILE, 'too many open files')))
+        self.assertFalse(_isConnectionFailure(socket.error(errno.EBADF, 'bad file descriptor')))
+
+    def test_socketTransport(self):
+        service = GraphService(self.a, ('localhost', 0), b'secret')
+        thread = threading.Thread(target=service.run)
+        thread.daemon = True
+        thread.start()
+        def stop():
+            service.close()
+            thread.join(5)
+        self.addCleanup(stop)
+        transport = SocketTransport(service.address, b'wrong')
+        self.assertRaises(AuthenticationError, transport.request, [('drain',)])
+        transport = SocketTransport(service.address, b'secret')
+        try:
+            cluster = Cluster({'a': transport}, graph=nodes.Graph())
+            pos1 = cluster.proxy('a', 'pos1')
+            self.assertEquals(pos1.Value(), 10)
+            pos1.Quantity = 3
+            self.assertEquals(pos1.Value(), 30)
+            self.assertRaises(RemoteError, pos1.NoSuchMethod)
+        finally:
+            transport.close()
+        self.assertTrue(thread.is_alive())
+        stop()
+        self.assertFalse(thread.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import threading
+import unittest
+
+import nodes
+
+def changeSpot(self, value):
+    return [nodes.NodeChange(self.Spot, value * 2)]
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Spot(self):
+        return 10
+
+    @nodes.graphMethod(delegateTo=changeSpot)
+    def HalfSpot(self):
+        return self.Spot() / 2
+
+    @nodes.graphMethod
+    def Scaled(self):
+        return self.Spot() * 3
+
+class NodesClass2(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Source(self):
+        return None
+
+    @nodes.graphMethod
+    def Copied(self):
+        return self.Source().Spot()
+
+class NodesGraphsTest(unittest.TestCase):
+
+    def test_independent(self):
+        g1, g2 = nodes.Graph(), nodes.Graph()
+        o1, o2 = NodesClass1(graph=g1), NodesClass1(graph=g2, Spot=20)
+        self.assertTrue(o1.Scaled.graph is g1)
+        self.assertTrue(o2.Scaled.node().graph is g2)
+        self.assertEquals(o1.Scaled(), 30)
+        self.assertEquals(o2.Scaled(), 60)
+        o1.Spot = 5
+        self.assertTrue(o2.Scaled.node().isValid())
+        self.assertEquals(o1.Scaled(), 15)
+        self.assertEquals(g1.stats()['nodes'], 2)
+        self.assertEquals(g2.stats()['nodes'], 2)
+        o1.HalfSpot = 4
+        self.assertEquals(o1.Spot(), 8)
+        self.assertEquals(o2.Spot(), 20)
+
+    def test_activate(self):
+        graph = nodes.Graph()
+        self.assertTrue(nodes.defaultGraph() is nodes.nodes._graph)
+        with graph.activate():
+            self.assertTrue(nodes.defaultGraph() is graph)
+            o = NodesClass1()
+            with nodes.GraphContext() as c:
+                o.Spot.overlayValue(1)
+                self.assertEquals(o.Scaled(), 3)
+            self.assertTrue(c._graph is graph)
+            with nodes.graphLayer() as layer:
+                o.Spot = 2
+                self.assertEquals(o.Scaled(), 6)
+            self.assertTrue(layer._graph is graph)
+        self.assertTrue(nodes.defaultGraph() is nodes.nodes._graph)
+        self.assertTrue(o.Spot.graph is graph)
+        self.assertEquals(o.Scaled(), 30)
+        self.assertFalse(nodes.nodes._graph.isComputing())
+
+    def test_threads(self):
+        results = {}
+        def work(name):
+            graph = nodes.Graph()
+            with graph.activate():
+                o = NodesClass1(Spot=len(name))
+                results[name] = (o.Scaled(), nodes.defaultGraph() is graph)
+        threads = [threading.Thread(target=work, args=(name,)) for name in ('a', 'bb', 'ccc')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(results, {'a': (3, True), 'bb': (6, True), 'ccc': (9, True)})
+        self.assertTrue(nodes.defaultGraph() is nodes.nodes._graph)
+
+    def test_sharing(self):
+        graph = nodes.Graph()
+        self.assertTrue(graph.isQuiet())
+        with nodes.GraphContext(graph):
+            self.assertFalse(graph.isQuiet())
+        with nodes.graphLayer(graph=graph):
+            self.assertFalse(graph.isQuiet())
+        self.assertEquals(graph.runExclusively(lambda x: x * 2, 3), 6)
+        graph.shareWithThreads()
+        lock = graph.lock
+        self.assertTrue(lock is not None)
+        graph.shareWithThreads()
+        self.assertTrue(graph.lock is lock)
+        owners = []
+        def inner():
+            owners.append(graph._lockOwner)
+        graph.runExclusively(lambda: graph.runExclusively(inner) or owners.append(graph._lockOwner))
+        self.assertEquals(len(set(owners)), 1)
+        self.assertTrue(owners[0] is not None)
+        self.assertEquals(graph._lockOwner, None)
+
+    def test_lookupOnAnotherGraph(self):
+        g1, g2 = nodes.Graph(), nodes.Graph()
+        o = NodesClass1(graph=g1)
+        self.assertRaises(RuntimeError, g2.lookupNode, o.Scaled, ())
+        self.assertFalse(o in g2.graphObjects)
+        self.assertEquals(g2.nodeCount, 0)
+        self.assertEquals(o.Scaled(), 30)
+        self.assertRaises(RuntimeError, g2.lookupNode, o.Scaled, ())
+        self.assertRaises(RuntimeError, g2.applyChanges, [nodes.NodeChange(o.Spot, 5)])
+        self.assertEquals(o.Spot(), 10)
+
+    def test_crossGraphRead(self):
+        g1, g2 = nodes.Graph(), nodes.Graph()
+        o2 = NodesClass1(graph=g2)
+        o1 = NodesClass2(graph=g1, Source=o2)
+        self.assertRaises(RuntimeError, o1.Copied)
+        self.assertEquals(o2.Spot(), 10)            # Now memoized.
+        self.assertRaises(RuntimeError, o1.Copied)
+        self.assertFalse(o1.Copied.node().isCalced())
+        self.assertEquals(o2.Scaled(), 30)
+        o3 = NodesClass1(graph=g1)
+        o1.Source = o3
+        self.assertEquals(o1.Copied(), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import nodes
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Spot(self):
+        return 10
+
+    @nodes.graphMethod
+    def Scaled(self, factor):
+        return self.Spot() * factor
+
+class NodesClass2(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Source(self):
+        return None
+
+    @nodes.graphMethod
+    def Shifted(self):
+        return self.Source().Spot() + 1
+
+class NodesIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+
+    def test_index(self):
+        o = NodesClass1()
+        self.assertEquals(o.Scaled(2), 20)
+        self.assertEquals(o.Scaled(3), 30)
+        self.assertTrue(o.Spot._node is o.Spot.node())
+        self.assertEquals(o.Scaled._node, None)
+        self.assertEquals(o.Scaled._nodes, {(2,): o.Scaled.node(2), (3,): o.Scaled.node(3)})
+        self.assertEquals(self.graph.lookupNode(o.Scaled, (4,), create=False), None)
+        self.assertTrue(o in self.graph.graphObjects)
+        ownNodes = set([o.Spot.node(), o.Scaled.node(2), o.Scaled.node(3)])
+        self.assertTrue(ownNodes <= set(self.graph.allNodes()))
+
+    def test_removeObject(self):
+        o, p = NodesClass1(), NodesClass1()
+        o.Scaled(2)
+        p.Scaled(2)
+        count = self.graph.stats()['nodes']
+        spot = o.Spot.node()
+        self.graph.removeObject(o)
+        self.assertEquals(self.graph.stats()['nodes'], count - 2)
+        self.assertFalse(o in self.graph.graphObjects)
+        self.assertEquals(spot.outputs, set())
+        self.assertFalse(spot in set(self.graph.allNodes()))
+        self.assertEquals(p.Scaled(2), 20)
+
+    def test_removedDependency(self):
+        o = NodesClass1()
+        q = NodesClass2(Source=o)
+        self.assertEquals(q.Shifted(), 11)
+        self.graph.removeObject(o)
+        self.assertFalse(q.Shifted.node().isValid())
+        o.Spot = 10
+        self.assertEquals(q.Shifted(), 11)
+        o.Spot = 1
+        self.assertEquals(q.Shifted(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
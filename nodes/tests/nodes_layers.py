@@ -0,0 +1,129 @@
+import unittest
+
+import nodes
+
+from nodes.tests.recorded import Recorded
+
+class NodesClass1(Recorded):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Quantity(self):
+        return 1
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Price(self):
+        return 10
+
+    @nodes.graphMethod
+    def Value(self):
+        self.calcs.append('Value')
+        return self.Quantity() * self.Price()
+
+    @nodes.graphMethod(nodes.Settable)
+    def Flag(self):
+        return False
+
+    @nodes.graphMethod
+    def Switched(self):
+        return self.Price() if self.Flag() else 0
+
+    @nodes.graphMethod
+    def Report(self):
+        self.calcs.append('Report')
+        return 'Price %s' % self.Price()
+
+class NodesLayersTest(unittest.TestCase):
+
+    def test_sandbox(self):
+        o = NodesClass1()
+        self.assertEquals(o.Value(), 10)
+        with nodes.graphLayer() as sandbox:
+            o.Quantity = 3
+            self.assertTrue(o.Quantity.isSet())
+            self.assertEquals(o.Value(), 30)
+            self.assertEquals(o.Report(), 'Price 10')
+        self.assertFalse(o.Quantity.isSet())
+        self.assertEquals(o.Value(), 10)
+        self.assertEquals(o.Report(), 'Price 10')
+        self.assertEquals(o.calcs, ['Value', 'Value', 'Report'])
+        with sandbox:
+            self.assertEquals(o.Value(), 30)
+        self.assertEquals(o.calcs, ['Value', 'Value', 'Report'])
+
+    def test_childLayers(self):
+        o = NodesClass1()
+        with nodes.graphLayer() as parent:
+            o.Quantity = 2
+            self.assertEquals(o.Value(), 20)
+            with nodes.graphLayer() as child:
+                self.assertEquals(o.Value(), 20)
+                o.Price = 5
+                self.assertEquals(o.Value(), 10)
+                self.assertRaises(RuntimeError, o.Quantity.clearSet)
+                o.Price.clearSet()
+                self.assertEquals(o.Value(), 20)
+            self.assertEquals(o.Value(), 20)
+        self.assertEquals(o.calcs.count('Value'), 2)
+
+    def test_globalChanges(self):
+        o = NodesClass1()
+        layer = nodes.graphLayer()
+        with layer:
+            o.Quantity = 2
+            self.assertEquals(o.Value(), 20)
+        o.Price = 7
+        with layer:
+            self.assertEquals(o.Value(), 14)
+        o.Price.clearSet()
+
+    def test_overlays(self):
+        o = NodesClass1()
+        with nodes.graphLayer():
+            o.Quantity = 2
+            overlay = nodes.graphOverlay()
+            with overlay:
+                o.Price.overlayValue(100)
+                self.assertEquals(o.Value(), 200)
+            self.assertEquals(o.Value(), 20)
+            with overlay:
+                self.assertEquals(o.Value(), 200)
+                with nodes.graphOverlay():
+                    o.Quantity.overlayValue(3)
+                    self.assertEquals(o.Value(), 300)
+
+    def test_contexts(self):
+        with nodes.graphLayer():
+            self.assertRaises(RuntimeError, nodes.GraphContext().__enter__)
+        with nodes.GraphContext():
+            self.assertRaises(RuntimeError, nodes.graphLayer().__enter__)
+
+    def test_lazyPropagation(self):
+        graph = nodes.Graph()
+        o = NodesClass1(graph=graph)
+        graph.setPropagation(nodes.Lazy)
+        self.assertEquals(o.Switched(), 0)
+        o.Flag = True
+        layer = nodes.graphLayer(graph=graph)
+        self.assertRaises(RuntimeError, layer.__enter__)
+        self.assertRaises(RuntimeError, nodes.graphOverlay(graph).__enter__)
+        self.assertEquals(o.Switched(), 10)
+        graph.setPropagation(nodes.Invalidate)
+        with layer:
+            o.Price = 99
+            self.assertEquals(o.Switched(), 99)
+            self.assertRaises(RuntimeError, graph.setPropagation, nodes.Lazy)
+        self.assertEquals(o.Switched(), 10)
+
+    def test_underscoreMethods(self):
+        o = NodesClass1()
+        graph = nodes.nodes._graph
+        self.assertEquals(o.Value._getValue(), 10)
+        o.Quantity._setValue(4)
+        self.assertEquals(graph._getValue(o.Value), 40)
+        o.Quantity._clearValue()
+        self.assertEquals(graph._calculateValue(o.Value), 10)
+        reference = nodes.NodeReference(graph, o.Value, ())
+        self.assertTrue(reference.toNode(graph.rootGraphLayer) is o.Value.node())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+
+import nodes
+
+from nodes.tests.recorded import Recorded
+
+class NodesClass1(Recorded):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Rate(self):
+        return 1
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Spot(self):
+        return 10
+
+    @nodes.graphMethod
+    def Forward(self):
+        self.calcs.append('Forward')
+        return self.Spot() * (1 + self.Rate())
+
+    @nodes.graphMethod
+    def Label(self):
+        self.calcs.append('Label')
+        return 'Spot %s' % self.Spot()
+
+class NodesLazyContextTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+
+    def test_overlays(self):
+        o = NodesClass1()
+        self.assertEquals(o.Forward(), 20)
+        c = nodes.GraphContext(lazy=True)
+        with c:
+            o.Rate.overlayValue(2)
+            self.assertTrue(o.Forward.node().isValid())
+            self.assertEquals(o.Forward(), 30)
+            self.assertEquals(o.Forward(), 30)
+        self.assertEquals(o.Forward(), 20)
+        self.assertEquals(o.calcs, ['Forward', 'Forward'])
+        with c:
+            self.assertEquals(o.Forward(), 30)
+            self.assertEquals(o.Rate(), 2)
+        self.assertEquals(o.Rate(), 1)
+
+    def test_untaintedMemoizedGlobally(self):
+        o = NodesClass1()
+        with nodes.GraphContext(lazy=True):
+            o.Rate.overlayValue(2)
+            self.assertEquals(o.Label(), 'Spot 10')
+        self.assertTrue(o.Label.node().isCalced())
+        self.assertEquals(o.Label(), 'Spot 10')
+        self.assertEquals(o.calcs, ['Label'])
+
+    def test_changes(self):
+        o = NodesClass1()
+        with nodes.GraphContext(lazy=True):
+            o.Rate.overlayValue(2)
+            self.assertEquals(o.Forward(), 30)
+            o.Spot = 20
+            self.assertEquals(o.Forward(), 60)
+            o.Rate.overlayValue(3)
+            self.assertEquals(o.Forward(), 80)
+            o.Rate.clearOverlay()
+            self.assertEquals(o.Forward(), 40)
+        o.Spot.clearSet()
+
+    def test_reuse(self):
+        o = NodesClass1()
+        c = nodes.GraphContext(lazy=True)
+        with c:
+            o.Rate.overlayValue(2)
+        with c:
+            o.Spot.overlayValue(5)
+            o.Rate.overlayValue(4)
+            self.assertEquals(o.Forward(), 25)
+        with c:
+            self.assertEquals(o.Forward(), 30)
+
+    def test_parent(self):
+        o = NodesClass1()
+        parent = nodes.GraphContext(lazy=True)
+        with parent:
+            o.Rate.overlayValue(2)
+        child = nodes.GraphContext(parentGraphContext=parent, lazy=True)
+        with child:
+            o.Spot.overlayValue(5)
+            self.assertEquals(o.Forward(), 15)
+        with parent:
+            self.assertEquals(o.Forward(), 30)
+            with child:
+                self.assertEquals(o.Forward(), 15)
+        self.assertRaises(RuntimeError, nodes.GraphContext, parentGraphContext=parent)
+
+    def test_notOverlayable(self):
+        o = NodesClass1()
+        self.assertFalse(o.Forward.graphMethod.isOverlayable())
+        self.assertTrue(o.Rate.graphMethod.isOverlayable())
+        for lazy in (True, False):
+            with nodes.GraphContext(lazy=lazy):
+                self.assertRaises(RuntimeError, o.Forward.overlayValue, 5)
+        with nodes.graphOverlay():
+            self.assertRaises(RuntimeError, o.Forward.overlayValue, 5)
+        self.assertEquals(o.Forward(), 20)
+
+    def test_nesting(self):
+        with nodes.GraphContext(lazy=True):
+            self.assertRaises(RuntimeError, nodes.GraphContext().__enter__)
+            self.assertRaises(RuntimeError, nodes.GraphContext(lazy=True).__enter__)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import nodes
+
+from nodes.metrics import TextfileExporter, prometheusText
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def A(self):
+        return 1
+
+    @nodes.graphMethod
+    def B(self):
+        return self.A() + 1
+
+    @nodes.graphMethod
+    def C(self):
+        return self.B() * 2
+
+class NodesMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+        self.graph.counters.reset()
+
+    def test_counters(self):
+        o = NodesClass1()
+        self.assertEquals(o.C(), 4)
+        stats = self.graph.stats()
+        self.assertEquals(stats['misses'], 3)
+        self.assertEquals(stats['calcs'], 3)
+        self.assertEquals(stats['creations'], 3)
+        self.assertEquals(o.C(), 4)
+        self.assertEquals(self.graph.stats()['hits'], 1)
+
+        o.A = 2
+        stats = self.graph.stats()
+        self.assertEquals(stats['invalidationWalks'], 1)
+        self.assertEquals(stats['invalidations'], 2)
+        self.assertEquals(stats['maxInvalidationWalk'], 2)
+
+        with nodes.GraphContext():
+            o.A.overlayValue(5)
+            self.assertEquals(o.C(), 12)
+        stats = self.graph.stats()
+        self.assertEquals(stats['contextEnters'], 1)
+        self.assertEquals(stats['contextExits'], 1)
+        self.assertEquals(stats['overlaysApplied'], 1)
+
+    def test_exporters(self):
+        snapshots = []
+        self.graph.statsExporters.append(snapshots.append)
+        try:
+            NodesClass1().C()
+            stats = self.graph.exportStats()
+        finally:
+            self.graph.statsExporters.remove(snapshots.append)
+        self.assertEquals(snapshots, [stats])
+
+    def test_prometheusText(self):
+        text = prometheusText({'invalidationWalks': 3, 'nodes': 7}, labels={'graph': 'main'})
+        self.assertEquals(text,
+                '# TYPE nodes_invalidation_walks_total counter\n'
+                'nodes_invalidation_walks_total{graph="main"} 3\n'
+                '# TYPE nodes_nodes gauge\n'
+                'nodes_nodes{graph="main"} 7\n')
+
+    def test_textfileExporter(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'nodes.prom')
+            TextfileExporter(path)(self.graph.stats())
+            with open(path) as f:
+                self.assertTrue('nodes_calcs_total 0\n' in f.read())
+            self.assertEquals(os.listdir(directory), ['nodes.prom'])
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import sys
+import threading
+import time
+import unittest
+
+import nodes
+
+from nodes.precompute import Precomputer
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Spot(self):
+        return 10
+
+    @nodes.graphMethod
+    def Scaled(self):
+        return self.Spot() * 2
+
+    @nodes.graphMethod
+    def Report(self):
+        return 'Report %s' % self.Scaled()
+
+    @nodes.graphMethod
+    def Unread(self):
+        return self.Spot() + 1
+
+    @nodes.graphMethod
+    def Leg(self, index):
+        return self.Spot() + index
+
+    @nodes.graphMethod
+    def Total(self):
+        return sum(self.Leg(index) for index in range(20))
+
+class NodesPrecomputeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+        self.precomputer = Precomputer(self.graph, idle=0.01)
+
+    def tearDown(self):
+        self.precomputer.stop()
+        self.graph.lock = None
+
+    def test_targets(self):
+        o = NodesClass1()
+        o.Report()
+        o.Report()
+        o.Report()
+        o.Scaled()
+        o.Scaled()
+        o.Unread()
+        self.precomputer.limit = 2
+        self.assertEquals(self.precomputer.targets(), [o.Report.node(), o.Scaled.node()])
+
+    def test_precompute(self):
+        o = NodesClass1()
+        o.Report()
+        o.Report()
+        o.Unread()
+        self.precomputer.limit = 1
+        o.Spot = 20
+        self.assertTrue(self.precomputer.precompute())
+        self.assertTrue(o.Report.node().isCalced())
+        self.assertTrue(o.Scaled.node().isCalced())
+        self.assertFalse(o.Unread.node().isCalced())
+        self.assertEquals(self.precomputer.precomputed, 2)
+        o.Spot.clearSet()
+
+    def test_cancel(self):
+        o = NodesClass1()
+        o.Report()
+        generation = self.precomputer._generation
+        o.Spot = 20
+        self.assertFalse(self.precomputer.precompute(generation))
+        self.assertFalse(o.Report.node().isCalced())
+        with nodes.GraphContext():
+            self.assertFalse(self.precomputer.precompute())
+        o.Spot.clearSet()
+
+    def test_background(self):
+        o = NodesClass1()
+        o.Report()
+        self.precomputer.start()
+        o.Spot = 30
+        deadline = time.time() + 5
+        while not o.Report.node().isCalced() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEquals(self.precomputer.precomputed, 2)
+        self.assertEquals(o.Report(), 'Report 60')
+        o.Spot.clearSet()
+
+    def test_concurrentLookups(self):
+        interval = getattr(sys, 'getswitchinterval', lambda: None)()
+        if interval is not None:
+            sys.setswitchinterval(1e-6)     # Switch threads as often as possible.
+        try:
+            for trial in range(10):
+                self.checkConcurrentLookups()
+        finally:
+            if interval is not None:
+                sys.setswitchinterval(interval)
+
+    def checkConcurrentLookups(self):
+        graph = nodes.Graph()
+        graph.lock = threading.RLock()
+        objects = [NodesClass1(graph=graph) for i in range(20)]
+        start = threading.Event()
+        def read(method):
+            start.wait()
+            for o in objects:
+                method(o)
+        readers = [lambda o: o.Total(), lambda o: [o.Leg(index) for index in range(20)],
+                   lambda o: [o.Leg.node(index) for index in reversed(range(20))]]
+        threads = [threading.Thread(target=read, args=(reader,)) for reader in readers * 2]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(graph.nodeCount, len(list(graph.allNodes())))
+        for o in objects:
+            self.assertEquals(o.Spot.node().outputs, set(o.Leg.node(index) for index in range(20)))
+            o.Spot = 1
+            self.assertEquals(o.Total(), 210)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import nodes
+import unittest
+
+from nodes.tests.recorded import Recorded
+
+class NodesClass1(Recorded):
+
+    @nodes.graphMethod
+    def A(self):
+        self.calcs.append('A')
+        return self.B() + self.C()
+
+    @nodes.graphMethod
+    def B(self):
+        self.calcs.append('B')
+        return self.D() * 2
+
+    @nodes.graphMethod(nodes.Settable)
+    def C(self):
+        self.calcs.append('C')
+        return 1
+
+    @nodes.graphMethod(nodes.Settable)
+    def D(self):
+        self.calcs.append('D')
+        return 1
+
+    @nodes.graphMethod(nodes.Settable)
+    def Flag(self):
+        return True
+
+    @nodes.graphMethod(nodes.Settable)
+    def Denominator(self):
+        return 4
+
+    @nodes.graphMethod
+    def Ratio(self):
+        return 1.0 / self.Denominator()
+
+    @nodes.graphMethod
+    def Switched(self):
+        return self.Ratio() if self.Flag() else 0
+
+class NodesPropagationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+        self.o = NodesClass1()
+
+    def tearDown(self):
+        self.graph.setPropagation(nodes.Invalidate)
+        self.graph.subscriptions.clear()
+
+    def test_lazy(self):
+        o, g = self.o, self.graph
+        self.assertEquals(o.A(), 3)
+        g.setPropagation(nodes.Lazy)
+        del o.calcs[:]
+        o.D = 2
+        self.assertTrue(o.A.node().isCalced())
+        self.assertTrue(o.B.node().isCalced())
+        self.assertEquals(o.A(), 5)
+        self.assertEquals(sorted(o.calcs), ['A', 'B'])
+        del o.calcs[:]
+        o.C = 5
+        self.assertEquals(o.A(), 9)
+        self.assertEquals(o.calcs, ['A'])
+        del o.calcs[:]
+        self.assertEquals(o.A(), 9)
+        self.assertEquals(o.calcs, [])
+        o.D.clearSet()
+        o.C.clearSet()
+        self.assertEquals(o.A(), 3)
+
+    def test_lazyBranches(self):
+        o, g = self.o, self.graph
+        g.setPropagation(nodes.Lazy)
+        for denominator in (1, 2, 4, 8):
+            o.Flag = True
+            o.Denominator = denominator
+            self.assertEquals(o.Switched(), 1.0 / denominator)
+            o.Flag = False
+            o.Denominator = 0
+            self.assertEquals(o.Switched(), 0)
+        self.assertEquals(o.Switched.node()._reads, [o.Flag.node()])
+        o.Flag = True
+        self.assertRaises(ZeroDivisionError, o.Switched)
+        o.Denominator = 5
+        self.assertEquals(o.Switched(), 0.2)
+
+    def test_lazyContext(self):
+        o, g = self.o, self.graph
+        g.setPropagation(nodes.Lazy)
+        self.assertEquals(o.A(), 3)
+        with nodes.GraphContext():
+            o.D.overlayValue(3)
+            self.assertEquals(o.A(), 7)
+        self.assertEquals(o.A(), 3)
+
+    def test_switchFromLazy(self):
+        o, g = self.o, self.graph
+        g.setPropagation(nodes.Lazy)
+        self.assertEquals(o.A(), 3)
+        o.D = 2
+        g.setPropagation(nodes.Invalidate)
+        self.assertFalse(o.A.node().isCalced())
+        self.assertEquals(o.A(), 5)
+
+    def test_eager(self):
+        o, g = self.o, self.graph
+        g.setPropagation(nodes.Eager)
+        g.subscribe(o.A.node())
+        self.assertEquals(o.A(), 3)
+        del o.calcs[:]
+        o.D = 2
+        self.assertEquals(sorted(o.calcs), ['A', 'B'])
+        del o.calcs[:]
+        self.assertEquals(o.A(), 5)
+        self.assertEquals(o.calcs, [])
+        with nodes.GraphContext():
+            o.C.overlayValue(0)
+            self.assertEquals(o.calcs, ['A'])
+        self.assertEquals(o.calcs, ['A', 'A'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import nodes
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod
+    def A(self):
+        return self.B() + self.C()
+
+    @nodes.graphMethod(nodes.Settable)
+    def B(self):
+        return self.D()
+
+    @nodes.graphMethod(nodes.Settable)
+    def C(self):
+        return self.D()
+
+    @nodes.graphMethod(nodes.Settable)
+    def D(self):
+        return 1
+
+class NodesClass2(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def X(self, n):
+        if n == 0:
+            return 0
+        return self.X(n - 1) + 1
+
+class NodesQueriesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.o = NodesClass1()
+        self.o.A()
+        self.graph = nodes.nodes._graph
+
+    def test_closures(self):
+        o, g = self.o, self.graph
+        self.assertEquals(set(g.downstream(o.D.node())),
+                          set([o.A.node(), o.B.node(), o.C.node()]))
+        self.assertEquals(set(g.upstream(o.A.node())),
+                          set([o.B.node(), o.C.node(), o.D.node()]))
+        self.assertEquals(list(g.upstream(o.D.node())), [])
+
+    def test_topologicalOrder(self):
+        o, g = self.o, self.graph
+        order = list(g.topologicalOrder([o.A.node()]))
+        self.assertEquals(len(order), 4)
+        self.assertEquals(order[0], o.D.node())
+        self.assertEquals(order[-1], o.A.node())
+
+    def test_pathBetween(self):
+        o, g = self.o, self.graph
+        path = g.pathBetween(o.D.node(), o.A.node())
+        self.assertEquals(len(path), 3)
+        self.assertEquals(path[0], o.D.node())
+        self.assertEquals(path[-1], o.A.node())
+        self.assertEquals(g.pathBetween(o.A.node(), o.D.node()), None)
+
+    def test_invalidatedBy(self):
+        o, g = self.o, self.graph
+        self.assertEquals(set(g.invalidatedBy(o.D.node())),
+                          set([o.A.node(), o.B.node(), o.C.node()]))
+        o.B = 2
+        o.C = 3
+        o.A()
+        self.assertEquals(set(g.invalidatedBy(o.D.node())),
+                          set([o.B.node(), o.C.node()]))
+        o.D = 5
+        self.assertEquals(o.A(), 5)
+        o.B.clearSet()
+        self.assertEquals(o.A(), 8)
+
+    def test_deepGraph(self):
+        o = NodesClass2()
+        self.assertEquals(o.X(50), 50)
+        g = self.graph
+        self.assertEquals(len(list(g.downstream(o.X.node(0)))), 50)
+        self.assertEquals(len(list(g.topologicalOrder([o.X.node(50)]))), 51)
+
+    def test_export(self):
+        o, g = self.o, self.graph
+        f = StringIO()
+        g.writeEdgeList(f, [o.A.node()] + list(g.upstream(o.A.node())))
+        lines = f.getvalue().splitlines()
+        self.assertEquals(len([l for l in lines if l.startswith('e\t')]), 4)
+        self.assertEquals(len([l for l in lines if l.startswith('n\t')]), 4)
+        f = StringIO()
+        g.writeDot(f, [o.D.node()])
+        dot = f.getvalue()
+        self.assertTrue(dot.startswith('digraph nodes {'))
+        self.assertEquals(dot.count('->'), 2)
+        self.assertTrue('NodesClass1.D()' in dot)
+
+    def test_graphVisit(self):
+        o = self.o
+        visited = []
+        def visitor(node):
+            visited.append(node)
+            return list(node.inputs)
+        nodes.graphVisit(o.A.node(), visitor)
+        self.assertEquals(len(visited), 4)
+
+if __name__ == '__main__':
+    unittest.main()
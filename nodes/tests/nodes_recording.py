@@ -0,0 +1,97 @@
+import io
+import nodes
+import unittest
+
+from nodes.changelog import ObjectRegistry
+from nodes.recording import Recorder, percentile, replay
+
+class Quote(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Bid(self):
+        return 99.0
+
+    @nodes.graphMethod(nodes.Settable)
+    def Ask(self):
+        return 101.0
+
+    @nodes.graphMethod
+    def Mid(self):
+        self.reads.append(self.Bid())
+        return (self.Bid() + self.Ask()) / 2
+
+def makeRegistry():
+    quote = Quote()
+    object.__setattr__(quote, 'reads', [])
+    registry = ObjectRegistry()
+    registry.register('quote', quote)
+    return registry
+
+class NodesRecordingTest(unittest.TestCase):
+
+    def test_recordAndReplay(self):
+        graph = nodes.nodes._graph
+        registry = makeRegistry()
+        quote = registry.lookup('quote')
+        stream = io.BytesIO()
+        recorder = Recorder(graph, registry, stream)
+        try:
+            quote.Mid()
+            quote.Bid = 100.0
+            quote.Mid()
+            with nodes.GraphContext() as c:
+                quote.Ask.overlayValue(103.0)
+                quote.Mid()
+            with c:
+                quote.Mid()
+            quote.Bid.clearSet()
+            quote.Mid()
+        finally:
+            recorder.close()
+        self.assertEquals(quote.reads, [99.0, 100.0, 100.0, 100.0, 99.0])
+
+        stream.seek(0)
+        replayed = makeRegistry()
+        report = replay(stream, replayed)
+        self.assertEquals(replayed.lookup('quote').reads, [99.0, 100.0, 100.0, 100.0, 99.0])
+        self.assertEquals(len(report.reads['Quote.Mid()']), 5)
+        self.assertEquals(len(report.changes['setValue']), 1)
+        self.assertEquals(len(report.changes['overlayValue']), 1)
+        self.assertEquals(len(report.changes['enterContext']), 2)
+        self.assertEquals(len(report.changes['exitContext']), 2)
+        self.assertTrue('Quote.Mid()' in report.summary())
+
+    def test_percentile(self):
+        self.assertEquals(percentile([], 0.5), None)
+        self.assertEquals(percentile([1, 2, 3, 4, 5], 0.5), 3)
+        self.assertEquals(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEquals(percentile(list(range(1, 11)), 0.7), 7)
+        self.assertEquals(percentile(list(range(1, 11)), 0.9), 9)
+        self.assertEquals(percentile(list(range(1, 101)), 0.99), 99)
+        self.assertEquals(percentile([1, 2, 3], 0.0), 1)
+        self.assertEquals(percentile([1, 2, 3], 1.0), 3)
+
+    def test_lazyContext(self):
+        graph = nodes.nodes._graph
+        registry = makeRegistry()
+        quote = registry.lookup('quote')
+        stream = io.BytesIO()
+        recorder = Recorder(graph, registry, stream)
+        try:
+            quote.Mid()
+            with nodes.GraphContext(lazy=True):
+                quote.Ask.overlayValue(103.0)
+                quote.Mid()
+            quote.Mid()
+        finally:
+            recorder.close()
+        # The lazy context leaves the base value of Mid alone.
+        self.assertEquals(quote.reads, [99.0, 99.0])
+
+        stream.seek(0)
+        replayed = makeRegistry()
+        replay(stream, replayed)
+        self.assertEquals(replayed.lookup('quote').reads, [99.0, 99.0])
+
+if __name__ == '__main__':
+    unittest.main()
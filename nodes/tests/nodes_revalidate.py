@@ -0,0 +1,141 @@
+import sys
+import threading
+import time
+import unittest
+
+import nodes
+
+from nodes.revalidate import Revalidator
+from nodes.tests.recorded import Recorded
+
+class NodesClass1(Recorded):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Spot(self):
+        return 10
+
+    @nodes.graphMethod(nodes.Revalidate)
+    def Model(self):
+        self.calcs.append('Model')
+        return self.Spot() * 2
+
+    @nodes.graphMethod
+    def Report(self):
+        self.calcs.append('Report')
+        return 'Report %s' % self.Model()
+
+class NodesClass2(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Offset(self):
+        return 0
+
+    @nodes.graphMethod
+    def Leg(self, index):
+        return index * 2
+
+    @nodes.graphMethod(nodes.Revalidate)
+    def Report(self):
+        return sum(self.Leg(self.Offset() + index) for index in range(100))
+
+class NodesRevalidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+        self.revalidator = Revalidator(self.graph)
+
+    def tearDown(self):
+        self.revalidator.stop()
+        self.graph.lock = None
+
+    def test_stale(self):
+        o = NodesClass1()
+        self.assertEquals(o.Model(), 20)
+        o.Spot = 20
+        self.assertTrue(o.Model.isStale())
+        self.assertFalse(o.Model.node().isValid())
+        self.graph.revalidator = self.revalidator
+        self.assertEquals(o.Model(), 20)
+        self.assertEquals(self.revalidator.pending(), [o.Model.node()])
+        self.assertEquals(o.calcs, ['Model'])
+        self.revalidator.runPending()
+        self.assertFalse(o.Model.isStale())
+        self.assertEquals(o.Model(), 40)
+        self.assertEquals(o.calcs, ['Model', 'Model'])
+        self.assertEquals(self.revalidator.revalidated, 1)
+        o.Spot.clearSet()
+
+    def test_nested(self):
+        o = NodesClass1()
+        self.assertEquals(o.Report(), 'Report 20')
+        self.graph.revalidator = self.revalidator
+        o.Spot = 30
+        self.assertEquals(o.Report(), 'Report 60')
+        self.assertEquals(self.revalidator.pending(), [])
+        o.Spot.clearSet()
+
+    def test_contexts(self):
+        o = NodesClass1()
+        o.Model()
+        self.graph.revalidator = self.revalidator
+        with nodes.GraphContext():
+            o.Spot.overlayValue(5)
+            self.assertFalse(o.Model.isStale())
+            self.assertEquals(o.Model(), 10)
+        self.assertFalse(o.Model.isStale())
+        self.assertEquals(o.Model(), 20)
+        self.assertEquals(self.revalidator.pending(), [])
+
+    def test_disabled(self):
+        o = NodesClass1()
+        o.Model()
+        o.Spot = 15
+        self.assertEquals(o.Model(), 30)
+        self.assertFalse(o.Model.isStale())
+        o.Spot.clearSet()
+
+    def test_background(self):
+        o = NodesClass1()
+        o.Model()
+        self.revalidator.start()
+        o.Spot = 50
+        self.assertEquals(o.Model(), 20)
+        deadline = time.time() + 5
+        while o.Model.isStale() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEquals(o.Model(), 100)
+        o.Spot.clearSet()
+
+    def test_concurrentReads(self):
+        graph = nodes.Graph()
+        o = NodesClass2(graph=graph)
+        self.assertEquals(o.Report(), 9900)
+        revalidator = Revalidator(graph)
+        revalidator.start()
+        interval = getattr(sys, 'getswitchinterval', lambda: None)()
+        if interval is not None:
+            sys.setswitchinterval(1e-6)     # Switch threads as often as possible.
+        try:
+            for offset in range(1000, 11000, 1000):
+                o.Offset = offset
+                # The revalidator may already have finished, so the read
+                # sees either the stale value or the new one.
+                self.assertTrue(o.Report() in (9900 + 200 * (offset - 1000), 9900 + 200 * offset))
+                # Look up the legs the revalidator is calculating, last
+                # first, then read them.
+                legs = [o.Leg.node(offset + index) for index in reversed(range(100))]
+                self.assertEquals([graph.getValue(leg) for leg in legs][-1], 2 * offset)
+                deadline = time.time() + 5
+                while o.Report.isStale() and time.time() < deadline:
+                    time.sleep(0.001)
+                self.assertEquals(o.Report(), 9900 + 200 * offset)
+        finally:
+            if interval is not None:
+                sys.setswitchinterval(interval)
+            revalidator.stop()
+        self.assertEquals(graph.nodeCount, len(list(graph.allNodes())))
+        legs = set(o.Leg.node(10000 + index) for index in range(100))
+        self.assertTrue(legs <= o.Report.node().inputs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+
+import nodes
+
+from nodes.tests.recorded import Recorded
+
+class Curve(Recorded):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Rate(self):
+        return 0.01
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Spread(self):
+        return 0.02
+
+    @nodes.graphMethod
+    def Discount(self):
+        self.calcs.append('Discount')
+        return 1 / (1 + self.Rate())
+
+    @nodes.graphMethod
+    def Credit(self):
+        self.calcs.append('Credit')
+        return 1 / (1 + self.Spread())
+
+    @nodes.graphMethod
+    def Price(self):
+        self.calcs.append('Price')
+        return 100 * self.Discount() * self.Credit()
+
+class NodesScenariosTest(unittest.TestCase):
+
+    def test_ladder(self):
+        curve = Curve()
+        graph = nodes.nodes._graph
+        rate = curve.Rate.node()
+        bumps = [0.01 + 0.0001 * i for i in range(1, 4)]
+        base, ladder = graph.evaluateScenarios([curve.Price.node()], [{rate: bump} for bump in bumps])
+        self.assertEquals(base, [100 * (1 / 1.01) * (1 / 1.02)])
+        self.assertEquals(ladder, [[100 * (1 / (1 + bump)) * (1 / 1.02)] for bump in bumps])
+        self.assertEquals(curve.calcs.count('Credit'), 1)
+        self.assertEquals(curve.calcs.count('Discount'), 4)
+        self.assertTrue(curve.Credit.node().isCalced())
+
+    def test_baseContext(self):
+        curve = Curve()
+        graph = nodes.nodes._graph
+        with nodes.GraphContext() as base:
+            curve.Spread.overlayValue(0.03)
+        self.assertEquals(curve.Spread(), 0.02)
+        base, ladder = graph.evaluateScenarios([curve.Price.node()], [{curve.Rate.node(): 0.02}], base)
+        self.assertEquals(base, [100 * (1 / 1.01) * (1 / 1.03)])
+        self.assertEquals(ladder, [[100 * (1 / 1.02) * (1 / 1.03)]])
+        self.assertEquals(curve.calcs.count('Credit'), 1)
+        self.assertFalse(curve.Credit.node().isCalced())
+
+    def test_activeContext(self):
+        curve = Curve()
+        graph = nodes.nodes._graph
+        for lazy in (True, False):
+            with nodes.GraphContext(lazy=lazy):
+                curve.Spread.overlayValue(0.03)
+                base, ladder = graph.evaluateScenarios([curve.Price.node()], [{curve.Rate.node(): 0.02}])
+                self.assertEquals(base, [100 * (1 / 1.01) * (1 / 1.03)])
+                self.assertEquals(ladder, [[100 * (1 / 1.02) * (1 / 1.03)]])
+                self.assertEquals(curve.Spread(), 0.03)
+        self.assertEquals(curve.Price(), 100 * (1 / 1.01) * (1 / 1.02))
+
+    def test_lazyPropagation(self):
+        graph = nodes.Graph()
+        curve = Curve(graph=graph)
+        with nodes.GraphContext(graph, lazy=True) as lazyBase:
+            curve.Spread.overlayValue(0.03)
+        graph.setPropagation(nodes.Lazy)
+        for baseContext in (None, lazyBase):
+            base, ladder = graph.evaluateScenarios([curve.Price.node()], [{curve.Rate.node(): 0.02}], baseContext)
+            spread = 1.02 if baseContext is None else 1.03
+            self.assertEquals(base, [100 * (1 / 1.01) * (1 / spread)])
+            self.assertEquals(ladder, [[100 * (1 / 1.02) * (1 / spread)]])
+        with nodes.GraphContext(graph):
+            curve.Rate.overlayValue(0.02)
+            base, ladder = graph.evaluateScenarios([curve.Price.node()], [{curve.Spread.node(): 0.03}])
+            self.assertEquals(base, [100 * (1 / 1.02) * (1 / 1.02)])
+            self.assertEquals(ladder, [[100 * (1 / 1.02) * (1 / 1.03)]])
+        self.assertEquals(curve.Price(), 100 * (1 / 1.01) * (1 / 1.02))
+
+    def test_sensitivities(self):
+        curve = Curve()
+        other = Curve()
+        graph = nodes.nodes._graph
+        rate, spread, unrelated = curve.Rate.node(), curve.Spread.node(), other.Rate.node()
+        result = graph.sensitivities([curve.Discount.node(), curve.Price.node()], [rate, spread, unrelated], 0.0001)
+        base = 100 * (1 / 1.01) * (1 / 1.02)
+        self.assertEquals(result[unrelated], [0.0, 0.0])
+        self.assertEquals(result[spread][0], 0.0)
+        self.assertAlmostEquals(result[rate][0], -1 / 1.01 ** 2, 3)
+        self.assertAlmostEquals(result[rate][1], -base / 1.01, 1)
+        self.assertAlmostEquals(result[spread][1], -base / 1.02, 1)
+        self.assertEquals(other.calcs, [])
+        self.assertEquals(curve.calcs.count('Credit'), 2)
+
+    def test_sensitivitiesInContext(self):
+        curve = Curve()
+        rate, price = curve.Rate.node(), curve.Price.node()
+        with nodes.GraphContext(lazy=True):
+            curve.Spread.overlayValue(0.03)
+            result = nodes.nodes._graph.sensitivities([price], [rate], 0.0001)
+            self.assertAlmostEquals(result[rate][0], -100 / 1.01 ** 2 / 1.03, 1)
+            self.assertEquals(curve.Spread(), 0.03)
+        self.assertEquals(curve.Price(), 100 * (1 / 1.01) * (1 / 1.02))
+
+    def test_sensitivitiesLazyPropagation(self):
+        graph = nodes.Graph()
+        curve = Curve(graph=graph)
+        graph.setPropagation(nodes.Lazy)
+        rate, price = curve.Rate.node(), curve.Price.node()
+        result = graph.sensitivities([price], [rate], 0.0001)
+        self.assertAlmostEquals(result[rate][0], -100 / 1.01 ** 2 / 1.02, 1)
+        self.assertEquals(curve.Price(), 100 * (1 / 1.01) * (1 / 1.02))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import nodes
+
+from nodes.scheduler import Scheduler
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+clock = Clock()
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Spot(self):
+        return 10
+
+    @nodes.graphMethod
+    def Model(self):
+        self.calcs.append('Model')
+        clock.now += 5
+        return self.Spot() * 2
+
+    @nodes.graphMethod
+    def Quote(self):
+        self.calcs.append('Quote')
+        return self.Model() + 1
+
+    @nodes.graphMethod
+    def Report(self):
+        self.calcs.append('Report')
+        return 'Report %s' % self.Model()
+
+def make():
+    o = NodesClass1()
+    object.__setattr__(o, 'calcs', [])
+    return o
+
+class NodesSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler(nodes.nodes._graph, clock=clock)
+
+    def test_priorities(self):
+        o = make()
+        report, quote = self.scheduler.evaluate([(o.Report.node(), 0, None),
+                                                 (o.Quote.node(), 10, None)])
+        self.assertEquals(o.calcs, ['Quote', 'Model', 'Report'])
+        self.assertEquals(report.value, 'Report 20')
+        self.assertEquals(quote.value, 21)
+        self.assertFalse(quote.stale or quote.late)
+
+    def test_stale(self):
+        o = make()
+        quote, = self.scheduler.evaluate([(o.Quote.node(), 10, 1.0)])
+        self.assertEquals(quote.value, 21)
+        self.assertTrue(quote.late)
+        o.Spot = 20
+        quote, = self.scheduler.evaluate([(o.Quote.node(), 10, 1.0)])
+        self.assertEquals(quote.value, 21)
+        self.assertTrue(quote.stale)
+        self.assertFalse(o.Quote.node().isValid())
+        self.assertEquals(o.calcs, ['Quote', 'Model'])
+        quote, = self.scheduler.evaluate([o.Quote.node()])
+        self.assertEquals(quote.value, 41)
+        self.assertFalse(quote.stale)
+        o.Spot.clearSet()
+
+    def test_graph(self):
+        o = make()
+        result, = nodes.nodes._graph.evaluate([(o.Quote.node(), 1)])
+        self.assertEquals(result.value, 21)
+        self.assertTrue(result.node is o.Quote.node())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import pickle
+import nodes
+import unittest
+
+from nodes.sharedmem import SharedValueStore, numpy
+
+class Grid(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable)
+    def Size(self):
+        return 1000
+
+    @nodes.graphMethod
+    def Values(self):
+        return numpy.arange(self.Size(), dtype=float)
+
+    @nodes.graphMethod
+    def Label(self):
+        return 'grid'
+
+@unittest.skipIf(numpy is None, "NumPy is not installed.")
+class NodesSharedMemTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+        self.store = SharedValueStore(threshold=1024)
+        self.graph.valueStore = self.store
+
+    def tearDown(self):
+        self.graph.valueStore = None
+        self.store.close()
+
+    def test_adopt(self):
+        o = Grid()
+        values = o.Values()
+        self.assertFalse(values.flags.writeable)
+        self.assertEquals(values[999], 999.0)
+        self.assertEquals(o.Label(), 'grid')
+        o.Size = 10
+        self.assertEquals(type(o.Values()), numpy.ndarray)
+
+    def test_pickleByReference(self):
+        o = Grid()
+        values = o.Values()
+        data = pickle.dumps(values, 2)
+        self.assertTrue(len(data) < values.nbytes)
+        copy = pickle.loads(data)
+        self.assertTrue(numpy.array_equal(copy, values))
+        self.assertTrue(len(pickle.dumps(values[:10], 2)) > 80)
+
+    def test_release(self):
+        o = Grid()
+        path = o.Values()._segment[0]
+        self.assertTrue(os.path.exists(path))
+        o.Size = 2000
+        import gc; gc.collect()
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+
+import nodes
+
+from nodes import speedups
+
+try:
+    from nodes._speedups import readValue as cReadValue
+except ImportError:
+    cReadValue = None
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def Spot(self):
+        return 10
+
+    @nodes.graphMethod
+    def Scaled(self, factor):
+        return self.Spot() * factor
+
+    @nodes.graphMethod(nodes.NoMemo)
+    def Unmemoized(self):
+        return self.Spot() + 1
+
+    @nodes.graphMethod
+    def Cycle(self):
+        return self.Cycle()
+
+class ReadValueTests(object):
+
+    def setUp(self):
+        self.graph = nodes.nodes._graph
+
+    def test_hits(self):
+        o = NodesClass1()
+        graph = self.graph
+        self.assertEquals(self.readValue(graph, o.Scaled, (2,)), 20)
+        counters = graph.stats()
+        self.assertEquals(self.readValue(graph, o.Scaled, (2,)), 20)
+        stats = graph.stats()
+        self.assertEquals(stats['lookups'] - counters['lookups'], 1)
+        self.assertEquals(stats['hits'] - counters['hits'], 1)
+        self.assertEquals(stats['calcs'], counters['calcs'])
+
+    def test_values(self):
+        o = NodesClass1()
+        graph = self.graph
+        self.assertEquals(self.readValue(graph, o.Spot, ()), 10)
+        o.Spot = 5
+        self.assertEquals(self.readValue(graph, o.Spot, ()), 5)
+        with nodes.GraphContext():
+            o.Spot.overlayValue(7)
+            self.assertEquals(self.readValue(graph, o.Spot, ()), 7)
+        o.Spot.clearSet()
+        self.assertEquals(self.readValue(graph, o.Unmemoized, ()), 11)
+
+    def test_edges(self):
+        o = NodesClass1()
+        graph = self.graph
+        o.Spot()
+        graph.activeNode = o.Scaled.node(3)
+        try:
+            self.readValue(graph, o.Spot, ())
+        finally:
+            graph.activeNode = None
+        self.assertTrue(o.Spot.node() in o.Scaled.node(3).inputs)
+        self.assertEquals(o.Scaled.node(3)._reads, [o.Spot.node()])
+        self.assertTrue(o.Scaled.node(3) in o.Spot.node().outputs)
+
+    def test_otherGraphComputing(self):
+        o = NodesClass1()
+        o.Spot()
+        speedups._computing.graph = nodes.Graph()
+        try:
+            self.assertRaises(RuntimeError, self.readValue, self.graph, o.Spot, ())
+        finally:
+            speedups._computing.graph = None
+        self.assertEquals(self.readValue(self.graph, o.Spot, ()), 10)
+
+    def test_errors(self):
+        o = NodesClass1()
+        self.assertRaises(nodes.GraphCycleError, self.readValue, self.graph, o.Cycle, ())
+        self.assertRaises(TypeError, self.readValue, self.graph, o.Scaled, ([],))
+
+class NodesPyReadValueTest(ReadValueTests, unittest.TestCase):
+
+    readValue = staticmethod(speedups._pyReadValue)
+
+@unittest.skipIf(cReadValue is None, "the nodes._speedups extension is not built")
+class NodesCReadValueTest(ReadValueTests, unittest.TestCase):
+
+    readValue = staticmethod(cReadValue or speedups._pyReadValue)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import unittest
+
+import nodes
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+class NodesClass1(nodes.GraphObject):
+
+    @nodes.graphMethod(nodes.Settable|nodes.Overlayable)
+    def A(self):
+        return 1
+
+    @nodes.graphMethod
+    def B(self):
+        return self.A() + 1
+
+    @nodes.graphMethod
+    def C(self):
+        return self.B() + self.A()
+
+class NodesTracingTest(unittest.TestCase):
+
+    def test_trace(self):
+        o = NodesClass1()
+        o.B()
+        graph = nodes.nodes._graph
+        with graph.trace() as t:
+            self.assertEquals(o.C(), 3)
+        self.assertTrue(graph.tracer is None)
+        self.assertEquals(len(t.roots), 1)
+        root = t.roots[0]
+        self.assertEquals(root.node, o.C.node())
+        self.assertEquals(root.status, 'miss')
+        self.assertEquals([(s.node, s.status) for s in root.children],
+                          [(o.B.node(), 'hit'), (o.A.node(), 'hit')])
+        self.assertTrue(root.duration >= root.selfTime >= 0)
+        self.assertEquals(len(t.summary().splitlines()), 3)
+
+    def test_context(self):
+        o = NodesClass1()
+        graph = nodes.nodes._graph
+        with nodes.GraphContext() as c:
+            o.A.overlayValue(10)
+            with graph.trace() as t:
+                o.B()
+        span = t.roots[0].children[0]
+        self.assertEquals(span.status, 'overlaid')
+        self.assertTrue(span.graphContext is c)
+
+    def test_chromeTrace(self):
+        o = NodesClass1()
+        with nodes.nodes._graph.trace() as t:
+            o.C()
+        f = StringIO()
+        t.writeChromeTrace(f)
+        events = json.loads(f.getvalue())['traceEvents']
+        self.assertEquals([e['name'] for e in events],
+                          ['NodesClass1.C()', 'NodesClass1.B()', 'NodesClass1.A()', 'NodesClass1.A()'])
+        self.assertEquals([e['args']['status'] for e in events], ['miss', 'miss', 'miss', 'hit'])
+        self.assertEquals(set(e['ph'] for e in events), set(['X']))
+
+if __name__ == '__main__':
+    unittest.main()
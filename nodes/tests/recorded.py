@@ -0,0 +1,19 @@
+"""A GraphObject base class for tests of which graph methods were
+calculated.
+
+"""
+import nodes
+
+class Recorded(nodes.GraphObject):
+    """A GraphObject with a calcs list, to which its graph methods
+    append a note of each calculation.
+
+    """
+    def __getattr__(self, name):
+        # GraphObjects may not override __init__, so the list is made
+        # on first use.
+        if name != 'calcs':
+            raise AttributeError(name)
+        calcs = []
+        object.__setattr__(self, 'calcs', calcs)
+        return calcs
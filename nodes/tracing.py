@@ -0,0 +1,160 @@
+"""nodes.tracing: Tracing individual evaluations.
+
+A Trace records every node read on a graph while it is active as a
+tree of spans, one per read, each nested under the read of the node
+whose calculation made it.  Each span notes whether the read was
+answered from memory or had to calculate, how long it took, and the
+graph context in effect:
+
+    with graph.trace() as t:
+        report.Text()
+
+    print t.summary()
+    t.writeChromeTrace(open('report.json', 'w'))
+
+The Chrome trace-event file can be loaded into chrome://tracing or
+Perfetto.  Outside of a trace the graph pays a single attribute test
+per read.
+
+"""
+import json
+import time
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+class Span(object):
+    """A single node read within a trace.
+
+    status is one of:
+
+        * 'miss'        The node's value was calculated by this read.
+        * 'hit'         The node's memoized value was current.
+        * 'set'         The node has a set value.
+        * 'overlaid'    The node has an overlaid value.
+
+    start and end are seconds since the trace began; calcs counts the
+    calculations made within the span, including those of its children.
+
+    """
+    __slots__ = ('node', 'graphContext', 'start', 'end', 'status', 'calcs', 'children', '_calcs')
+
+    def __init__(self, node, graphContext, start, calcs):
+        self.node = node
+        self.graphContext = graphContext
+        self.start = start
+        self.end = None
+        self.status = None
+        self.calcs = 0
+        self.children = []
+        self._calcs = calcs
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def selfTime(self):
+        """The time spent in the span outside of its children."""
+        return self.duration - sum(child.duration for child in self.children)
+
+    @property
+    def label(self):
+        from .nodes import _nodeLabel
+        return _nodeLabel(self.node)
+
+def _contextLabel(graphContext):
+    if graphContext is None:
+        return None
+    return '%s@%x' % (graphContext.__class__.__name__, id(graphContext))
+
+class Trace(object):
+    """Records the node reads made on a graph while it is active.
+
+    roots holds the spans of top-level reads, in order.
+
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.roots = []
+        self._stack = []
+        self._start = None
+        self._previous = None
+
+    def __enter__(self):
+        self._start = _clock()
+        self._previous, self.graph.tracer = self.graph.tracer, self
+        return self
+
+    def __exit__(self, *args):
+        self.graph.tracer = self._previous
+
+    def enter(self, node):
+        """Opens a span for a read of node.  Called by the graph."""
+        span = Span(node, self.graph.activeGraphContext, _clock() - self._start, self.graph.counters.calcs)
+        if self._stack:
+            self._stack[-1].children.append(span)
+        else:
+            self.roots.append(span)
+        self._stack.append(span)
+        return span
+
+    def exit(self, span):
+        """Closes a span opened by enter().  Called by the graph."""
+        span.end = _clock() - self._start
+        span.calcs = self.graph.counters.calcs - span._calcs
+        node = span.node
+        if span.calcs > sum(child.calcs for child in span.children):
+            span.status = 'miss'
+        elif node._isOverlaid:
+            span.status = 'overlaid'
+        elif node._isSet:
+            span.status = 'set'
+        else:
+            span.status = 'hit'
+        self._stack.pop()
+
+    def spans(self):
+        """Yields every span in the trace, depth first."""
+        stack = list(reversed(self.roots))
+        while stack:
+            span = stack.pop()
+            yield span
+            stack.extend(reversed(span.children))
+
+    def summary(self):
+        """Returns the span tree as text, one indented line per span
+        with its status and total and self times in milliseconds.
+
+        """
+        lines = []
+        stack = [(span, 0) for span in reversed(self.roots)]
+        while stack:
+            span, depth = stack.pop()
+            lines.append('%s%s %s %.3fms (self %.3fms)' % (
+                    '  ' * depth, span.label, span.status, 1000 * span.duration, 1000 * span.selfTime))
+            stack.extend((child, depth + 1) for child in reversed(span.children))
+        return '\n'.join(lines)
+
+    def chromeEvents(self):
+        """Returns the spans as Chrome trace-event 'complete' events."""
+        events = []
+        for span in self.spans():
+            events.append({
+                'name': span.label,
+                'cat': span.status,
+                'ph': 'X',
+                'ts': 1e6 * span.start,
+                'dur': 1e6 * span.duration,
+                'pid': 0,
+                'tid': 0,
+                'args': {
+                    'status': span.status,
+                    'context': _contextLabel(span.graphContext),
+                    'calcs': span.calcs,
+                    },
+                })
+        return events
+
+    def writeChromeTrace(self, f):
+        """Writes the trace to a file in the Chrome trace-event format."""
+        json.dump({'traceEvents': self.chromeEvents(), 'displayTimeUnit': 'ms'}, f)
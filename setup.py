@@ -3,7 +3,25 @@
 # Set-up script for the nodes module.
 #
 
-from setuptools import setup
+from setuptools import setup, Extension
+from setuptools.command.build_ext import build_ext
+
+class optionalBuildExt(build_ext):
+    """Builds the nodes._speedups accelerator if possible.  Without it,
+    nodes.speedups falls back to Python.
+
+    """
+    def run(self):
+        try:
+            build_ext.run(self)
+        except Exception as e:
+            self.warn('skipping nodes._speedups: %s' % (e,))
+
+    def build_extension(self, ext):
+        try:
+            build_ext.build_extension(self, ext)
+        except Exception as e:
+            self.warn('skipping %s: %s' % (ext.name, e))
 
 setup(name='nodes',
       version='alpha',
@@ -16,5 +34,7 @@ setup(name='nodes',
       author='Adam M. Donahue',
       author_email='adam.donahue@gmail.com',
       license='BSD',
-      packages=['nodes']
+      packages=['nodes'],
+      ext_modules=[Extension('nodes._speedups', ['nodes/_speedups.c'])],
+      cmdclass={'build_ext': optionalBuildExt}
       )